@@ -120,10 +120,14 @@ except ImportError:
     # noinspection PyUnresolvedReferences
     from urllib import urlencode
 
+import os
 import time
 import datetime
 import threading
 import math
+import collections
+import itertools
+from array import array
 
 import weedb
 import weewx
@@ -138,6 +142,8 @@ from weewx.engine import StdService
 from weewx.cheetahgenerator import SearchList
 from weewx.tags import TimeBinder, TimespanBinder
 from user.dayboundarystats import startOfDayTZ, startOfYearTZ
+from user.dayboundarystats import get_sunrise_sunset_batch, DaylightCache
+import user.gtsquery as gtsquery
 
 try:
     # Test for new-style weewx logging by trying to import weeutil.logger
@@ -179,13 +185,14 @@ except ImportError:
 # The following functions are similar to that in weeutil/weeutil.py,
 # but honour the timezone tz and do _not_ honour daylight savings time.
 
-def dayOfGTSYear(time_ts,soy_ts):
+def dayOfGTSYear(time_ts,soy_ts,days=151):
     """ get the day of the year, starting at 0 for Jan 1st
     
-        After May 31st the value of that day applies to all subsequent
-        days of that year. 
+        After the last day of the GTS year (May 31st by default) the 
+        value of that day applies to all subsequent days of that year. 
         
-        Returns a value between 0 and 150 as index for self.gts_values[]
+        Returns a value between 0 and days-1 as index for the arrays
+        of GTS values
         
         Unless archiveYearSpan() and archiveDaySpan() this function
         considers midnight as belonging to the new day. This is
@@ -197,9 +204,9 @@ def dayOfGTSYear(time_ts,soy_ts):
     # time_ts is before the beginning of the year
     # That should never happen in the program, but it is checked for safety.
     if time_ts<soy_ts: return 0
-    # time_ts is after May 31st
-    if time_ts>=soy_ts+13046400: return 150
-    # time_ts is between Jan 1st and May 31st
+    # time_ts is after the last day (May 31st)
+    if time_ts>=soy_ts+days*86400: return days-1
+    # time_ts is between Jan 1st and the last day (May 31st)
     return int((time_ts-soy_ts)//86400)
 
 def genDaySpansWithoutDST(start_ts, stop_ts):
@@ -227,6 +234,81 @@ def boilingTemperatureCC(pressure, temp1=99.9743, deltaH=40.657):
     return temp
 
 
+def svpGoffGratch(temp):
+    """ saturation vapor pressure of water according to Goff-Gratch
+    
+        temp: temperature in °C
+        returns: saturation vapor pressure in hPa
+        
+        (see test/wasser.py)
+    """
+    T = temp+273.15
+    return math.exp(
+           -6094.4642/T
+           +21.1249952
+           -2.7245552e-2*T
+           +1.6853396e-5*T*T
+           +2.4575506*math.log(T))*0.01
+
+
+class BoilingTemperatureGG(object):
+    """ boiling temperature of water according to Goff-Gratch
+    
+        Water boils if its saturation vapor pressure equals the air 
+        pressure. There is no closed form of the Goff-Gratch equation
+        to get the temperature out of the pressure, so it would require
+        an iteration for every value (see `boilingGG()` in 
+        test/wasser.py). Instead, a table of the inverse function
+        with equidistant pressure values is calculated once, and the
+        boiling temperature is interpolated out of that table. The
+        error of the interpolation is less than 0.0001°C. Outside the 
+        table range the equation is solved by bisection.
+    """
+    
+    P_MIN = 300.0  # hPa
+    P_MAX = 1100.0 # hPa
+    P_STEP = 0.25  # hPa
+    
+    def __init__(self):
+        # fine table of pressure over temperature from 60°C to 105°C
+        temps = [60.0+i*0.005 for i in range(9001)]
+        pressures = [svpGoffGratch(temp) for temp in temps]
+        # invert it to a table of temperature over pressure
+        self.n = int(round((self.P_MAX-self.P_MIN)/self.P_STEP))
+        self.temps = array('d')
+        j = 0
+        for i in range(self.n+1):
+            p = self.P_MIN+i*self.P_STEP
+            while pressures[j+1]<p: j += 1
+            x = (p-pressures[j])/(pressures[j+1]-pressures[j])
+            self.temps.append(temps[j]+(temps[j+1]-temps[j])*x)
+        self.inv_step = 1.0/self.P_STEP
+        
+    def __call__(self, pressure):
+        """ boiling temperature in °C at `pressure` in hPa """
+        x = (pressure-self.P_MIN)*self.inv_step
+        if 0.0<=x<self.n:
+            i = int(x)
+            t0 = self.temps[i]
+            return t0+(self.temps[i+1]-t0)*(x-i)
+        return self.solve(pressure)
+        
+    @staticmethod
+    def solve(pressure, eps=1e-6):
+        """ solve the Goff-Gratch equation by bisection """
+        if pressure<=0.0: 
+            raise ValueError("pressure must be positive")
+        temp0 = 0.0
+        temp1 = 200.0
+        while temp1-temp0>eps:
+            temp = (temp0+temp1)*0.5
+            if svpGoffGratch(temp)<pressure:
+                temp0 = temp
+            else:
+                temp1 = temp
+        return (temp0+temp1)*0.5
+
+
 # unit g/m^2 and mg/m^2 for 'group_concentration'
 weewx.units.conversionDict.setdefault('microgram_per_meter_cubed',{})
 weewx.units.conversionDict.setdefault('milligram_per_meter_cubed',{})
@@ -272,13 +354,884 @@ weewx.units.conversionDict['kPa']['pF_value'] = lambda x: hPa_to_pF(x*10)
 weewx.defaults.defaults['Units']['StringFormats'].setdefault('pF_value','%.1f')
 weewx.defaults.defaults['Units']['Labels'].setdefault('pF_value',u'')
 
+# converter functions by (from_unit, to_unit)
+unit_converters = dict()
+
+def get_unit_converter(from_unit, to_unit):
+    """ get a function that converts a raw value from `from_unit` to 
+        `to_unit`
+        
+        The conversion function is looked up in conversionDict once
+        instead of with every value like weewx.units.convert() does.
+        Like that function it returns None for None.
+    """
+    try:
+        return unit_converters[(from_unit,to_unit)]
+    except KeyError:
+        pass
+    if from_unit==to_unit:
+        def func(x):
+            return x
+    else:
+        # KeyError if there is no such conversion
+        conversion_func = weewx.units.conversionDict[from_unit][to_unit]
+        def func(x):
+            return conversion_func(x) if x is not None else None
+    unit_converters[(from_unit,to_unit)] = func
+    return func
+
+def get_std_unit_converter(unit, unit_group, target_std_unit_system):
+    """ get a function that converts a raw value from `unit` to the
+        unit of `unit_group` in the given unit system and that unit
+        
+        This is the same as weewx.units.convertStd(), but resolved 
+        once.
+    """
+    target_unit = weewx.units.StdUnitConverters[target_std_unit_system].group_unit_dict.get(
+                                    unit_group,weewx.units.USUnits[unit_group])
+    return get_unit_converter(unit,target_unit), target_unit
+
+class ETAccumulator(object):
+    """ running sums of ET for dayET and ET24
+    
+        The accumulator holds the ET readings of the last 24 hours as
+        (dateTime, ET) in a deque and the sums over that deque and over
+        the archive day. It is seeded by one query at startup and 
+        updated by every archive record after it is saved to the
+        database. So it represents the contents of the database up to
+        `last_ts`. For timestamps from `last_ts` on, dayET and ET24 
+        are returned without database access. For earlier timestamps
+        `get()` returns None, and the caller has to query the database.
+        
+        StdWXCalculate is one of the `process_services` and runs 
+        before GTSService, which is one of the `xtype_services`, so
+        ET is already calculated when the NEW_ARCHIVE_RECORD event
+        reaches GTSService. But StdArchive, one of the 
+        `archive_services`, saves the record to the database after
+        that. So the record is kept pending and added later, when it 
+        is saved to the database.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # database (database_name, table_name) the values belong to
+        self.database = None
+        self.usUnits = None
+        # record not yet saved to the database
+        self.pending = None
+        # timestamp of the last record added
+        self.last_ts = None
+        # ET of the last 24 hours
+        self.records = collections.deque()
+        self.sum24 = 0.0
+        self.count24 = 0
+        # ET of the archive day
+        self.day_start = None
+        self.day_sum = 0.0
+        self.day_count = 0
+        
+    def seed(self, db_manager):
+        """ read the last 24 hours out of the database """
+        with self.lock:
+            self.database = None
+            self.pending = None
+            self.last_ts = None
+            self.records.clear()
+            self.sum24 = 0.0
+            self.count24 = 0
+            self.day_start = None
+            self.day_sum = 0.0
+            self.day_count = 0
+            self.usUnits = None
+            last_ts = db_manager.last_timestamp
+            if last_ts is None: return
+            for _result in gtsquery.genSql(db_manager,'records',
+                    (db_manager.table_name,('interval','usUnits','ET')),
+                    (last_ts-86400,last_ts)):
+                if not self._add(_result[0],_result[3],_result[2]):
+                    return
+            self.last_ts = last_ts
+            self.database = (db_manager.database_name,db_manager.table_name)
+    
+    def _add(self, ts, et, usUnits):
+        """ add one reading (lock must be held) """
+        if self.usUnits is None:
+            self.usUnits = usUnits
+        elif usUnits!=self.usUnits:
+            # mixed unit systems: the database is to be used
+            self.database = None
+            return False
+        # remove the readings older than 24 hours
+        while self.records and self.records[0][0]<=ts-86400:
+            _, __et = self.records.popleft()
+            if __et is not None:
+                self.sum24 -= __et
+                self.count24 -= 1
+        if not self.count24:
+            self.sum24 = 0.0
+        # day rollover
+        sod_ts = weeutil.weeutil.startOfArchiveDay(ts)
+        if sod_ts!=self.day_start:
+            self.day_start = sod_ts
+            self.day_sum = 0.0
+            self.day_count = 0
+            # prevent accumulation of rounding errors
+            self.sum24 = math.fsum(x[1] for x in self.records if x[1] is not None)
+        # add the new reading
+        self.records.append((ts,et))
+        if et is not None:
+            self.sum24 += et
+            self.count24 += 1
+            self.day_sum += et
+            self.day_count += 1
+        self.last_ts = ts
+        return True
+        
+    def add_record(self, record):
+        """ remember a new archive record """
+        with self.lock:
+            self._add_pending()
+            self.pending = record
+    
+    def _add_pending(self):
+        """ add the pending record (lock must be held) """
+        if self.pending is not None and self.database is not None:
+            ts = self.pending.get('dateTime')
+            if ts is not None and (self.last_ts is None or ts>self.last_ts):
+                self._add(ts,self.pending.get('ET'),self.pending.get('usUnits'))
+        self.pending = None
+    
+    def get(self, obs_type, ts, db_manager):
+        """ get dayET or ET24 for timestamp ts 
+        
+            returns a ValueTuple or None if the value is not available
+            from memory
+        """
+        with self.lock:
+            if self.database!=(db_manager.database_name,db_manager.table_name):
+                return None
+            if self.pending is not None:
+                # If the pending record is saved to the database in
+                # the meantime, add it.
+                if db_manager.last_timestamp and self.pending.get('dateTime',0)<=db_manager.last_timestamp:
+                    self._add_pending()
+            if self.last_ts is None or ts<self.last_ts:
+                return None
+            if obs_type=='dayET':
+                if weeutil.weeutil.startOfArchiveDay(ts)==self.day_start and self.day_count:
+                    val = self.day_sum
+                else:
+                    val = None
+            else:
+                val = self.sum24
+                count = self.count24
+                for __ts,__et in self.records:
+                    if __ts>ts-86400: break
+                    if __et is not None:
+                        val -= __et
+                        count -= 1
+                if not count: val = None
+            _unit,_group = weewx.units.getStandardUnitType(self.usUnits,'ET','sum')
+            return weewx.units.ValueTuple(val,_unit,_group)
+
+
+class EnergyIntegralTable(object):
+    """ daily energy integrals of radiation and power readings
+
+        For every observation type of the archive table, that is in
+        'group_radiation' or 'group_power', the table
+        `<table>_gts_energy` holds one row per archive day containing
+        SUM(obs*interval)/60 of that day, the number of readings, and
+        the unit system (NULL if mixed). The key `dateTime` is the
+        start of the archive day, that is (dateTime, next midnight].
+
+        The table `<table>_gts_metadata` holds the timestamp of the
+        last archive record included (`energy_lastUpdate`) and the
+        list of observation types (`energy_obs_types`). If the list
+        changes, the table is rebuilt.
+
+        Note: The prefix `<table>_day_` is not used, because WeeWX
+              considers such tables daily summaries.
+
+        Note: Records inserted or changed in the database before
+              `energy_lastUpdate` are not seen. Delete the table
+              in that case to force a rebuild.
+    """
+
+    # days to process at once while building the table
+    CHUNK = 30
+
+    def __init__(self, table_name):
+        self.lock = threading.Lock()
+        self.table_name = table_name
+        self.energy_table = '%s_gts_energy' % table_name
+        self.metadata_table = '%s_gts_metadata' % table_name
+        # observation types the table is maintained for
+        self.obs_types = None
+        # timestamp of the last record included
+        self.last_update = None
+        # False if the tables could not be created
+        self.ok = True
+        # to log errors only once
+        self.sync_ok = True
+
+    def _initialize(self, db_manager):
+        """ create the tables if necessary and read the metadata """
+        __obs_types = sorted(x for x in db_manager.sqlkeys
+            if weewx.units.obs_group_dict.get(x) in ('group_radiation','group_power'))
+        __dbtype = db_manager.connection.dbtype
+        with weedb.Transaction(db_manager.connection) as cursor:
+            gtsquery.execute(cursor,__dbtype,'create_energy',(self.energy_table,))
+            gtsquery.execute(cursor,__dbtype,'create_metadata',(self.metadata_table,))
+        __meta = dict()
+        for _result in gtsquery.genSql(db_manager,'metadata',(self.metadata_table,)):
+            __meta[_result[0]] = _result[1]
+        if __meta.get('energy_obs_types')==','.join(__obs_types):
+            self.last_update = weeutil.weeutil.to_int(__meta.get('energy_lastUpdate'))
+        else:
+            # new table or observation types changed --> rebuild
+            loginf("building daily energy integrals table %s for %s" % (self.energy_table,__obs_types))
+            with weedb.Transaction(db_manager.connection) as cursor:
+                gtsquery.execute(cursor,__dbtype,'delete_all',(self.energy_table,))
+                gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                                 ('energy_obs_types',','.join(__obs_types)))
+                gtsquery.execute(cursor,__dbtype,'delete_metadata',(self.metadata_table,),
+                                 ('energy_lastUpdate',))
+            self.last_update = None
+        self.obs_types = __obs_types
+
+    def sync(self, db_manager, max_chunks=None):
+        """ add the records saved since the last call to the table
+        
+            If max_chunks is not None, at most max_chunks times
+            CHUNK days are processed.
+        """
+        with self.lock:
+            if not self.ok: return False
+            try:
+                if self.obs_types is None:
+                    self._initialize(db_manager)
+                self._sync(db_manager, max_chunks)
+                self.sync_ok = True
+                return True
+            except weedb.DatabaseError as e:
+                if self.obs_types is None:
+                    # The tables could not be created.
+                    self.ok = False
+                    logerr("daily energy integrals disabled: %s %s" % (e.__class__.__name__,e))
+                elif self.sync_ok:
+                    logerr("could not update daily energy integrals: %s %s" % (e.__class__.__name__,e))
+                    self.sync_ok = False
+                return False
+
+    def complete(self, db_manager):
+        """ check whether all the records are included """
+        if not self.ok or self.obs_types is not None and not self.obs_types: return True
+        last_ts = db_manager.last_timestamp
+        return last_ts is None or self.last_update is not None and self.last_update>=last_ts
+
+    def _sync(self, db_manager, max_chunks=None):
+        """ read new archive records in chunks (lock must be held) """
+        last_ts = db_manager.last_timestamp
+        if last_ts is None or not self.obs_types: return
+        if self.last_update is not None and self.last_update>=last_ts: return
+        if self.last_update is not None:
+            start_ts = self.last_update
+        else:
+            start_ts = db_manager.first_timestamp-1
+        while start_ts<last_ts and max_chunks!=0:
+            # end of the chunk at midnight
+            stop_ts = min(weeutil.weeutil.startOfDay(start_ts+EnergyIntegralTable.CHUNK*86400),last_ts)
+            self._sync_chunk(db_manager, start_ts, stop_ts)
+            start_ts = stop_ts
+            if max_chunks is not None: max_chunks -= 1
+
+    def _sync_chunk(self, db_manager, start_ts, stop_ts):
+        """ update the day rows by the records of (start_ts, stop_ts] """
+        # day rows to update: [energy, count, usUnits]
+        __days = dict()
+        if self.last_update is not None:
+            # The day of the last update may be incomplete.
+            __sod = weeutil.weeutil.archiveDaySpan(self.last_update)[0]
+            for _result in gtsquery.genSql(db_manager,'energy_day',
+                    (self.energy_table,),(__sod,)):
+                __days[(_result[0],__sod)] = [_result[1],_result[2],_result[3]]
+        __span = None
+        for _result in gtsquery.genSql(db_manager,'records',
+                (self.table_name,('usUnits','interval')+tuple(self.obs_types)),
+                (start_ts,stop_ts)):
+            if __span is None or _result[0]>__span[1]:
+                __span = weeutil.weeutil.archiveDaySpan(_result[0])
+            for __obs,__val in zip(self.obs_types,_result[3:]):
+                __day = __days.get((__obs,__span[0]))
+                if __day is None:
+                    __day = __days[(__obs,__span[0])] = [None,0,_result[1]]
+                elif __day[1] and __day[2]!=_result[1]:
+                    # mixed unit systems within the day
+                    __day[2] = None
+                if __day[1]==0: __day[2] = _result[1]
+                __day[1] += 1
+                if __val is not None and _result[2] is not None:
+                    __day[0] = (__day[0] or 0.0)+__val*_result[2]/60.0
+        __dbtype = db_manager.connection.dbtype
+        with weedb.Transaction(db_manager.connection) as cursor:
+            gtsquery.executemany(cursor,__dbtype,'replace',(self.energy_table,5),
+                [(x[0],x[1],y[2],y[0],y[1]) for x,y in __days.items()])
+            gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                             ('energy_lastUpdate',str(stop_ts)))
+        self.last_update = stop_ts
+
+    def get(self, obs_type, timespan, db_manager):
+        """ get SUM(obs_type*interval)/60, MIN(usUnits), MAX(usUnits)
+            for the whole days within timespan out of the table
+
+            returns (result, span) with span being the part of timespan
+            covered by the result or None if the table cannot be used
+        """
+        with self.lock:
+            if not self.ok or self.last_update is None: return None
+            if obs_type not in self.obs_types: return None
+            # first midnight at or after the start of the timespan
+            __start = weeutil.weeutil.startOfDay(timespan[0])
+            if __start!=timespan[0]:
+                __start = weeutil.weeutil.archiveDaySpan(timespan[0])[1]
+            # last midnight at or before the end of the timespan whose
+            # day is completely included in the table
+            __stop = weeutil.weeutil.startOfDay(min(timespan[1],self.last_update))
+            if __stop<=__start: return None
+            _result = gtsquery.getSql(db_manager,'energy_sum',
+                (self.energy_table,),(obs_type,__start,__stop))
+        if _result is None or _result[3]!=_result[4]:
+            # mixed unit systems: let the archive query raise the error
+            return None
+        return _result[:3],TimeSpan(__start,__stop)
+
+
+class RollupTable(object):
+    """ hourly (or sub-hourly) rollup of the archive table
+    
+        The table `<table>_gts_rollup` holds one row per observation
+        type and interval of `interval` seconds. The key `dateTime`
+        is the start of the interval, that is (dateTime, 
+        dateTime+interval], and the row contains min, mintime, max,
+        maxtime, sum, count, wsum and sumtime of the non-null values 
+        of that interval like the daily summaries do for days.
+        
+        The observation types are configured or, if not, those
+        having values within the last 24 hours of archive records
+        when the table is created.
+        
+        The table `<table>_gts_metadata` holds the timestamp of the
+        last archive record included (`rollup_lastUpdate`), the 
+        interval (`rollup_interval`), and the list of observation 
+        types (`rollup_obs_types`). If the interval or the configured
+        list changes, the table is rebuilt.
+        
+        Note: Records inserted or changed in the database before
+              `rollup_lastUpdate` are not seen. Delete the table
+              in that case to force a rebuild.
+    """
+    
+    # intervals to process at once while building the table
+    CHUNK = 720
+
+    def __init__(self, table_name, interval=3600, obs_types=None):
+        self.lock = threading.Lock()
+        self.table_name = table_name
+        self.rollup_table = '%s_gts_rollup' % table_name
+        self.metadata_table = '%s_gts_metadata' % table_name
+        self.interval = interval
+        # configured observation types or None
+        self.config_obs_types = obs_types
+        # observation types the table is maintained for
+        self.obs_types = None
+        # timestamp of the last record included
+        self.last_update = None
+        # False if the tables could not be created
+        self.ok = True
+        # to log errors only once
+        self.sync_ok = True
+
+    def _default_obs_types(self, db_manager):
+        """ observation types having values within the last 24 hours """
+        __last_ts = db_manager.last_timestamp
+        if __last_ts is None: return []
+        __keys = [x for x in db_manager.sqlkeys
+                  if x not in ('dateTime','usUnits','interval')]
+        if not __keys: return []
+        _result = gtsquery.getSql(db_manager,'count_since',
+            (self.table_name,tuple(__keys)),(__last_ts-86400,))
+        return sorted(x for x,y in zip(__keys,_result) if y)
+
+    def _initialize(self, db_manager):
+        """ create the tables if necessary and read the metadata """
+        __dbtype = db_manager.connection.dbtype
+        with weedb.Transaction(db_manager.connection) as cursor:
+            gtsquery.execute(cursor,__dbtype,'create_rollup',(self.rollup_table,))
+            gtsquery.execute(cursor,__dbtype,'create_metadata',(self.metadata_table,))
+        __meta = dict()
+        for _result in gtsquery.genSql(db_manager,'metadata',(self.metadata_table,)):
+            __meta[_result[0]] = _result[1]
+        if self.config_obs_types is not None:
+            __obs_types = sorted(x for x in self.config_obs_types if x in db_manager.sqlkeys)
+        elif __meta.get('rollup_obs_types'):
+            __obs_types = __meta['rollup_obs_types'].split(',')
+        else:
+            __obs_types = self._default_obs_types(db_manager)
+        if (__meta.get('rollup_obs_types')==','.join(__obs_types) and
+            weeutil.weeutil.to_int(__meta.get('rollup_interval'))==self.interval):
+            self.last_update = weeutil.weeutil.to_int(__meta.get('rollup_lastUpdate'))
+        else:
+            # new table, interval or observation types changed --> rebuild
+            loginf("building rollup table %s with interval %s for %s" % (self.rollup_table,self.interval,__obs_types))
+            with weedb.Transaction(db_manager.connection) as cursor:
+                gtsquery.execute(cursor,__dbtype,'delete_all',(self.rollup_table,))
+                gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                                 ('rollup_obs_types',','.join(__obs_types)))
+                gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                                 ('rollup_interval',str(self.interval)))
+                gtsquery.execute(cursor,__dbtype,'delete_metadata',(self.metadata_table,),
+                                 ('rollup_lastUpdate',))
+            self.last_update = None
+        self.obs_types = __obs_types
+
+    def sync(self, db_manager, max_chunks=None):
+        """ add the records saved since the last call to the table
+        
+            If max_chunks is not None, at most max_chunks times
+            CHUNK intervals are processed.
+        """
+        with self.lock:
+            if not self.ok: return False
+            try:
+                if self.obs_types is None:
+                    self._initialize(db_manager)
+                self._sync(db_manager, max_chunks)
+                self.sync_ok = True
+                return True
+            except weedb.DatabaseError as e:
+                if self.obs_types is None:
+                    # The tables could not be created.
+                    self.ok = False
+                    logerr("rollup table disabled: %s %s" % (e.__class__.__name__,e))
+                elif self.sync_ok:
+                    logerr("could not update rollup table: %s %s" % (e.__class__.__name__,e))
+                    self.sync_ok = False
+                return False
+
+    def complete(self, db_manager):
+        """ check whether all the records are included """
+        if not self.ok or self.obs_types is not None and not self.obs_types: return True
+        last_ts = db_manager.last_timestamp
+        return last_ts is None or self.last_update is not None and self.last_update>=last_ts
+
+    def _sync(self, db_manager, max_chunks=None):
+        """ read new archive records in chunks (lock must be held) """
+        last_ts = db_manager.last_timestamp
+        if last_ts is None or not self.obs_types: return
+        if self.last_update is not None and self.last_update>=last_ts: return
+        if self.last_update is not None:
+            start_ts = self.last_update
+        else:
+            start_ts = db_manager.first_timestamp-1
+        while start_ts<last_ts and max_chunks!=0:
+            # end of the chunk at an interval boundary
+            stop_ts = min((start_ts//self.interval+RollupTable.CHUNK)*self.interval,last_ts)
+            self._sync_chunk(db_manager, start_ts, stop_ts)
+            start_ts = stop_ts
+            if max_chunks is not None: max_chunks -= 1
+
+    def _sync_chunk(self, db_manager, start_ts, stop_ts):
+        """ update the interval rows by the records of (start_ts, stop_ts] """
+        __interval = self.interval
+        # rows to update: [min, mintime, max, maxtime, sum, count, wsum, sumtime]
+        __rows = dict()
+        if self.last_update is not None and start_ts%__interval:
+            # The interval of the last update may be incomplete.
+            __key = (start_ts-1)//__interval*__interval
+            for _result in gtsquery.genSql(db_manager,'rollup_interval',
+                    (self.rollup_table,),(__key,)):
+                __rows[(_result[0],__key)] = list(_result[1:])
+        for _result in gtsquery.genSql(db_manager,'records',
+                (self.table_name,('interval',)+tuple(self.obs_types)),
+                (start_ts,stop_ts)):
+            __ts = _result[0]
+            __key = (__ts-1)//__interval*__interval
+            __sec = (_result[1] or 0)*60
+            for __obs,__val in zip(self.obs_types,_result[2:]):
+                if __val is None: continue
+                __row = __rows.get((__obs,__key))
+                if __row is None:
+                    __rows[(__obs,__key)] = [__val,__ts,__val,__ts,__val,1,__val*__sec,__sec]
+                else:
+                    if __val<__row[0]:
+                        __row[0] = __val
+                        __row[1] = __ts
+                    if __val>__row[2]:
+                        __row[2] = __val
+                        __row[3] = __ts
+                    __row[4] += __val
+                    __row[5] += 1
+                    __row[6] += __val*__sec
+                    __row[7] += __sec
+        __dbtype = db_manager.connection.dbtype
+        with weedb.Transaction(db_manager.connection) as cursor:
+            gtsquery.executemany(cursor,__dbtype,'replace',(self.rollup_table,10),
+                [x+tuple(y) for x,y in __rows.items()])
+            gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                             ('rollup_lastUpdate',str(stop_ts)))
+        self.last_update = stop_ts
+
+    def get(self, obs_type, timespan, db_manager, times=False):
+        """ get min, mintime, max, maxtime, sum, and count of obs_type
+            for the whole intervals within timespan out of the table
+            
+            mintime and maxtime are only looked up if `times` is True.
+            
+            returns (result, span) with span being the part of timespan
+            covered by the result or None if the table cannot be used
+        """
+        with self.lock:
+            if not self.ok or self.last_update is None: return None
+            if obs_type not in self.obs_types: return None
+            # first interval boundary at or after the start of the
+            # timespan
+            __start = -(-timespan[0]//self.interval)*self.interval
+            # last interval boundary at or before the end of the 
+            # timespan whose interval is completely included in the 
+            # table
+            __stop = min(timespan[1],self.last_update)//self.interval*self.interval
+            # not worth the effort for less than 2 intervals
+            if __stop-__start<2*self.interval: return None
+            __args = (obs_type,__start,__stop)
+            _result = gtsquery.getSql(db_manager,'rollup_sum',
+                (self.rollup_table,),__args)
+            __mintime = __maxtime = None
+            if times and _result[0] is not None:
+                # the first occurrence of the minimum and maximum
+                __mintime = gtsquery.getSql(db_manager,'rollup_mintime',
+                    (self.rollup_table,),__args+(_result[0],))[0]
+                __maxtime = gtsquery.getSql(db_manager,'rollup_maxtime',
+                    (self.rollup_table,),__args+(_result[1],))[0]
+        return (_result[0],__mintime,_result[1],__maxtime,_result[2],_result[3] or 0),TimeSpan(__start,__stop)
+
+
+class RollupType(weewx.xtypes.XType):
+    """ aggregates over timespans with other day boundaries than the
+        archive day out of the rollup table
+        
+        The tags `$offset...` and `$LMT...` of `dayboundarystats.py` 
+        include the key `dayboundary` or `LMT` in `option_dict`. For
+        them, the whole intervals of the timespan are taken from the 
+        rollup table and the remaining parts at the edges from the 
+        archive table. All other requests are left to `ArchiveTable`
+        and `DailySummaries`.
+    """
+    
+    AGGREGATES = ('min','max','mintime','maxtime','sum','count','avg','not_null')
+    
+    def __init__(self, interval=3600, obs_types=None):
+        self.interval = interval
+        self.obs_types = obs_types
+        # chunks to process per archive record (None means all)
+        self.sync_chunks = 1
+        # rollup tables by (database_name, table_name)
+        self.tables = dict()
+        
+    def new_archive_record(self, record, db_manager=None):
+        """ add the records saved so far to the rollup table """
+        # The new record is not saved to the database yet. So this
+        # adds the records up to the previous one.
+        if db_manager is not None:
+            self.get_table(db_manager).sync(db_manager,self.sync_chunks)
+    
+    def get_table(self, db_manager):
+        """ get the rollup table of the database """
+        __key = (db_manager.database_name,db_manager.table_name)
+        __table = self.tables.get(__key)
+        if __table is None:
+            __table = self.tables.setdefault(__key,RollupTable(db_manager.table_name,self.interval,self.obs_types))
+        return __table
+    
+    @staticmethod
+    def get_archive_part(obs_type, start, stop, db_manager, times=False):
+        """ get min, mintime, max, maxtime, sum, and count of obs_type
+            for the timespan (start, stop] out of the archive table
+        """
+        if stop<=start: return None
+        __args = (start,stop)
+        __ids = (db_manager.table_name,obs_type)
+        _result = gtsquery.getSql(db_manager,'min_max_sum_count',__ids,__args)
+        __mintime = __maxtime = None
+        if times and _result[0] is not None:
+            __mintime = gtsquery.getSql(db_manager,'first_time_of_value',__ids,__args+(_result[0],))[0]
+            __maxtime = gtsquery.getSql(db_manager,'first_time_of_value',__ids,__args+(_result[1],))[0]
+        return (_result[0],__mintime,_result[1],__maxtime,_result[2],_result[3])
+        
+    def get_aggregate(self, obs_type, timespan, aggregate_type, db_manager, **option_dict):
+        """ aggregation out of the rollup table and the edges """
+        if 'dayboundary' not in option_dict and 'LMT' not in option_dict:
+            raise weewx.UnknownAggregation(aggregate_type)
+        if aggregate_type not in RollupType.AGGREGATES:
+            raise weewx.UnknownAggregation(aggregate_type)
+        __times = aggregate_type in ('mintime','maxtime')
+        try:
+            __x = self.get_table(db_manager).get(obs_type,timespan,db_manager,__times)
+        except weedb.DatabaseError as e:
+            logerr("could not read rollup table: %s %s" % (e.__class__.__name__,e))
+            __x = None
+        if __x is None:
+            raise weewx.UnknownType(obs_type)
+        # parts of the timespan in chronological order
+        __parts = [
+            RollupType.get_archive_part(obs_type,timespan[0],__x[1][0],db_manager,__times),
+            __x[0],
+            RollupType.get_archive_part(obs_type,__x[1][1],timespan[1],db_manager,__times)]
+        __min = __mintime = __max = __maxtime = __sum = None
+        __count = 0
+        for __part in __parts:
+            if __part is None or not __part[5]: continue
+            # On equal values the earlier one is kept.
+            if __min is None or __part[0]<__min:
+                __min = __part[0]
+                __mintime = __part[1]
+            if __max is None or __part[2]>__max:
+                __max = __part[2]
+                __maxtime = __part[3]
+            __sum = __part[4] if __sum is None else __sum+__part[4]
+            __count += __part[5]
+        if aggregate_type=='min':
+            __val = __min
+        elif aggregate_type=='max':
+            __val = __max
+        elif aggregate_type=='mintime':
+            __val = __mintime
+        elif aggregate_type=='maxtime':
+            __val = __maxtime
+        elif aggregate_type=='sum':
+            __val = __sum
+        elif aggregate_type=='count':
+            __val = __count
+        elif aggregate_type=='avg':
+            __val = __sum/__count if __count else None
+        else:
+            __val = __count>0
+        u, g = weewx.units.getStandardUnitType(db_manager.std_unit_system,obs_type,aggregate_type)
+        return weewx.units.ValueTuple(__val,u,g)
+
+
+class GTSProfile(object):
+    """ parameters of a variant of GTS
+    
+        name:      observation type of the sum, the date the threshold
+                   is exceeded is name+'date'
+        weights:   factors for the daily averages by month, the last 
+                   one applies to all the remaining months
+        threshold: GTS value that marks the beginning of spring
+        cutoff:    last day of the sum (month-day)
+        obs_type:  temperature the daily averages are taken from
+    """
+    
+    def __init__(self, name, weights=(0.5,0.75,1.0), threshold=200.0, cutoff='05-31', obs_type='outTemp'):
+        self.name = name
+        self.obs_type = obs_type
+        self.threshold = float(threshold)
+        # number of days from Jan 1st to the cutoff day 
+        # (As GTS is based on timestamps, not dates, this is always 
+        # counted like in a year without February 29th.)
+        __month,__day = [int(x) for x in str(cutoff).split('-')]
+        __jan1 = datetime.date(2001,1,1)
+        self.days = (datetime.date(2001,__month,__day)-__jan1).days+1
+        # weight of every day of the GTS year
+        if not isinstance(weights,(list,tuple)):
+            weights = weeutil.weeutil.option_as_list(weights)
+        __w = [float(x) for x in weights]
+        self.weights = [__w[min((__jan1+datetime.timedelta(days=__i)).month,len(__w))-1] for __i in range(self.days)]
+        
+    def __str__(self):
+        return "%s(%s,threshold=%s,days=%s)" % (self.name,self.obs_type,self.threshold,self.days)
+
+
+class GTSPartition(object):
+    """ cached values of one database (data binding)
+    
+        GTSType keeps one partition per (database_name, table_name).
+        Each partition has its own locks and its own limits of the
+        number of entries, so several stations share one engine
+        without interfering.
+    """
+    
+    def __init__(self, max_gdd_prefix=32, max_day_stats=400, max_gts_years=32):
+        # lock that makes GTS calculation atomic
+        self.lock = threading.Lock()
+        # GTS
+        # (by year and then by GTS profile name)
+        self.last_gts_date = None # last date GTS is calculated for
+        self.gts_date = {}        # the date when GTS exceeds the threshold
+        self.gts_value = None     # last GTS values calculated by profile
+        self.gts_values = {}      # calculated GTS values
+        self.max_gts_years = max_gts_years
+        # values precalculated when a LMT day is complete
+        self.closed_day_ts = None # end of the last complete LMT day
+        self.lmt_day_stats = {}   # min, max, avg of complete LMT days by column
+        self.day_stats_lock = threading.Lock()
+        self.max_day_stats = max_day_stats
+        self.gdd_prefix = collections.OrderedDict() # GDD integrals up to a complete LMT day
+        self.gdd_lock = threading.Lock()
+        self.max_gdd_prefix = max_gdd_prefix
+        # per-day bitmaps of the available data
+        self.coverage = None
+
+
+class DataCoverage(object):
+    """ per-day bitmaps of the availability of observation types
+    
+        One bit per LMT day and observation type tells whether there
+        is at least one value of that type within the day. The day
+        (sod, sod+86400] has the bit number (sod-base)/86400, where
+        `base` is the start of the LMT day of the first record. 
+        `dateTime` stands for records at all. So ten years take 460
+        bytes per observation type.
+        
+        The bitmaps are built by one grouped query when they are used
+        the first time. After that, archive records and records saved
+        later on set the bits of their days. Questions about the data
+        coverage of any time span are answered by counting bits.
+        
+        Note: Records inserted into the database before the last
+              record seen are not included.
+    """
+    
+    # number of bits set in a byte
+    POPCOUNT = bytearray(bin(x).count('1') for x in range(256))
+    
+    def __init__(self, lmt_tz, obs_types):
+        self.lock = threading.Lock()
+        self.lmt_tz = lmt_tz
+        self.obs_types = ['dateTime']+[x for x in obs_types if x!='dateTime']
+        # start of the first LMT day
+        self.base = None
+        # timestamp of the last record included
+        self.last_ts = None
+        self.bitmaps = dict()
+        # False if the bitmaps could not be built
+        self.ok = True
+        
+    def sync(self, db_manager):
+        """ include the records saved since the last call 
+        
+            Returns False if the bitmaps cannot be used.
+        """
+        with self.lock:
+            if not self.ok: return False
+            __last_ts = db_manager.last_timestamp
+            if __last_ts is None: return self.base is not None
+            if self.last_ts is not None and __last_ts<=self.last_ts: return True
+            try:
+                if self.base is None:
+                    __first_ts = db_manager.first_timestamp
+                    self.base = startOfDayTZ(__first_ts-1,startOfYearTZ(__first_ts-1,self.lmt_tz))
+                    self.obs_types = [x for x in self.obs_types if x in db_manager.sqlkeys]
+                    self.bitmaps = {x:bytearray() for x in self.obs_types}
+                    __start_ts = self.base
+                else:
+                    __start_ts = self.last_ts
+                __expressions = tuple((x,'COUNT(%s)') for x in self.obs_types)
+                for _row in gtsquery.genSql(db_manager,'span_aggregates',
+                        (db_manager.table_name,__expressions),
+                        (self.base+1,86400,__start_ts,__last_ts)):
+                    for __obs_type,__count in zip(self.obs_types,_row[1:]):
+                        if __count: self._set(__obs_type,int(_row[0]))
+                self.last_ts = __last_ts
+                return True
+            except weedb.DatabaseError as e:
+                logerr("data coverage bitmaps disabled: %s %s" % (e.__class__.__name__,e))
+                self.ok = False
+                return False
+                
+    def add_record(self, record):
+        """ set the bits of the day of an archive record 
+        
+            The record is not saved to the database yet. `last_ts` is
+            not changed, so that `sync()` reads the records saved by
+            others as well.
+        """
+        with self.lock:
+            if self.base is None: return
+            try:
+                __ts = record['dateTime']
+            except (LookupError,TypeError):
+                return
+            if __ts<=self.base: return
+            __day = int((__ts-self.base-1)//86400)
+            for __obs_type in self.obs_types:
+                if record.get(__obs_type) is not None:
+                    self._set(__obs_type,__day)
+                
+    def _set(self, obs_type, day):
+        """ set the bit of day number `day` (lock must be held) """
+        __bitmap = self.bitmaps[obs_type]
+        __idx = day>>3
+        if __idx>=len(__bitmap):
+            __bitmap.extend(bytearray(__idx-len(__bitmap)+46))
+        __bitmap[__idx] |= 1<<(day&7)
+        
+    def count(self, obs_type, start_ts, stop_ts):
+        """ number of LMT days starting within [start_ts, stop_ts) that
+            have values of `obs_type`
+            
+            Returns None if `obs_type` is not covered.
+        """
+        with self.lock:
+            __bitmap = self.bitmaps.get(obs_type)
+            if __bitmap is None: return None
+            __a = max(int(-(-(start_ts-self.base)//86400)),0)
+            __b = min(int(-(-(stop_ts-self.base)//86400)),len(__bitmap)*8)
+            if __b<=__a: return 0
+            __count = 0
+            # bits of the partial bytes at the edges
+            while __a<__b and __a&7:
+                __count += (__bitmap[__a>>3]>>(__a&7))&1
+                __a += 1
+            while __b>__a and __b&7:
+                __b -= 1
+                __count += (__bitmap[__b>>3]>>(__b&7))&1
+            # whole bytes
+            __popcount = DataCoverage.POPCOUNT
+            for __byte in __bitmap[__a>>3:__b>>3]:
+                __count += __popcount[__byte]
+            return __count
+            
+    def covered(self, obs_type, sod_ts):
+        """ True if the LMT day starting at sod_ts has values of 
+            `obs_type`, None if unknown
+        """
+        __count = self.count(obs_type,sod_ts,sod_ts+1)
+        return None if __count is None else __count>0
+        
+        
 class GTSType(weewx.xtypes.XType):
 
     # default growing degree days base and limit temperature
     GDD_BASE_VT = weewx.units.ValueTuple(10.0,'degree_C','group_temperature')
     GDD_LIMIT_VT = weewx.units.ValueTuple(30.0,'degree_C','group_temperature')
-
-    def __init__(self,lat,lon,svp_config):
+    
+    # observation types that can be read non-blocking
+    REFRESH_TYPES = ('GTS','GTSdate','yearGDD','seasonGDD')
+    
+    # psychrometric observation types, calculated together
+    PSYCHROMETRIC_TYPES = ('outSVP','outVaporP','outHumAbs',
+                           'outMixingRatio','outEquiTemp','outThetaE')
+    PSYCHROMETRIC_UNITS = {
+        'outSVP':         ('hPa','group_pressure'),
+        'outVaporP':      ('hPa','group_pressure'),
+        'outHumAbs':      ('microgram_per_meter_cubed','group_concentration'),
+        'outMixingRatio': ('gram_per_kilogram','group_mixingratio'),
+        'outEquiTemp':    ('degree_C','group_temperature'),
+        'outThetaE':      ('degree_C','group_temperature')
+    }
+
+    def __init__(self,lat,lon,svp_config,boiling_config=None,energy_integral_table=True,gts_profiles=None,temperature_obs_types=None):
 
         # class XType has no constructor
         #super(GTSType,self).__init()
@@ -297,22 +1250,65 @@ class GTSType(weewx.xtypes.XType):
             
         # possible values: vaDavisVp, vaBuck, vaBuckB1, vaBolton, vaTetenNWS, vaTetenMurray, vaTeten
         self.svp_method = svp_config.get('method','vaBolton')
-
-        # attributes to save calculted values
-        self.last_gts_date=None # last date GTS is calculated for
-        self.gts_date={}        # the date when GTS exceeds 200
-        self.gts_value=None     # last GTS value calculated
-        self.gts_values={}      # calculated GTS values
+        # fast mode for saturation vapor pressure
+        # false: formulas of weewx.uwxutils (default)
+        # true:  formula resolved once per algorithm
+        # table: interpolation out of a precalculated table
+        self.svp_fast = str(svp_config.get('fast','false')).lower()
+        self.svp_functions = dict()
+        
+        # boiling temperature algorithm
+        # CC: Clausius-Clapeyron (default)
+        # GG: Goff-Gratch
+        if boiling_config is None: boiling_config = dict()
+        self.boiling_algorithm = boiling_config.get('algorithm','CC')
+        self.boiling_gg = BoilingTemperatureGG()
+
+        # GTS variants, all calculated in the same loop over the days
+        # ('GTS' is the original one and always present)
+        self.gts_profiles = collections.OrderedDict()
+        self.gts_profiles['GTS'] = GTSProfile('GTS')
+        if gts_profiles:
+            for __name,__profile in gts_profiles.items():
+                try:
+                    self.gts_profiles[__name] = GTSProfile(__name,**__profile)
+                    loginf("GTS profile %s" % self.gts_profiles[__name])
+                except (LookupError,TypeError,ValueError) as e:
+                    logerr("GTS profile %s: %s %s" % (__name,e.__class__.__name__,e))
+        # observation type --> (profile, date or not)
+        self.gts_types = dict()
+        for __profile in self.gts_profiles.values():
+            self.gts_types[__profile.name] = (__profile,False)
+            self.gts_types[__profile.name+'date'] = (__profile,True)
+        # temperature columns that are read together in one query
+        # for LMT day values, GTS, and GDD integrals
+        self.temperature_obs_types = ['outTemp']
+        for __obs_type in list(temperature_obs_types or [])+[x.obs_type for x in self.gts_profiles.values()]:
+            if __obs_type not in self.temperature_obs_types:
+                self.temperature_obs_types.append(__obs_type)
+        # observation types that can be read non-blocking
+        self.refresh_types = GTSType.REFRESH_TYPES+tuple(
+                    x for x in self.gts_types if x not in GTSType.REFRESH_TYPES)
+        
+        # calculated values by (database_name, table_name)
+        self.partitions={}
+        
+        # background thread for non-blocking reads (set by GTSService)
+        self.refresher=None
         
         # register the values with WeeWX
         # GTS
-        weewx.units.obs_group_dict.setdefault('GTS','group_degree_day')
-        weewx.units.obs_group_dict.setdefault('GTSdate','group_time')
+        for __profile in self.gts_profiles:
+            weewx.units.obs_group_dict.setdefault(__profile,'group_degree_day')
+            weewx.units.obs_group_dict.setdefault(__profile+'date','group_time')
         weewx.units.obs_group_dict.setdefault('LMTtime','group_time')
         weewx.units.obs_group_dict.setdefault('utcoffsetLMT','group_deltatime')
         # GDD
         weewx.units.obs_group_dict.setdefault('yearGDD','group_degree_day')
         weewx.units.obs_group_dict.setdefault('seasonGDD','group_degree_day')
+        # time of the record the value is calculated for
+        for ii in self.refresh_types:
+            weewx.units.obs_group_dict.setdefault(ii+'lastUpdate','group_time')
         weewx.units.agg_group.setdefault('GDD','group_degree_day')
         weewx.units.agg_group.setdefault('growdeg','group_degree_day')
         # ET
@@ -351,8 +1347,21 @@ class GTSType(weewx.xtypes.XType):
         # boiling point
         weewx.units.obs_group_dict.setdefault('boilingTemp','group_temperature')
         
-        # lock that makes calculation atomic
-        self.lock=threading.Lock()
+        # running sums for dayET and ET24
+        self.et_accumulator = ETAccumulator()
+        # Is SQL supporting window functions? (try it first)
+        self.sql_window_functions = True
+        
+        # daily energy integrals tables by (database_name, table_name)
+        self.energy_integral_table = energy_integral_table
+        self.energy_tables = dict()
+        # chunks to process per archive record (None means all)
+        self.energy_sync_chunks = 1
+        
+        # psychrometric values of the last record
+        self.psychrometric_memo = None
+        # unit converters of the psychrometric values by usUnits
+        self.psychrometric_converters = dict()
         
         # to log some error messages only once
         self.record_ok=True
@@ -362,22 +1371,367 @@ class GTSType(weewx.xtypes.XType):
         loginf("Local mean time (LMT) UTC offset %s" % str(self.timeoffset))
         
                 
-    def __calc_gts(self, soy_ts, db_manager):
+    def get_svp_function(self, method):
+        """ get the function to calculate saturation vapor pressure 
+            in hPa out of temperature in °C by the algorithm `method`
+        """
+        try:
+            return self.svp_functions[method]
+        except KeyError:
+            pass
+        if has_baro and self.svp_fast in ('true','table'):
+            func = user.barometer.get_svp_function(method,self.svp_fast=='table')
+        else:
+            def func(temp_C):
+                return weewx.uwxutils.TWxUtils.SaturationVaporPressure(temp_C,method)
+        self.svp_functions[method] = func
+        return func
+        
+        
+    def mixing_ratio(self, pressure_hPa, temp_C, hum):
+        """ mixing ratio in g/kg 
+        
+            same as weewx.uwxutils.TWxUtils.MixingRatio() but using the
+            saturation vapor pressure function of the fast mode
+        """
+        if self.svp_fast not in ('true','table'):
+            return weewx.uwxutils.TWxUtils.MixingRatio(pressure_hPa,temp_C,hum)
+        k1 = weewx.uwxutils.TWxUtils.moleWater/weewx.uwxutils.TWxUtils.moleAir
+        vapPres = hum*self.get_svp_function('vaBuck')(temp_C)/100.0
+        return 1000*((k1*vapPres)/(pressure_hPa-vapPres))
+        
+        
+    def get_psychrometric_converters(self, usUnits):
+        """ converters of the input values of the psychrometric 
+            calculation from and of the results to the unit system
+            `usUnits`, resolved once per unit system
+            
+            Returns the converters of `outTemp` to degree_C, 
+            `outHumidity` to percent, and `pressure` to hPa, and
+            a dict of (converter, unit, unit group) of the results.
+        """
+        try:
+            return self.psychrometric_converters[usUnits]
+        except KeyError:
+            pass
+        __in = tuple(get_unit_converter(weewx.units.getStandardUnitType(usUnits,x)[0],y)
+                     for x,y in (('outTemp','degree_C'),('outHumidity','percent'),('pressure','hPa')))
+        __out = dict()
+        for __obs_type,(__unit,__unitgroup) in GTSType.PSYCHROMETRIC_UNITS.items():
+            __out[__obs_type] = get_std_unit_converter(__unit,__unitgroup,usUnits)+(__unitgroup,)
+        self.psychrometric_converters[usUnits] = (__in,__out)
+        return __in,__out
+        
+        
+    def psychrometric_values(self, temp, hum, pressure, converters, method):
+        """ all the psychrometric values in one pass
+        
+            `temp`, `hum`, and `pressure` are raw values, that are 
+            converted by `converters` to degree_C, percent, and hPa.
+            The saturation vapor pressure is calculated once.
+            
+            Returns the values of PSYCHROMETRIC_TYPES in the units of
+            PSYCHROMETRIC_UNITS.
+        """
+        __errors = (LookupError,TypeError,ValueError,ArithmeticError)
+        temp_C = hum_pc = None
+        svp = vp = habs = mr = equi = thetae = None
+        try:
+            temp_C = converters[0](temp)
+            # saturation vapor pressure
+            svp = self.get_svp_function(method)(temp_C)
+            hum_pc = converters[1](hum)
+            # actual vapor pressure
+            vp = hum_pc*svp/100.0
+            # absolute humidity
+            if vp is not None:
+                habs = vp / 4.6152 / (temp_C+273.15) * 1e9
+        except __errors:
+            pass
+        try:
+            p = converters[2](pressure)
+            # mixing ratio (based on the vapor pressure according
+            # to Buck, so the value above can be used for vaBuck)
+            if method=='vaBuck' and vp is not None:
+                k1 = weewx.uwxutils.TWxUtils.moleWater/weewx.uwxutils.TWxUtils.moleAir
+                mr = 1000*((k1*vp)/(p-vp))
+            else:
+                mr = self.mixing_ratio(p,temp_C,hum_pc)
+            # equivalent temperature
+            r = mr*1e-3
+            L = 2500.78 - 2.325734 * temp_C
+            equi = temp_C+r*(L/(1.00482+r*4.18674))
+            # equivalent potential temperature
+            thetae = (equi+273.15)*((1000/p)**(287.05/1004.82))-273.15
+        except __errors:
+            pass
+        return svp, vp, habs, mr, equi, thetae
+        
+        
+    def calc_psychrometrics(self, record, method):
+        """ all the psychrometric values of a record in one pass
+        
+            `outTemp`, `outHumidity`, and `pressure` are read and 
+            converted once, and the saturation vapor pressure is 
+            calculated once. The result is remembered for the last 
+            record, so StdWXCalculate asking for one observation type
+            after the other gets the values out of a dict. The input
+            values are part of the key, because StdWXCalculate may
+            add `pressure` to the packet in between.
+            
+            Returns a dict of ValueTuples in the unit system of the 
+            record.
+        """
+        __key = (id(record),record.get('dateTime'),record.get('usUnits'),
+                 record.get('outTemp'),record.get('outHumidity'),
+                 record.get('pressure'),method)
+        __memo = self.psychrometric_memo
+        if __memo is not None and __memo[0]==__key: return __memo[1]
+        __in, __out = self.get_psychrometric_converters(record['usUnits'])
+        __raw = self.psychrometric_values(record.get('outTemp'),
+                    record.get('outHumidity'),record.get('pressure'),__in,method)
+        __values = dict()
+        for __obs_type,__val in zip(GTSType.PSYCHROMETRIC_TYPES,__raw):
+            # see https://github.com/weewx/weewx/issues/781
+            __func,__unit,__unitgroup = __out[__obs_type]
+            __values[__obs_type] = weewx.units.ValueTuple(__func(__val),__unit,__unitgroup)
+        self.psychrometric_memo = (__key,__values)
+        return __values
+        
+        
+    def iter_derived(self, timespan, db_manager, obs_types=None, method=None, 
+                     unit_system=None, chunk_size=1000, missing=False):
+        """ psychrometric values of the archive records within `timespan`
+        
+            Yields lists of up to `chunk_size` tuples 
+            (dateTime, {'usUnits':usUnits, obs_type:value, ...}), one
+            for each archive record in the order of `dateTime`. 
+            `obs_types` defaults to all of PSYCHROMETRIC_TYPES, `method`
+            to the configured saturation vapor pressure algorithm. The
+            values are in `unit_system`, or in the unit system of the
+            record if `unit_system` is None.
+            
+            The records are read page by page with `LIMIT chunk_size`,
+            starting after the last `dateTime` of the previous page.
+            So memory use does not depend on the length of `timespan`,
+            for SQLite as well as MySQL, whose cursor buffers the 
+            whole result set. With `missing=True` only records where 
+            at least one of the `obs_types` is NULL in the archive 
+            table are read.
+        """
+        if obs_types is None:
+            obs_types = GTSType.PSYCHROMETRIC_TYPES
+        __idx = [GTSType.PSYCHROMETRIC_TYPES.index(x) for x in obs_types]
+        if method is None: method = self.svp_method
+        __chunk_size = max(int(chunk_size),1)
+        __missing = ()
+        if missing:
+            __missing = tuple(x for x in obs_types if x in db_manager.sqlkeys)
+            # no column in the archive table, nothing to fill in
+            if not __missing: return
+        __ids = (db_manager.table_name,('usUnits','outTemp','outHumidity','pressure'),__missing)
+        # converters per unit system of the records
+        __converters = dict()
+        __start, __stop = timespan[0], timespan[1]
+        while True:
+            __rows = list(gtsquery.genSql(db_manager,'records_page',__ids,
+                                          (__start,__stop,__chunk_size)))
+            if not __rows: break
+            __chunk = []
+            for _result in __rows:
+                __conv = __converters.get(_result[1])
+                if __conv is None:
+                    __in, __out = self.get_psychrometric_converters(_result[1])
+                    if unit_system is None or unit_system==_result[1]:
+                        __funcs = [__out[x][0] for x in obs_types]
+                        __us = _result[1]
+                    else:
+                        __funcs = [get_std_unit_converter(
+                                       GTSType.PSYCHROMETRIC_UNITS[x][0],
+                                       GTSType.PSYCHROMETRIC_UNITS[x][1],
+                                       unit_system)[0] for x in obs_types]
+                        __us = unit_system
+                    __conv = __converters.setdefault(_result[1],(__in,__funcs,__us))
+                __vals = self.psychrometric_values(_result[2],_result[3],
+                                _result[4],__conv[0],method)
+                __record = {'usUnits':__conv[2]}
+                for __obs_type,__func,__i in zip(obs_types,__conv[1],__idx):
+                    __record[__obs_type] = __func(__vals[__i])
+                __chunk.append((_result[0],__record))
+            yield __chunk
+            if len(__rows)<__chunk_size: break
+            __start = __rows[-1][0]
+        
+        
+    def new_archive_record(self, record, db_manager=None):
+        """ update the running values by a new archive record """
+        self.et_accumulator.add_record(record)
+        # The new record is not saved to the database yet. So this
+        # adds the records up to the previous one.
+        if db_manager is not None:
+            __c = self.get_partition(db_manager).coverage
+            if __c is not None: __c.add_record(record)
+            __table = self.get_energy_table(db_manager)
+            if __table is not None: __table.sync(db_manager,self.energy_sync_chunks)
+            self.close_day(record,db_manager)
+        
+        
+    def close_day(self, record, db_manager):
+        """ precalculate the values of the LMT day before `record`
+            when `record` is the first one of a new LMT day
+            
+            The values are GTS, the GDD integrals calculated so far,
+            and the minimum, maximum and average of `outTemp` of the
+            day. So later reads are lookups instead of database 
+            queries.
+            
+            `record` is not saved to the database yet. So a day is 
+            complete if `record` is after its end.
+        """
+        try:
+            __ts = record['dateTime']
+        except (LookupError,TypeError):
+            return
+        _soy_ts = startOfYearTZ(__ts,self.lmt_tz)
+        _sod_ts = startOfDayTZ(__ts,_soy_ts)
+        # A record at midnight belongs to the day before. So that day
+        # is not complete before the next record.
+        if _sod_ts==__ts: _sod_ts -= 86400
+        __p = self.get_partition(db_manager)
+        if __p.closed_day_ts is not None and _sod_ts<=__p.closed_day_ts: return
+        __p.closed_day_ts = _sod_ts
+        try:
+            # minimum, maximum and average of the day
+            self.calc_lmt_day_stats(_sod_ts-86400,db_manager)
+            # GTS up to the end of the day
+            self.calc_gts(_soy_ts,db_manager)
+            # GDD integrals up to the end of the day
+            self.extend_GDD_prefix(db_manager)
+        except (weedb.DatabaseError,weewx.CannotCalculate) as e:
+            logerr("could not precalculate LMT day values: %s %s" % (e.__class__.__name__,e))
+            
+            
+    def query_lmt_day_stats(self, sod_ts, days, db_manager):
+        """ minimum, maximum and average of all the temperature columns
+            of the LMT days starting at sod_ts by one grouped query
+            
+            Returns a dict of {start of day: {obs_type: (min,max,avg)}}.
+            Days without records or with mixed unit systems are missing.
+        """
+        __obs_types = [x for x in self.temperature_obs_types if x in db_manager.sqlkeys]
+        if not __obs_types: return dict()
+        __units = {x:weewx.units.getStandardUnitType(db_manager.std_unit_system,x,'avg') for x in __obs_types}
+        __stats = dict()
+        # Each day is (start, start+86400].
+        for _row in gtsquery.genSql(db_manager,'day_stats',
+                (db_manager.table_name,tuple(__obs_types)),
+                (sod_ts+1,86400,sod_ts,sod_ts+days*86400)):
+            if _row[-2]!=_row[-1] or _row[-1]!=db_manager.std_unit_system: continue
+            __stats[sod_ts+int(_row[0])*86400] = {
+                x:tuple(weewx.units.ValueTuple(y,*__units[x]) for y in _row[1+3*i:4+3*i])
+                for i,x in enumerate(__obs_types)}
+        return __stats
+        
+        
+    def calc_lmt_day_stats(self, sod_ts, db_manager, days=1):
+        """ minimum, maximum and average of the temperature columns 
+            of the LMT days starting at sod_ts
+        """
+        __stats = self.query_lmt_day_stats(sod_ts,days,db_manager)
+        if not __stats: return
+        __p = self.get_partition(db_manager)
+        # The engine thread and the warm-up thread both get here.
+        with __p.day_stats_lock:
+            __p.lmt_day_stats.update(__stats)
+            # forget the oldest days
+            if len(__p.lmt_day_stats)>__p.max_day_stats:
+                for __k in sorted(__p.lmt_day_stats)[:-__p.max_day_stats]:
+                    __p.lmt_day_stats.pop(__k,None)
+            
+            
+    def get_lmt_day_stats(self, obs_type, timespan, aggregate_type, db_manager):
+        """ get the precalculated aggregate of a complete LMT day or None """
+        if timespan[1]-timespan[0]!=86400: return None
+        __x = self.get_partition(db_manager).lmt_day_stats.get(timespan[0],{}).get(obs_type)
+        if __x is None: return None
+        return __x[('min','max','avg').index(aggregate_type)]
+        
+            
+    def get_energy_table(self, db_manager):
+        """ get the daily energy integrals table of the database """
+        if not self.energy_integral_table: return None
+        __key = (db_manager.database_name,db_manager.table_name)
+        __table = self.energy_tables.get(__key)
+        if __table is None:
+            __table = self.energy_tables.setdefault(__key,EnergyIntegralTable(db_manager.table_name))
+        return __table
+        
+        
+    def get_partition(self, db_manager):
+        """ get the cached values of the database """
+        __key = (db_manager.database_name,db_manager.table_name)
+        __p = self.partitions.get(__key)
+        if __p is None:
+            # room for the GDD integrals of all the temperature columns
+            __p = self.partitions.setdefault(__key,GTSPartition(
+                    max_gdd_prefix=max(32,8*len(self.temperature_obs_types))))
+        return __p
+        
+        
+    def get_coverage(self, db_manager):
+        """ get the per-day bitmaps of the available data of the 
+            database, including the records saved so far
+            
+            Returns None if the bitmaps cannot be used.
+        """
+        __p = self.get_partition(db_manager)
+        __c = __p.coverage
+        if __c is None:
+            __c = __p.coverage = DataCoverage(self.lmt_tz,self.temperature_obs_types)
+        return __c if __c.sync(db_manager) else None
+        
+        
+    def get_boiling_function(self, algorithm):
+        """ get the function to calculate the boiling temperature in °C
+            out of the air pressure in hPa
+        """
+        if algorithm=='CC':
+            return boilingTemperatureCC
+        if algorithm=='GG':
+            return self.boiling_gg
+        raise ValueError("unknown boiling temperature algorithm '%s'" % algorithm)
+        
+        
+    def __calc_gts(self, soy_ts, db_manager, stats=None):
         """ calculate GTS and GTSdate for the year of soy_ts 
         
             soy_ts must be Jan 1st 00:00:00 of the year the values
             are to be calculated for
             
+            All the GTS profiles are calculated in the same loop out
+            of the same daily averages.
+            
+            stats are the daily values read by `query_lmt_day_stats()`
+            before, if any.
         """
         
+        __p = self.get_partition(db_manager)
+        
         # We need the year from Jan 1st on to calculate something.
         if not db_manager.first_timestamp: return
-        if soy_ts<db_manager.first_timestamp: return
+        __coverage = self.get_coverage(db_manager)
+        if __coverage is not None:
+            # Are there records up to Jan 1st 00:00?
+            if not __coverage.count('dateTime',__coverage.base,soy_ts): return
+        elif soy_ts<db_manager.first_timestamp: return
         # If the timestamp is far in future, there is nothing to calculate.
         if soy_ts>time.time(): return
         
         #loginf("calculate GTS for the year %s" % time.strftime("%Y",time.localtime(soy_ts)))
         
+        # number of days up to the latest cutoff of all the profiles
+        __days = max(x.days for x in self.gts_profiles.values())
+        
         # this year or a past year
         __this_year = (-1 <= (soy_ts-startOfYearTZ(db_manager.last_timestamp,self.lmt_tz)) <= 1) or soy_ts>db_manager.last_timestamp
         
@@ -385,11 +1739,11 @@ class GTSType(weewx.xtypes.XType):
             # this year: calculate until today
             _sod_ts=startOfDayTZ(time.time(),soy_ts)
             #loginf("this year %s" % time.strftime("%Y-%m-%d",time.localtime(_sod_ts)))
-            if soy_ts not in self.gts_values:
+            if soy_ts not in __p.gts_values:
                 # no value calculated for this year so far --> initialize
-                self.last_gts_date=soy_ts
-                self.gts_value=0
-                self.gts_values[soy_ts]=[None]*151
+                __p.last_gts_date=soy_ts
+                __p.gts_value={x:0 for x in self.gts_profiles}
+                self.__new_gts_year(__p,soy_ts)
                 try:
                     loginf("GTS initialized %s" %
                        datetime.datetime.fromtimestamp(soy_ts,None).strftime("%Y-%m-%d %H:%M:%S %Z"))
@@ -397,20 +1751,20 @@ class GTSType(weewx.xtypes.XType):
                 except Exception:
                     pass
             # get the last values calculated for this year
-            __ts=self.last_gts_date
-            __gts=self.gts_value
+            __ts=__p.last_gts_date
+            __gts=dict(__p.gts_value)
         else:
             # other year: calculate until end of May
-            if soy_ts in self.gts_values:
+            if soy_ts in __p.gts_values:
                 # values of the given year are already calculated
                 # nothing to do
                 return
-            # calculate from Jan 1st to May 31st
-            _sod_ts=soy_ts+13046400
+            # calculate from Jan 1st to May 31st (or the latest cutoff)
+            _sod_ts=soy_ts+__days*86400
             loginf("other year %s" % time.strftime("%Y-%m-%d",time.localtime(_sod_ts)))
-            self.gts_values[soy_ts]=[None]*151
+            self.__new_gts_year(__p,soy_ts)
             __ts=soy_ts
-            __gts=0
+            __gts={x:0 for x in self.gts_profiles}
             
         # needed timestamps
         # Note: Without '+1' archiveYearSpan() returns the previous year,
@@ -422,6 +1776,7 @@ class GTSType(weewx.xtypes.XType):
         _feb_ts=_soy_ts+2678400 # Feb 1
         _mar_ts=_feb_ts+2419200 # Mar 1 (or Feb 29 in leap year)
         _end_ts=_mar_ts+7948800 # Jun 1 (or May 31 in leap year)
+        _last_ts=_soy_ts+__days*86400 # end of the longest profile
         
         # debugging output
         if __ts<_sod_ts:
@@ -432,33 +1787,58 @@ class GTSType(weewx.xtypes.XType):
                         time.strftime("%d.%m.",time.localtime(_mar_ts)),
                         time.strftime("%d.%m.",time.localtime(_end_ts))))
         
+        # daily averages of all the temperature columns needed by the
+        # profiles by one query if there is more than one day to do
+        __obs_types = list(collections.OrderedDict.fromkeys(x.obs_type for x in self.gts_profiles.values()))
+        __stop_ts = min(_sod_ts,_last_ts)
+        __stats = stats if stats is not None else dict()
+        if stats is None and __stop_ts-__ts>86400:
+            try:
+                __stats = self.query_lmt_day_stats(__ts,int((__stop_ts-__ts)//86400),db_manager)
+            except weedb.DatabaseError as e:
+                logerr("GTS: could not read daily averages: %s %s" % (e.__class__.__name__,e))
+        
         # calculate
         # This runs one loop for every day since New Year at program 
         # start and after that once a day one loop, only. After May 31st
         # no loop is executed.
         _loop_ct=0
-        while __ts < _sod_ts and __ts < _end_ts:
+        while __ts < _sod_ts and __ts < _last_ts:
             # the day the average is calculated for
             _today = TimeSpan(__ts,__ts+86400)
-            # calculate the average of the outside temperature
-            _result = weewx.xtypes.get_aggregate('outTemp',_today,'avg',db_manager)
-            # convert to centrigrade
-            if _result is not None:
-                _result = weewx.units.convert(_result,'degree_C')
+            # calculate the average of the temperatures
+            __dayavg = dict()
+            for __obs_type in __obs_types:
+                _result = self.get_lmt_day_stats(__obs_type,_today,'avg',db_manager)
+                if _result is None and __ts in __stats:
+                    _result = __stats[__ts].get(__obs_type,(None,None,None))[2]
+                # no need to ask the database about a day without data
+                if (_result is None and __coverage is not None and 
+                        __coverage.covered(__obs_type,__ts) is False):
+                    continue
+                if _result is None:
+                    _result = weewx.xtypes.get_aggregate(__obs_type,_today,'avg',db_manager)
+                # convert to centrigrade
+                if _result is not None and _result[0] is not None:
+                    __dayavg[__obs_type] = get_unit_converter(_result[1],'degree_C')(_result[0])
             # check condition and add to sum
-            if _result is not None and _result[0] is not None:
-                _dayavg = _result[0]
-                if _dayavg > 0:
-                    if __ts < _feb_ts:
-                        _dayavg *= 0.5
-                    elif __ts < _mar_ts:
-                        _dayavg *= 0.75
-                    logdbg("loop no. %s, day value %s" % (_loop_ct,_dayavg))
-                    __gts += _dayavg
-                    if __gts >= 200 and soy_ts not in self.gts_date:
-                        self.gts_date[soy_ts] = __ts
-                # save the value for subsequent calls
-                self.gts_values[soy_ts][dayOfGTSYear(__ts,_soy_ts)]=__gts
+            if __dayavg:
+                __day = dayOfGTSYear(__ts,_soy_ts,__days)
+                logdbg("loop no. %s, day value %s" % (_loop_ct,__dayavg))
+                for __profile in self.gts_profiles.values():
+                    # after the cutoff of this profile
+                    if __day>=__profile.days: continue
+                    # no value of this day
+                    if __profile.obs_type not in __dayavg: continue
+                    __name = __profile.name
+                    _dayavg = __dayavg[__profile.obs_type]
+                    if _dayavg > 0:
+                        __gts[__name] += _dayavg*__profile.weights[__day]
+                        if (__gts[__name] >= __profile.threshold and 
+                                        __name not in __p.gts_date[soy_ts]):
+                            __p.gts_date[soy_ts][__name] = __ts
+                    # save the value for subsequent calls
+                    __p.gts_values[soy_ts][__name][__day]=__gts[__name]
             # logging
             #__mday=_loop_ct+1 if __ts<_feb_ts else _loop_ct-30
             #__vv=_result[0] if not None and _result[0] is not None else None
@@ -471,48 +1851,66 @@ class GTSType(weewx.xtypes.XType):
         # (This happens after the start of WeeWX and later on at
         # the beginning of a new day.)
         if _loop_ct>0:
-            loginf("GTS %s, %s loops" % (__gts,_loop_ct))
+            loginf("GTS %s, %s loops" % (__gts['GTS'],_loop_ct))
 
             if __this_year:
                 # remember the date and value of the last calculation
                 # to continue calculation on the next day
                 # Note: this value is used for $current.GTS
-                self.gts_value=__gts
-                self.last_gts_date=__ts
+                __p.gts_value=__gts
+                __p.last_gts_date=__ts
 
             
-    def calc_gts(self, soy_ts, db_manager):
+    def __new_gts_year(self, partition, soy_ts):
+        """ add the arrays of the year soy_ts to the partition and 
+            forget the oldest other years if there are too many
+            (lock of the partition must be held)
+        """
+        __p = partition
+        __p.gts_values[soy_ts]={x.name:[None]*x.days for x in self.gts_profiles.values()}
+        __p.gts_date[soy_ts]={}
+        if len(__p.gts_values)>__p.max_gts_years:
+            # The year of `last_gts_date` is the latest one and kept
+            # like the year just added.
+            for __k in [x for x in sorted(__p.gts_values) if x!=soy_ts][:len(__p.gts_values)-__p.max_gts_years]:
+                __p.gts_values.pop(__k,None)
+                __p.gts_date.pop(__k,None)
+    
+    
+    def calc_gts(self, soy_ts, db_manager, stats=None):
         """ lock against parallel calls to that funtion and calculate GTS """
+        __p = self.get_partition(db_manager)
         try:
-            self.lock.acquire()
-            self.__calc_gts(soy_ts,db_manager)
+            __p.lock.acquire()
+            self.__calc_gts(soy_ts,db_manager,stats)
         finally:
-            self.lock.release()
+            __p.lock.release()
     
     
-    def get_gts(self, obs_type, sod_ts, soy_ts):
-        """ read GTS value out of the array """
+    def get_gts(self, obs_type, sod_ts, soy_ts, partition):
+        """ read GTS value out of the array of the partition """
+        __p = partition
+        
+        if obs_type not in self.gts_types:
+            # unknown type (should not happen here)
+            raise weewx.UnknownType(obs_type)
+        __profile,__isdate = self.gts_types[obs_type]
     
-        if obs_type=='GTS':
+        if not __isdate:
             # Gruenlandtemperatursumme GTS
             try:
-                if soy_ts is None or soy_ts not in self.gts_values:
+                if soy_ts is None or soy_ts not in __p.gts_values:
                     __x = None
                 else:
-                    __x = self.gts_values[soy_ts][dayOfGTSYear(sod_ts,soy_ts)]
+                    __x = __p.gts_values[soy_ts][__profile.name][dayOfGTSYear(sod_ts,soy_ts,__profile.days)]
                 return weewx.units.ValueTuple(__x,'degree_C_day','group_degree_day')
             except (ValueError,TypeError,IndexError,KeyError):
                 logerr("soy_ts=%s sod_ts=%s" % (soy_ts,sod_ts))
                 raise weewx.CannotCalculate(obs_type)
-        elif obs_type=='GTSdate':
-            # date of value 200
-            if soy_ts is None or soy_ts not in self.gts_date:
-                return weewx.units.ValueTuple(None,'unix_epoch','group_time')
-            else:
-                return weewx.units.ValueTuple(self.gts_date[soy_ts],'unix_epoch','group_time')
         else:
-            # unknown type (should not happen here)
-            raise weewx.UnknownType(obs_type)
+            # date of value 200
+            __x = __p.gts_date.get(soy_ts,{}).get(__profile.name)
+            return weewx.units.ValueTuple(__x,'unix_epoch','group_time')
 
 
     def get_scalar(self, obs_type, record, db_manager, **option_dict):
@@ -537,66 +1935,18 @@ class GTSType(weewx.xtypes.XType):
                 
         # saturation vapor pressure, actual vapar pressure, mixing ratio,
         # and absolute humidity
-        if obs_type in ('outSVP','outVaporP','outHumAbs','outMixingRatio',
-                        'outEquiTemp','outThetaE'):
-            #_result = weewx.xtypes.get_scalar('outTemp',record,db_manager)
-            try:
-                # If record is None or `outTemp` not in record, then
-                # a ValueTuple with the value of None is returned
-                _result = weewx.units.as_value_tuple(record,'outTemp')
-                # If _result represents a value of None, temp_C is None, too.
-                temp_C = weewx.units.convert(_result,'degree_C')[0]
-                method = option_dict.get('method',self.svp_method)
-                if obs_type=='outSVP':
-                    # saturation vapor pressure
-                    svp = weewx.uwxutils.TWxUtils.SaturationVaporPressure(temp_C,method)
-                else:
-                    _result = weewx.units.as_value_tuple(record,'outHumidity')
-                    hum = weewx.units.convert(_result,'percent')[0]
-                    if obs_type in ['outVaporP','outHumAbs']:
-                        # actual vapor pressure
-                        svp = weewx.uwxutils.TWxUtils.ActualVaporPressure(temp_C,hum,method)
-                        # absolute humidity
-                        if obs_type=='outHumAbs' and svp is not None:
-                            svp = svp / 4.6152 / (temp_C+273.15) * 1e9
-                    else:
-                        # MixingRatio
-                        _result = weewx.units.as_value_tuple(record,'pressure')
-                        p = weewx.units.convert(_result,'hPa')[0]
-                        svp = weewx.uwxutils.TWxUtils.MixingRatio(p,temp_C,hum)
-                        if obs_type!='outMixingRatio':
-                            # equivalent temperature
-                            r = svp*1e-3
-                            L = 2500.78 - 2.325734 * temp_C
-                            svp = temp_C+r*(L/(1.00482+r*4.18674))
-                            if obs_type=='outThetaE':
-                                # equivalent potential temperature
-                                svp = (svp+273.15)*((1000/p)**(287.05/1004.82))-273.15
-            except (LookupError,TypeError):
-                svp = None
-            if obs_type=='outHumAbs':
-                __unit = 'microgram_per_meter_cubed'
-                __unitgroup = 'group_concentration'
-            elif obs_type=='outMixingRatio':
-                __unit = 'gram_per_kilogram'
-                __unitgroup = 'group_mixingratio'
-            elif obs_type in ('outEquiTemp','outThetaE'):
-                __unit = 'degree_C'
-                __unitgroup = 'group_temperature'
-            else:
-                __unit = 'hPa'
-                __unitgroup = 'group_pressure'
-            __x = weewx.units.ValueTuple(svp,__unit,__unitgroup)
-            if record is None: return __x
-            # see https://github.com/weewx/weewx/issues/781
-            return weewx.units.convertStd(__x,record['usUnits'])
+        if obs_type in GTSType.PSYCHROMETRIC_UNITS:
+            method = option_dict.get('method',self.svp_method)
+            if record is None:
+                return weewx.units.ValueTuple(None,*GTSType.PSYCHROMETRIC_UNITS[obs_type])
+            return self.calc_psychrometrics(record,method)[obs_type]
         
         if obs_type=='boilingTemp':
             try:
                 _result = weewx.units.as_value_tuple(record,'pressure')
                 pressure_mbar = weewx.units.convert(_result,'hPa')[0]
-                method = option_dict.get('algorithm','CC')
-                btemp_C = boilingTemperatureCC(pressure_mbar)
+                method = option_dict.get('algorithm',self.boiling_algorithm)
+                btemp_C = self.get_boiling_function(method)(pressure_mbar)
                 usunits = record['usUnits']
             except (LookupError,TypeError,ValueError,ArithmeticError):
                 btemp_C = None
@@ -604,8 +1954,19 @@ class GTSType(weewx.xtypes.XType):
             __x = weewx.units.ValueTuple(btemp_C,'degree_C','group_temperature')
             return weewx.units.convertStd(__x,usunits)
                 
+        # time of the record the value of GTS, GTSdate, yearGDD, or
+        # seasonGDD is calculated for
+        if obs_type.endswith('lastUpdate') and obs_type[:-10] in self.refresh_types:
+            if self.refresher is not None and db_manager is not None:
+                __x = self.refresher.last_update(obs_type[:-10],db_manager,**option_dict)
+            else:
+                # calculated on request
+                __x = record.get('dateTime') if record is not None else None
+            return weewx.units.ValueTuple(__x,'unix_epoch','group_time')
+                
         # This functions handles 'GTS' and 'GTSdate'.
-        if obs_type not in ['GTS','GTSdate','dayET','ET24','yearGDD','seasonGDD']:
+        if (obs_type not in ['dayET','ET24','yearGDD','seasonGDD'] and
+                                          obs_type not in self.gts_types):
             raise weewx.UnknownType(obs_type)
         
         #if record is None:
@@ -619,6 +1980,14 @@ class GTSType(weewx.xtypes.XType):
                 self.db_manager_ok=False
             raise weewx.CannotCalculate("%s: no database reference" % obs_type)
 
+        # non-blocking mode: the last-good value if the calculation
+        # takes too long
+        if (self.refresher is not None and obs_type in self.refresh_types and
+                record is not None and 'dateTime' in record and
+                threading.current_thread() is not self.refresher):
+            __x = self.refresher.get(obs_type,record,db_manager,**option_dict)
+            if __x is not None: return __x
+
         #logdbg("obs_type=%s" % obs_type)
         
         # needed timestamps
@@ -644,9 +2013,13 @@ class GTSType(weewx.xtypes.XType):
                __x=weeutil.weeutil.TimeSpan(__x,_time_ts)
             except (ValueError,TypeError,IndexError):
                raise weewx.CannotCalculate("dayET: invalid time")
+            __val=self.et_accumulator.get(obs_type,_time_ts,db_manager)
+            if __val is not None: return __val
             return weewx.xtypes.get_aggregate('ET',__x,'sum',db_manager)
         
         if obs_type=='ET24':
+            __val=self.et_accumulator.get(obs_type,_time_ts,db_manager)
+            if __val is not None: return __val
             try:
                 __x=weeutil.weeutil.TimeSpan(_time_ts-86400,_time_ts)
             except:
@@ -687,6 +2060,7 @@ class GTSType(weewx.xtypes.XType):
         # (if record['dateTime'] is within the current year, the
         # value is calculated up to the current day (today))
         self.calc_gts(_soy_ts,db_manager)
+        __p = self.get_partition(db_manager)
         
         # growing degree days == Wachstumsgradtage
         # https://de.wikipedia.org/wiki/Wachstumsgradtag
@@ -695,7 +2069,7 @@ class GTSType(weewx.xtypes.XType):
             try:
                 # calculate from the beginning of the year up to the
                 # end of the current day
-                __start_ts = self.gts_date[_soy_ts]
+                __start_ts = __p.gts_date[_soy_ts]['GTS']
                 if __start_ts and _sod_ts>=__start_ts and _sod_ts<_soy_ts+26179200:
                     __timespan = TimeSpan(__start_ts,_sod_ts+86400)
                     return self.get_aggregate('outTemp',__timespan,'GDD',db_manager,**option_dict)
@@ -706,55 +2080,50 @@ class GTSType(weewx.xtypes.XType):
 
         # check if the requested timestamp record['dateTime'] is within
         # the current day (today)
-        # Note: After self.calc_gts() is run, self.last_gts_date
+        # Note: After self.calc_gts() is run, __p.last_gts_date
         #       points to the beginning of the current day, if 
         #       record['dateTime'] is within the current year.
         #       if record['dateTime'] is _not_ within the current
-        #       year, self.last_gts_date _may_ be None. 
+        #       year, __p.last_gts_date _may_ be None. 
         if record is None:
             # record is not provided, we assume the actual time
             # Note: That should not happen but does due to a bug in
             #       Belchertown skin
-            if _sod_ts!=self.last_gts_date:
+            if _sod_ts!=__p.last_gts_date:
                 raise weewx.CannotCalculate("%s: no record" % obs_type)
             __today=True
-        elif self.last_gts_date is None or self.gts_value is None:
+        elif __p.last_gts_date is None or __p.gts_value is None:
             # The current year is not calculated so far, that means, 
             # record['dateTime'] cannot be within the current day (today).
             __today=False
-        elif _time_ts<=self.last_gts_date:
-            # record['dateTime'] is before self.last_gts_date.
-            # As self.last_gts_date points to the beginning of
+        elif _time_ts<=__p.last_gts_date:
+            # record['dateTime'] is before __p.last_gts_date.
+            # As __p.last_gts_date points to the beginning of
             # the current day, that means, record['dateTime'] is not 
             # the current day (today).
             __today=False
         else:
             # record['dateTime'] is after the beginning of the
             # current day. If it is additionally before
-            # self.last_gts_date+86400 (1d after), it is within
+            # __p.last_gts_date+86400 (1d after), it is within
             # the current day (today).
-            __today=_time_ts<=self.last_gts_date+86400
+            __today=_time_ts<=__p.last_gts_date+86400
 
         # get the result
         if __today:
             # current value
-            if obs_type=='GTS':
+            __profile,__isdate = self.gts_types[obs_type]
+            if not __isdate:
                 # current GTS value
                 __x=weewx.units.ValueTuple(
-                            self.gts_value,'degree_C_day','group_degree_day')
-            elif obs_type=='GTSdate':
+                            __p.gts_value[__profile.name],'degree_C_day','group_degree_day')
+            else:
                 # current GTSdate value or None, if GTS<200
-                if _soy_ts in self.gts_date:
-                    __x=self.gts_date[_soy_ts]
-                else:
-                    __x=None
+                __x=__p.gts_date.get(_soy_ts,{}).get(__profile.name)
                 __x=weewx.units.ValueTuple(__x,'unix_epoch','group_time')
-            else:
-                # should not occure
-                raise weewx.CannotCalculate(obs_type)
         else:
             # value from memory
-            __x=self.get_gts(obs_type,_sod_ts,_soy_ts)
+            __x=self.get_gts(obs_type,_sod_ts,_soy_ts,__p)
         """
         try:
           a=str(__x[0])
@@ -788,11 +2157,9 @@ class GTSType(weewx.xtypes.XType):
         """
 
         try:
-            _result = db_manager.getSql(
-                    "SELECT SUM(%s*`interval`)/60.0, "
-                    "MIN(usUnits),MAX(usUnits) FROM %s "
-                    "WHERE dateTime>? AND dateTime<=?"
-                    % (obs_type,db_manager.table_name),timespan)
+            _result = self.get_energy_integral(obs_type,timespan,db_manager)
+            if _result is None:
+                _result = self.__radiation_integral_sql(obs_type,timespan,db_manager)
             if _result is None:
                 raise weewx.CannotCalculate("calculate energy: no %s data in database" % obs_type)
             # get the unit system
@@ -843,32 +2210,148 @@ class GTSType(weewx.xtypes.XType):
         return None
 
 
+    @staticmethod
+    def __radiation_integral_sql(obs_type, timespan, db_manager):
+        """ SUM(obs_type*interval)/60, MIN(usUnits), MAX(usUnits) """
+        return gtsquery.getSql(db_manager,'radiation_integral',
+                    (db_manager.table_name,obs_type),timespan)
+        
+        
+    def get_energy_integral(self, obs_type, timespan, db_manager):
+        """ SUM(obs_type*interval)/60, MIN(usUnits), MAX(usUnits)
+            out of the daily energy integrals table for the whole days
+            and out of the archive for the partial days at the edges
+            
+            returns None if the table cannot be used
+            
+            The table is updated by `new_archive_record()` only. The
+            days it does not include yet are read from the archive.
+        """
+        __table = self.get_energy_table(db_manager)
+        if __table is None: return None
+        __x = __table.get(obs_type,timespan,db_manager)
+        if __x is None: return None
+        _result, __span = __x
+        __parts = [_result]
+        if timespan[0]<__span[0]:
+            __parts.append(self.__radiation_integral_sql(obs_type,TimeSpan(timespan[0],__span[0]),db_manager))
+        if __span[1]<timespan[1]:
+            __parts.append(self.__radiation_integral_sql(obs_type,TimeSpan(__span[1],timespan[1]),db_manager))
+        __vals = [x[0] for x in __parts if x is not None and x[0] is not None]
+        __mins = [x[1] for x in __parts if x is not None and x[1] is not None]
+        __maxs = [x[2] for x in __parts if x is not None and x[2] is not None]
+        return (math.fsum(__vals) if __vals else None,
+                min(__mins) if __mins else None,
+                max(__maxs) if __maxs else None)
+        
+        
+    @staticmethod
+    def __GDD_integral_sql(obs_type, start_ts, stop_ts, db_manager, base_t, limit_t, stop_t):
+        """ get the growing degree days integral over (start_ts, stop_ts]
+            and MIN(usUnits), MAX(usUnits) out of the database
+        """
+        return GTSType.__GDD_integrals_sql([obs_type],start_ts,stop_ts,db_manager,base_t,limit_t,stop_t)[obs_type]
+    
+    
+    @staticmethod
+    def __GDD_integrals_sql(obs_types, start_ts, stop_ts, db_manager, base_t, limit_t, stop_t):
+        """ get the growing degree days integrals over (start_ts, stop_ts]
+            of several columns by one query
+            
+            Returns a dict of {obs_type: (integral,MIN(usUnits),MAX(usUnits))}
+        """
+        # maximum growing degree value
+        __gdlimit = limit_t - base_t
+        # The temperatures are rounded to 0.1 degree as they were
+        # when formatted into the SQL text.
+        __args = (round(stop_t,1),round(limit_t,1),round(__gdlimit,1),
+                  round(base_t,1),round(base_t,1))
+        # query data base and calculate integral
+        _result = gtsquery.getSql(db_manager,'gdd_integrals',
+                    (db_manager.table_name,tuple(obs_types)),
+                    __args*len(obs_types)+(start_ts,stop_ts))
+        if _result is None: return {x:None for x in obs_types}
+        return {x:(_result[i],_result[-2],_result[-1]) for i,x in enumerate(obs_types)}
+    
+    
+    @staticmethod
+    def __add_GDD_integrals(x, y):
+        """ add two results of __GDD_integral_sql() """
+        if x is None: return y
+        if y is None: return x
+        if x[0] is None:
+            __sum = y[0]
+        elif y[0] is None:
+            __sum = x[0]
+        else:
+            __sum = x[0]+y[0]
+        __units = [z for z in (x[1],x[2],y[1],y[2]) if z is not None]
+        if not __units: return (__sum,None,None)
+        return (__sum,min(__units),max(__units))
+    
+    
+    def extend_GDD_prefix(self, db_manager):
+        """ add the complete LMT days to the saved GDD integrals """
+        __p = self.get_partition(db_manager)
+        __closed_ts = __p.closed_day_ts
+        with __p.gdd_lock:
+            __items = list(__p.gdd_prefix.items())
+        # The integrals of all the columns with the same start, 
+        # parameters, and end of the saved part are extended by 
+        # one query.
+        __groups = collections.OrderedDict()
+        for __k,__v in __items:
+            if __v[0]>=__closed_ts: continue
+            __groups.setdefault((__v[0],)+__k[1:],[]).append((__k,__v))
+        for __g,__entries in __groups.items():
+            _results = GTSType.__GDD_integrals_sql([x[0][0] for x in __entries],__g[0],__closed_ts,db_manager,*__g[2:])
+            with __p.gdd_lock:
+                for __k,__v in __entries:
+                    if __k in __p.gdd_prefix:
+                        __p.gdd_prefix[__k] = (__closed_ts,)+GTSType.__add_GDD_integrals(__v[1:],_results[__k[0]])
+        
+        
     def calc_GDD_integral(self,obs_type,timespan,db_manager,base_t,limit_t,stop_t):
-        """ calculate growing degree days as integral over time"""
+        """ calculate growing degree days as integral over time
+        
+            The integral up to the end of the last complete LMT day
+            is saved and extended by close_day(). So only the records
+            of the current day are to be read on subsequent calls
+            with the same start of timespan.
+        """
         try:
             # make sure limit_t and stop_t are not None
             if not limit_t: limit_t = 1000.0
             if not stop_t: stop_t = 1000.0
             logdbg("GDD integral base=%s limit=%s stop=%s" % (base_t,limit_t,stop_t))
-            # maximum growing degree value
-            __gdlimit = limit_t - base_t
-            # query data base and calculate integral
-            _result = db_manager.getSql(
-                           'SELECT sum('
-                           '  CASE'
-                           '    WHEN `%s`>%.1f THEN 0.0'
-                           '    WHEN `%s`>%.1f THEN %.1f'
-                           '    WHEN `%s`<%.1f THEN 0.0'
-                           '    ELSE `%s`-%.1f'
-                           '  END*`interval`/1440.0),'
-                           '  MIN(usUnits),MAX(usUnits) '
-                           'FROM %s '
-                           'WHERE dateTime>? AND dateTime<=?'
-                    % (obs_type,stop_t,
-                       obs_type,limit_t,__gdlimit,
-                       obs_type,base_t,
-                       obs_type,base_t,
-                       db_manager.table_name),timespan)
+            __p = self.get_partition(db_manager)
+            __key = (obs_type,timespan[0],base_t,limit_t,stop_t)
+            __closed_ts = __p.closed_day_ts
+            with __p.gdd_lock:
+                __prefix = __p.gdd_prefix.get(__key)
+            if __prefix is not None and __prefix[0]<=timespan[1]:
+                # saved integral and the records after it
+                _result = GTSType.__add_GDD_integrals(__prefix[1:],
+                    GTSType.__GDD_integral_sql(obs_type,__prefix[0],timespan[1],db_manager,base_t,limit_t,stop_t))
+            elif (__closed_ts is not None and 
+                  timespan[0]+172800<=__closed_ts<=timespan[1]):
+                # save the integral up to the end of the last complete
+                # day for later use, together with the integrals of 
+                # all the other temperature columns
+                __obs_types = [obs_type]+[x for x in self.temperature_obs_types if x!=obs_type and x in db_manager.sqlkeys]
+                __prefixes = GTSType.__GDD_integrals_sql(__obs_types,timespan[0],__closed_ts,db_manager,base_t,limit_t,stop_t)
+                __prefix = __prefixes[obs_type]
+                with __p.gdd_lock:
+                    for __obs_type in reversed(__obs_types):
+                        __k = (__obs_type,)+__key[1:]
+                        if __k in __p.gdd_prefix and __obs_type!=obs_type: continue
+                        __p.gdd_prefix[__k] = (__closed_ts,)+tuple(__prefixes[__obs_type])
+                    while len(__p.gdd_prefix)>__p.max_gdd_prefix:
+                        __p.gdd_prefix.popitem(last=False)
+                _result = GTSType.__add_GDD_integrals(__prefix,
+                    GTSType.__GDD_integral_sql(obs_type,__closed_ts,timespan[1],db_manager,base_t,limit_t,stop_t))
+            else:
+                _result = GTSType.__GDD_integral_sql(obs_type,timespan[0],timespan[1],db_manager,base_t,limit_t,stop_t)
             if _result is None:
                 raise weewx.CannotCalculate("calculate GDD: no temperature data in database")
             if _result[0] is not None:
@@ -905,7 +2388,9 @@ class GTSType(weewx.xtypes.XType):
             if method=='dayavg':
                 # method 'dayavg'
                 # Get avg temperature for the day as a value tuple
-                Tavg_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'avg', db_manager)
+                Tavg_t = self.get_lmt_day_stats(obs_type, daySpan, 'avg', db_manager)
+                if Tavg_t is None:
+                    Tavg_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'avg', db_manager)
                 # Make sure it's valid before including it in the aggregation:
                 if Tavg_t is not None and Tavg_t[0] is not None:
                     avg_t = Tavg_t[0]
@@ -915,9 +2400,13 @@ class GTSType(weewx.xtypes.XType):
                 # method 'hiloavgA' and 'hiloavgB'
                 # Get min and max temperature for the day as a value tuple
                 #loginf("a")
-                Tmax_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'max', db_manager)
+                Tmax_t = self.get_lmt_day_stats(obs_type, daySpan, 'max', db_manager)
+                if Tmax_t is None:
+                    Tmax_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'max', db_manager)
                 #loginf("b")
-                Tmin_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'min', db_manager)
+                Tmin_t = self.get_lmt_day_stats(obs_type, daySpan, 'min', db_manager)
+                if Tmin_t is None:
+                    Tmin_t = weewx.xtypes.get_aggregate(obs_type, daySpan, 'min', db_manager)
                 #loginf("c")
                 # Make sure it's valid before including it in the aggregation:
                 if Tmax_t is not None and Tmax_t[0] is not None and Tmin_t is not None and Tmin_t[0] is not None:
@@ -959,8 +2448,18 @@ class GTSType(weewx.xtypes.XType):
     
     
     def calc_derived(self, obs_type, timespan, aggregate_type, db_manager, **option_dict):
-        """ calculate aggreation of derived observation types """
+        """ calculate aggreation of derived observation types 
+        
+            The records are read by `iter_derived()`, so mixed unit 
+            systems are possible. The result is in the unit system of 
+            the database.
+        """
         try:
+            method = option_dict.get('method',self.svp_method)
+            __unitgroup = GTSType.PSYCHROMETRIC_UNITS[obs_type][1]
+            __unit = get_std_unit_converter(
+                GTSType.PSYCHROMETRIC_UNITS[obs_type][0],__unitgroup,
+                db_manager.std_unit_system)[1]
             if aggregate_type in ('min','mintime'):
                 val = 1e10
             elif aggregate_type in ('max','maxtime'):
@@ -969,42 +2468,30 @@ class GTSType(weewx.xtypes.XType):
                 val = 0.0
             n = 0
             valtime = None
-            _x = (None,None,None)
-            for _result in db_manager.genSql(
-                    "SELECT `dateTime`,`usUnits`,"
-                    "`outTemp`,`outHumidity`,`pressure` "
-                    "from %s WHERE dateTime>? AND dateTime<=? "
-                    "ORDER BY `dateTime`"
-                    % db_manager.table_name,timespan):
-                if _result is None:
-                    raise weewx.CannotCalculate("%s.%s: no data in database" % (obs_type,aggregate_type))
-                _rec = {
-                    'dateTime':_result[0],
-                    'usUnits':_result[1],
-                    'outTemp':_result[2],
-                    'outHumidity':_result[3],
-                    'pressure':_result[4]}
-                _x = self.get_scalar(obs_type, _rec, db_manager, **option_dict)
-                if _x[0] is not None: 
+            for _result in itertools.chain.from_iterable(self.iter_derived(
+                    timespan,db_manager,(obs_type,),method,
+                    db_manager.std_unit_system)):
+                _x = _result[1][obs_type]
+                if _x is not None: 
                     n += 1
                     if aggregate_type=='count':
                         pass
                     elif aggregate_type=='not_null':
                         break
                     elif aggregate_type in ('avg','sum'):
-                        val += _x[0]
+                        val += _x
                     elif aggregate_type=='rms':
-                        val += _x[0]*_x[0]
+                        val += _x*_x
                     elif aggregate_type in ('min','mintime'):
-                        if _x[0]<val: 
-                            val = _x[0]
+                        if _x<val: 
+                            val = _x
                             valtime = _result[0]
                     elif aggregate_type in ('max','maxtime'):
-                        if _x[0]>val: 
-                            val = _x[0]
+                        if _x>val: 
+                            val = _x
                             valtime = _result[0]
                     elif aggregate_type in ('last','lasttime','first','firsttime'):
-                        val = _x[0]
+                        val = _x
                         valtime = _result[0]
                         if aggregate_type in ('first','firsttime'):
                             break
@@ -1018,13 +2505,12 @@ class GTSType(weewx.xtypes.XType):
                 # mintime, maxtime, firsttime, lasttime
                 return weewx.units.ValueTuple(valtime,'unix_epoch','group_time')
             if n==0:
-                _x = self.get_scalar(obs_type, None, None, **option_dict)
-                val = _x[0]
+                val = None
             elif aggregate_type=='avg': 
                 val /= float(n)
             elif aggregate_type=='rms':
                 val = pow(val/float(n),0.5)
-            return weewx.units.ValueTuple(val,_x[1],_x[2])
+            return weewx.units.ValueTuple(val,__unit,__unitgroup)
         except weedb.OperationalError as e:
             raise weewx.CannotCalculate("%s.%s: Database OperationalError '%s'" % (obs_type,aggregate_type,e))
         except (weewx.UnknownType,weewx.UnknownAggregation,weewx.CannotCalculate):
@@ -1034,6 +2520,188 @@ class GTSType(weewx.xtypes.XType):
         return None
         
         
+    def calc_boiling_aggregate(self, timespan, aggregate_type, db_manager, **option_dict):
+        """ calculate aggregations of the boiling temperature 
+        
+            As the boiling temperature increases with the air pressure, 
+            minimum and maximum of the boiling temperature are the 
+            boiling temperatures at minimum and maximum pressure. So
+            the aggregation of the pressure can be used.
+        """
+        try:
+            func = self.get_boiling_function(option_dict.get('algorithm',self.boiling_algorithm))
+            if aggregate_type in ('mintime','maxtime','firsttime','lasttime','count','not_null'):
+                return weewx.xtypes.get_aggregate('pressure',timespan,aggregate_type,db_manager,**option_dict)
+            if aggregate_type in ('min','max','first','last'):
+                _result = weewx.xtypes.get_aggregate('pressure',timespan,aggregate_type,db_manager,**option_dict)
+                p = weewx.units.convert(_result,'hPa')[0]
+                val = func(p) if p is not None else None
+            elif aggregate_type=='avg':
+                _, _, _result = weewx.xtypes.get_series('pressure',timespan,db_manager,**option_dict)
+                vals = [func(p) for p in weewx.units.convert(_result,'hPa')[0] if p is not None]
+                val = sum(vals)/len(vals) if vals else None
+            else:
+                raise weewx.UnknownAggregation("boilingTemp undefined aggregation %s" % aggregate_type)
+        except (ValueError,TypeError,ArithmeticError,LookupError) as e:
+            raise weewx.CannotCalculate("boilingTemp.%s: %s" % (aggregate_type,e))
+        __x = weewx.units.ValueTuple(val,'degree_C','group_temperature')
+        return weewx.units.convertStd(__x,db_manager.std_unit_system)
+        
+        
+    def calc_boiling_series(self, timespan, db_manager, aggregate_type, aggregate_interval, **option_dict):
+        """ calculate a series of boiling temperatures out of a series of
+            air pressure readings
+            
+            For the aggregation 'avg' the boiling temperature of the
+            average pressure is used. As the boiling temperature is nearly
+            linear in pressure within the range of an aggregation interval,
+            the difference is negligible.
+        """
+        if aggregate_type in ('mintime','maxtime','firsttime','lasttime','count','not_null'):
+            return weewx.xtypes.get_series('pressure',timespan,db_manager,aggregate_type,aggregate_interval,**option_dict)
+        if aggregate_type not in (None,'min','max','avg','first','last'):
+            raise weewx.UnknownAggregation("boilingTemp undefined aggregation %s" % aggregate_type)
+        try:
+            func = self.get_boiling_function(option_dict.get('algorithm',self.boiling_algorithm))
+            start_vec, stop_vec, data_vec = weewx.xtypes.get_series(
+                'pressure',timespan,db_manager,aggregate_type,aggregate_interval,**option_dict)
+            vals = [func(p) if p is not None else None 
+                    for p in weewx.units.convert(data_vec,'hPa')[0]]
+        except (ValueError,TypeError,ArithmeticError,LookupError) as e:
+            raise weewx.CannotCalculate("boilingTemp series: %s" % e)
+        __x = weewx.units.ValueTuple(vals,'degree_C','group_temperature')
+        return start_vec, stop_vec, weewx.units.convertStd(__x,db_manager.std_unit_system)
+        
+        
+    def gen_et_running(self, obs_type, timespan, db_manager):
+        """ generate dayET or ET24 for every record within timespan
+        
+            yields (dateTime, interval, usUnits, value)
+            
+            One ordered scan over the database is done, starting 24 
+            hours before timespan for ET24 and at the beginning of the
+            archive day of the start of timespan for dayET, which can
+            be 25 hours before on the day DST ends. ET24 is calculated by a window 
+            function of the database if available (SQLite 3.28 or
+            MySQL 8.0 and above), otherwise by a sliding window in
+            Python, like dayET is by a running sum reset at the
+            beginning of each archive day.
+        """
+        if obs_type=='ET24' and self.sql_window_functions:
+            try:
+                _rows = list(gtsquery.genSql(db_manager,'et24_window',
+                    (db_manager.table_name,),
+                    (timespan.start-86400,timespan.stop,timespan.start)))
+                for _row in _rows:
+                    yield _row
+                return
+            except weedb.DatabaseError as e:
+                loginf("no window functions available, ET24 is calculated in Python: %s" % e)
+                self.sql_window_functions = False
+        if obs_type=='dayET':
+            __start = weeutil.weeutil.archiveDaySpan(timespan.start)[0]
+        else:
+            __start = timespan.start-86400
+        __records = collections.deque()
+        __sum = 0.0
+        __count = 0
+        __day = None
+        for _result in gtsquery.genSql(db_manager,'records',
+                (db_manager.table_name,('interval','usUnits','ET')),
+                (__start,timespan.stop)):
+            _ts = _result[0]
+            _et = _result[3]
+            if obs_type=='dayET':
+                if __day is None or _ts>__day.stop:
+                    __day = weeutil.weeutil.archiveDaySpan(_ts)
+                    __sum = 0.0
+                    __count = 0
+            else:
+                while __records and __records[0][0]<=_ts-86400:
+                    _, __et = __records.popleft()
+                    __sum -= __et
+                    __count -= 1
+                if _et is not None:
+                    __records.append((_ts,_et))
+            if _et is not None:
+                __sum += _et
+                __count += 1
+            if _ts>timespan.start:
+                yield _result[0],_result[1],_result[2],__sum if __count else None
+        
+        
+    def calc_et_series(self, obs_type, timespan, db_manager, aggregate_type, aggregate_interval):
+        """ series of dayET or ET24 
+        
+            Without aggregation there is one value per record. Otherwise
+            the values are aggregated over the intervals of length
+            aggregate_interval.
+        """
+        if aggregate_type not in (None,'first','last','min','max','avg'):
+            raise weewx.UnknownAggregation("%s undefined aggregation %s" % (obs_type,aggregate_type))
+        start_vec = []
+        stop_vec = []
+        data_vec = []
+        __usUnits = None
+        try:
+            _rows = self.gen_et_running(obs_type,timespan,db_manager)
+            if aggregate_type:
+                __spans = weeutil.weeutil.intervalgen(timespan.start,timespan.stop,aggregate_interval)
+                __span = next(__spans,None)
+                __vals = []
+                def __aggregate(vals):
+                    if not vals: return None
+                    if aggregate_type=='first': return vals[0]
+                    if aggregate_type=='last': return vals[-1]
+                    if aggregate_type=='min': return min(vals)
+                    if aggregate_type=='max': return max(vals)
+                    return sum(vals)/len(vals)
+            for _ts,_interval,_usUnits,_val in _rows:
+                if __usUnits is None:
+                    __usUnits = _usUnits
+                elif __usUnits!=_usUnits:
+                    raise weewx.UnsupportedFeature("Unit type cannot change within a series.")
+                if aggregate_type:
+                    while __span is not None and _ts>__span.stop:
+                        start_vec.append(__span.start)
+                        stop_vec.append(__span.stop)
+                        data_vec.append(__aggregate(__vals))
+                        __vals = []
+                        __span = next(__spans,None)
+                    if __span is None: break
+                    if _val is not None: __vals.append(_val)
+                else:
+                    start_vec.append(_ts-_interval*60)
+                    stop_vec.append(_ts)
+                    data_vec.append(_val)
+            if aggregate_type:
+                # the remaining intervals up to the last record
+                while __span is not None and db_manager.last_timestamp is not None and __span.start<db_manager.last_timestamp:
+                    start_vec.append(__span.start)
+                    stop_vec.append(__span.stop)
+                    data_vec.append(__aggregate(__vals))
+                    __vals = []
+                    __span = next(__spans,None)
+        except weedb.OperationalError as e:
+            raise weewx.CannotCalculate("%s series: Database OperationalError '%s'" % (obs_type,e))
+        if __usUnits is None: __usUnits = db_manager.std_unit_system
+        _unit,_group = weewx.units.getStandardUnitType(__usUnits,'ET','sum')
+        return (weewx.units.ValueTuple(start_vec,'unix_epoch','group_time'),
+                weewx.units.ValueTuple(stop_vec,'unix_epoch','group_time'),
+                weewx.units.ValueTuple(data_vec,_unit,_group))
+        
+        
+    def get_series(self, obs_type, timespan, db_manager, aggregate_type=None, aggregate_interval=None, **option_dict):
+        """ series of observation types that can be calculated more
+            efficiently than by one get_scalar() call per record
+        """
+        if obs_type=='boilingTemp':
+            return self.calc_boiling_series(timespan,db_manager,aggregate_type,aggregate_interval,**option_dict)
+        if obs_type in ('dayET','ET24'):
+            return self.calc_et_series(obs_type,timespan,db_manager,aggregate_type,aggregate_interval)
+        raise weewx.UnknownType(obs_type)
+        
+
     def get_aggregate(self, obs_type, timespan, aggregate_type, db_manager, **option_dict):
 
         if obs_type is None:
@@ -1157,18 +2825,43 @@ class GTSType(weewx.xtypes.XType):
                 # If `outTemp` is present from the beginning of the year up to the beginning
                 # of the timespan in question, at least one reading could be returned. This
                 # is the condition to return True
-                _, _, val = weewx.xtypes.get_series(
-                    'outTemp',
-                    TimeSpan(year_timespan.start,timespan.start+86400),
-                    db_manager,
-                    aggregate_type,
-                    86400,
-                    **option_dict
-                )
+                __coverage = self.get_coverage(db_manager) if aggregate_type=='not_null' else None
+                if __coverage is not None:
+                    # All the LMT days from Jan 1st up to the day of 
+                    # the timespan start have readings. If the timespan
+                    # covers more than one year, Jan 1st of one of the
+                    # following years is enough.
+                    __soy = startOfYearTZ(timespan.start,self.lmt_tz)
+                    __sod = startOfDayTZ(timespan.start,__soy)
+                    val = __coverage.count('outTemp',__soy,__sod+86400)==int(__sod-__soy)//86400+1
+                    __soy = startOfYearTZ(__soy+31708800,self.lmt_tz)
+                    while not val and timespan.stop>__soy:
+                        val = __coverage.covered('outTemp',__soy) is True
+                        __soy = startOfYearTZ(__soy+31708800,self.lmt_tz)
+                    return weewx.units.ValueTuple(val,'boolean','group_boolean')
+                # The sum of the counts of the days is the count of the 
+                # whole span, so one query is enough.
+                __spans = list(weeutil.weeutil.intervalgen(year_timespan.start,timespan.start+86400,86400))
                 try:
-                    if aggregate_type=='count':
-                        val = sum(val[0])
+                    if aggregate_type=='count' and not __spans:
+                        val = 0
+                    elif aggregate_type=='count':
+                        val = weewx.xtypes.get_aggregate(
+                            'outTemp',
+                            TimeSpan(__spans[0].start,__spans[-1].stop),
+                            aggregate_type,
+                            db_manager,
+                            **option_dict
+                        )[0]
                     else:
+                        _, _, val = weewx.xtypes.get_series(
+                            'outTemp',
+                            TimeSpan(year_timespan.start,timespan.start+86400),
+                            db_manager,
+                            aggregate_type,
+                            86400,
+                            **option_dict
+                        )
                         val = min(val[0])
                 except (TypeError,ValueError,LookupError):
                     val = False
@@ -1190,14 +2883,22 @@ class GTSType(weewx.xtypes.XType):
                     return weewx.units.ValueTuple(val,'boolean','group_boolean')
             raise weewx.UnknownAggregation("%s undefinded aggregation %s" % (obs_type,aggregate_type))
 
+        # boiling temperature
+        if obs_type=='boilingTemp':
+            return self.calc_boiling_aggregate(timespan,aggregate_type,db_manager,**option_dict)
+
         # derived meteorological readings
         if obs_type in ('outSVP','outVaporP','outMixingRatio',
                         'outHumAbs','outEquiTemp','outThetaE'):
-            return self.calc_derived(obs_type,timespan,aggregate_type,db_manager)
+            return self.calc_derived(obs_type,timespan,aggregate_type,db_manager,**option_dict)
 
-        # This function handles 'GTS' and 'GTSdate'.
-        if obs_type!='GTS' and obs_type!='GTSdate':
+        # This function handles 'GTS' and 'GTSdate' and the other
+        # GTS profiles.
+        if obs_type not in self.gts_types:
             raise weewx.UnknownType(obs_type)
+        __profile,__isdate = self.gts_types[obs_type]
+        __name = __profile.name
+        __end = __profile.days*86400
         
         # aggregation types that are defined for those values
         if aggregate_type not in ['sum','count','avg','max','min','last','maxtime','mintime','lasttime','not_null']:
@@ -1213,9 +2914,20 @@ class GTSType(weewx.xtypes.XType):
                 self.db_manager_ok=False
             raise weewx.CannotCalculate("%s: no database reference" % obs_type)
 
+        __p = self.get_partition(db_manager)
+        
         # needed timestamps
         _soya_ts=startOfYearTZ(timespan.start+1,self.lmt_tz)
         _soye_ts=startOfYearTZ(timespan.stop,self.lmt_tz)
+        
+        # A GTS value within timespan needs an LMT day with readings
+        # within timespan. If there is none, there is no need to 
+        # calculate anything.
+        if aggregate_type=='not_null' and not __isdate:
+            __coverage = self.get_coverage(db_manager)
+            if (__coverage is not None and __coverage.count(__profile.obs_type,
+                    startOfDayTZ(timespan.start,_soya_ts)+86400,timespan.stop+1)==0):
+                return weewx.units.ValueTuple(False,'boolean','group_boolean')
 
         # calculate GTS values for the years included in timespan 
         # (if time span is within the current year, the
@@ -1233,8 +2945,9 @@ class GTSType(weewx.xtypes.XType):
             # calculate GTS values for the year
             self.calc_gts(__ts,db_manager)
             # update minimum and maximum
-            if __ts in self.gts_values:
-                for __i,__val in enumerate(self.gts_values[__ts]):
+            __vals = __p.gts_values.get(__ts)
+            if __vals is not None:
+                for __i,__val in enumerate(__vals[__name]):
                     if __val is not None and (__ts+__i*86400)>startOfDayTZ(timespan.start,__ts) and (__ts+__i*86400)<=timespan.stop:
                         if __val>__max:
                             __max = __val
@@ -1247,7 +2960,7 @@ class GTSType(weewx.xtypes.XType):
             # next year
             __ts=startOfYearTZ(__ts+31708800,self.lmt_tz)
         
-        if obs_type=='GTS':
+        if not __isdate:
             if aggregate_type=='avg':
                 # 1 day is 86400s, but once a year it is 90000s or 82800s
                 # when the daylight savings time is switched on or off.
@@ -1261,35 +2974,36 @@ class GTSType(weewx.xtypes.XType):
                         if __b-timespan.start>timespan.stop-__b:
                             __b=__a
                             _soye_ts = _soya_ts
-                    if __b>=_soye_ts+13046400:
+                    if __b>=_soye_ts+__end:
                         __x = weewx.units.ValueTuple(None,'degree_C_day','group_degree_day')
                     else:
-                        __x=self.get_gts(obs_type,__b,_soye_ts)
-                elif _soya_ts==_soye_ts and _soya_ts in self.gts_values:
+                        __x=self.get_gts(obs_type,__b,_soye_ts,__p)
+                elif _soya_ts==_soye_ts and _soya_ts in __p.gts_values:
                     # timespan within the same year but more than one day
                     # (not much use, but calculated anyway)
-                    __a=dayOfGTSYear(timespan.start,_soya_ts)
-                    __b=dayOfGTSYear(timespan.stop,_soye_ts)
+                    __a=dayOfGTSYear(timespan.start,_soya_ts,__profile.days)
+                    __b=dayOfGTSYear(timespan.stop,_soye_ts,__profile.days)
+                    __values=__p.gts_values[_soya_ts][__name]
                     if __a==__b:
-                        __x=self.gts_values[_soya_ts][__a]
+                        __x=__values[__a]
                     else:
                         __x=0
                         for __i in range(__a,__b):
-                            if self.gts_values[_soya_ts][__i] is not None:
-                                __x+=self.gts_values[_soya_ts][__i]
+                            if __values[__i] is not None:
+                                __x+=__values[__i]
                         __x/=__b-__a
                 else:
                     raise weewx.CannotCalculate("%s %s invalid timespan %s %s" % (obs_type,aggregate_type,timespan.stop-timespan.start,time.strftime("%Y-%m-%d %H:%M:%S",time.localtime(timespan.start))))
             elif aggregate_type=='lasttime':
-                if timespan.stop>=self.last_gts_date:
+                if timespan.stop>=__p.last_gts_date:
                     # today or in future
-                    __ts=self.last_gts_date
+                    __ts=__p.last_gts_date
                 else:
                     # before today
-                    if _soye_ts not in self.gts_values:
+                    if _soye_ts not in __p.gts_values:
                         raise weewx.CannotCalculate("%s %s" % (obs_type,aggregate_type))
-                    __ts=dayOfGTSYear(timespan.stop,_soye_ts)
-                    for __i,__v in reversed(enumerate(self.gts_values[_soye_ts])):
+                    __ts=dayOfGTSYear(timespan.stop,_soye_ts,__profile.days)
+                    for __i,__v in reversed(list(enumerate(__p.gts_values[_soye_ts][__name]))):
                         if __v is not None and __i<=__ts:
                             __ts=_soye_ts+86400*__i
                             break
@@ -1297,9 +3011,9 @@ class GTSType(weewx.xtypes.XType):
                         __ts=_soye_ts
                 __x=weewx.units.ValueTuple(__ts,'unix_epoch','group_time')
             elif aggregate_type=='last':
-                if timespan.stop>=_soye_ts+13046400:
+                if timespan.stop>=_soye_ts+__end:
                     # after May 31st
-                    __ts=_soye_ts+13046400-86400
+                    __ts=_soye_ts+__end-86400
                 else:
                     # between Jan 1st and May 31st
                     __ts=startOfDayTZ(timespan.stop,_soye_ts)
@@ -1310,7 +3024,7 @@ class GTSType(weewx.xtypes.XType):
                     # for today there is no value so far
                     if -1 <= (__ts-startOfDayTZ(time.time(),_soye_ts)) <= 1:
                         __ts-=86400
-                __x=self.get_gts(obs_type,__ts,_soye_ts)
+                __x=self.get_gts(obs_type,__ts,_soye_ts,__p)
             elif aggregate_type=='max':
                 __x=weewx.units.ValueTuple(__max,'degree_C_day','group_degree_day')
             elif aggregate_type=='maxtime':
@@ -1345,17 +3059,590 @@ class GTSType(weewx.xtypes.XType):
             """
             return __x
 
-        if obs_type=='GTSdate':
+        if __isdate:
             if aggregate_type=='last' or aggregate_type=='max':
-                if _soye_ts in self.gts_date and self.gts_date[_soye_ts] is not None and timespan.stop>=self.gts_date[_soye_ts]:
-                    __x=self.gts_date[_soye_ts]
-                else:
+                __x=__p.gts_date.get(_soye_ts,{}).get(__name)
+                if __x is not None and timespan.stop<__x:
                     __x=None
                 return weewx.units.ValueTuple(__x,'unix_epoch','group_time')
                     
         raise weewx.CannotCalculate("%s %s" % (obs_type,aggregate_type))
     
 
+class WarmupThread(threading.Thread):
+    """ precalculate the values of past years in the background
+    
+        The thread works in the slack between archive intervals. It 
+        starts `delay` seconds after the engine has finished an 
+        archive interval (so that the reports run first) and works
+        at most `budget` seconds per interval. It pauses as soon as 
+        the engine begins the next archive interval. The work is done
+        in small steps, oldest first:
+        
+        * the daily energy integrals table and the rollup table
+        * GTS of all years in the database
+        * sunrise and sunset of all past days (daylight cache)
+        * outTemp aggregates of the LMT days of the last year
+        * the GDD integral of the current year
+        
+        The daily averages of a GTS year are read one month per step
+        before the year is summed up, so that the partition lock is
+        held for a short time only. An exception ends its step, not
+        the thread.
+        
+        The thread uses its own database connection and runs at low 
+        priority where the operating system supports it. It ends 
+        when all is done.
+    """
+    
+    def __init__(self, config_dict, data_binding, gts, rollup, latlon, 
+                 daylight_cache=None, budget=10.0, delay=60.0):
+        super(WarmupThread,self).__init__(name='GTS-warmup')
+        self.daemon = True
+        self.config_dict = config_dict
+        self.data_binding = data_binding
+        self.gts = gts
+        self.rollup = rollup
+        self.latlon = latlon
+        self.daylight_cache = daylight_cache
+        self.budget = budget
+        self.delay = delay
+        self.running = True
+        # set when the engine has finished an archive interval
+        self.idle = threading.Event()
+        # set when the engine needs the database
+        self.busy = threading.Event()
+        
+    def pause(self):
+        """ the engine needs the database """
+        self.idle.clear()
+        self.busy.set()
+        
+    def resume(self):
+        """ the engine has finished the archive interval """
+        self.busy.clear()
+        self.idle.set()
+        
+    def stop(self):
+        """ end the thread """
+        self.running = False
+        self.busy.set()
+        self.idle.set()
+        
+    def run(self):
+        """ thread main loop """
+        try:
+            # lower the priority of this thread (Linux only)
+            os.setpriority(os.PRIO_PROCESS,threading.get_native_id(),10)
+        except (AttributeError,OSError):
+            pass
+        try:
+            db_manager = weewx.manager.open_manager_with_config(self.config_dict,self.data_binding)
+        except (LookupError,weedb.DatabaseError) as e:
+            logerr("warm-up: could not open database: %s %s" % (e.__class__.__name__,e))
+            return
+        try:
+            __jobs = self._jobs(db_manager)
+            __start = time.time()
+            while self.running:
+                self.idle.wait()
+                # let the reports run first
+                if self.busy.wait(self.delay) or not self.running: continue
+                self.idle.clear()
+                __deadline = time.time()+self.budget
+                while self.running and not self.busy.is_set() and time.time()<__deadline:
+                    try:
+                        __step = next(__jobs)
+                    except StopIteration:
+                        loginf("warm-up finished in %.0f s" % (time.time()-__start))
+                        return
+                    except Exception as e:
+                        logerr("warm-up aborted: %s %s" % (e.__class__.__name__,e))
+                        return
+                    logdbg("warm-up: %s" % __step)
+        finally:
+            db_manager.close()
+            
+    @staticmethod
+    def _step(name, func, *args, **kwargs):
+        """ do one step of work, log an exception instead of raising it
+        
+            returns the result of func or None in case of an exception
+        """
+        try:
+            return func(*args,**kwargs)
+        except Exception as e:
+            logerr("warm-up: %s: %s %s" % (name,e.__class__.__name__,e))
+            return None
+            
+    def _jobs(self, db_manager):
+        """ generator doing one step of work per iteration, oldest first """
+        if not db_manager.first_timestamp or not db_manager.last_timestamp: return
+        # tables
+        __table = self.gts.get_energy_table(db_manager)
+        if __table is not None:
+            while not __table.complete(db_manager):
+                if not self._step('daily energy integrals',__table.sync,db_manager,1): break
+                yield 'daily energy integrals %s' % time.strftime("%Y-%m-%d",time.localtime(__table.last_update))
+        if self.rollup is not None:
+            __table = self.rollup.get_table(db_manager)
+            while not __table.complete(db_manager):
+                if not self._step('rollup table',__table.sync,db_manager,1): break
+                yield 'rollup table %s' % time.strftime("%Y-%m-%d",time.localtime(__table.last_update))
+            loginf("warm-up: tables done")
+        # years, oldest first, up to the last record
+        __last_ts = db_manager.last_timestamp
+        __first_soy = startOfYearTZ(db_manager.first_timestamp,self.gts.lmt_tz)
+        __this_soy = startOfYearTZ(__last_ts,self.gts.lmt_tz)
+        __today = startOfDayTZ(__last_ts,__this_soy)
+        __days = max(x.days for x in self.gts.gts_profiles.values())
+        __p = self.gts.get_partition(db_manager)
+        __soy = __first_soy
+        while __soy<=__this_soy:
+            __next = startOfYearTZ(__soy+31708800,self.gts.lmt_tz)
+            __year = datetime.datetime.fromtimestamp(__soy+86400,self.gts.lmt_tz).year
+            if __soy==__this_soy or __soy not in __p.gts_values:
+                # daily averages up to the cutoff, one month per step,
+                # outside the lock of the partition
+                __stats = dict()
+                __ts = __soy
+                __stop = min(__soy+__days*86400,__today)
+                while __ts<__stop:
+                    __n = int((min(__ts+2678400,__stop)-__ts)//86400)
+                    if __n<=0: break
+                    __x = self._step('GTS %s' % __year,self.gts.query_lmt_day_stats,__ts,__n,db_manager)
+                    if __x: __stats.update(__x)
+                    __ts += __n*86400
+                    yield 'GTS %s daily averages %s' % (__year,time.strftime("%Y-%m-%d",time.localtime(__ts)))
+                self._step('GTS %s' % __year,self.gts.calc_gts,__soy,db_manager,__stats)
+                yield 'GTS %s' % __year
+            if self.daylight_cache is not None:
+                # sunrise and sunset of the complete days, one month
+                # per step
+                __spans = list(genDaySpansWithoutDST(max(__soy,startOfDayTZ(db_manager.first_timestamp,__soy)),min(__next,__today)))
+                for __i in range(0,len(__spans),31):
+                    self._step('daylight',get_sunrise_sunset_batch,__spans[__i:__i+31],self.latlon,None,False,
+                        lambda binding: db_manager,weewx.units.Formatter(),weewx.units.Converter(),
+                        skin_dict={'data_binding':self.data_binding},
+                        daylight_cache=self.daylight_cache)
+                    yield 'daylight %s' % time.strftime("%Y-%m-%d",time.localtime(__spans[__i].start))
+            loginf("warm-up: year %s done" % __year)
+            __soy = __next
+        # outTemp aggregates of the LMT days of the last year, one 
+        # month per step
+        __ts = max(__today-31536000,startOfDayTZ(db_manager.first_timestamp,__first_soy))
+        while __ts<__today:
+            self._step('LMT days',self.gts.calc_lmt_day_stats,__ts,db_manager,int((min(__ts+2678400,__today)-__ts)//86400))
+            __ts += 2678400
+            yield 'LMT days %s' % time.strftime("%Y-%m-%d",time.localtime(__ts))
+        # GDD integral of the current year
+        __closed_ts = self.gts.get_partition(db_manager).closed_day_ts
+        if __closed_ts is not None:
+            self._step('yearGDD',self.gts.get_scalar,'yearGDD',{'dateTime':__closed_ts,'usUnits':db_manager.std_unit_system},db_manager)
+            yield 'yearGDD'
+
+
+class RefreshThread(threading.Thread):
+    """ non-blocking reads of GTS, GTSdate, yearGDD, and seasonGDD
+    
+        A read waits at most `budget` seconds for the value. If the
+        calculation takes longer, the last value calculated before 
+        (last-good value) is returned, and the calculation goes on
+        in this thread. There is at most one calculation per 
+        observation type and database at a time (single-flight). 
+        The observation types `GTSlastUpdate` etc. are the timestamps
+        of the records the returned values were calculated for.
+        
+        Archive records and LOOP packets are processed by 
+        `StdWXCalculate` in the engine thread. It gets values that are 
+        calculated for the timestamp of the record only. If there is 
+        none within `budget` seconds, `NoCalculate` is raised, so that
+        no last-good or missing value is saved into the record.
+        
+        The thread opens its own database connections using the
+        manager dicts of the data bindings. Reads for other databases
+        and reads for timestamps before the last-good value are 
+        calculated in the calling thread as before.
+    """
+    
+    def __init__(self, gts, manager_dicts, budget=0.5, engine_thread=None):
+        super(RefreshThread,self).__init__(name='GTS-refresh')
+        self.daemon = True
+        self.gts = gts
+        # the thread StdWXCalculate runs in
+        self.engine_thread = engine_thread
+        # manager dicts by (database_name, table_name)
+        self.manager_dicts = manager_dicts
+        self.budget = budget
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        # last-good values by key: (timestamp, ValueTuple)
+        self.values = dict()
+        # calculations in progress by key
+        self.pending = dict()
+        
+    @staticmethod
+    def key(obs_type, db_manager, option_dict):
+        """ key of a value """
+        # The growing degree days base temperature can be set in 
+        # skin.conf.
+        __base = option_dict.get('skin_dict',{}).get('Units',{}).get('DegreeDays',{}).get('growing_base')
+        return (db_manager.database_name,db_manager.table_name,obs_type,str(__base))
+        
+    def get(self, obs_type, record, db_manager, **option_dict):
+        """ get the value or the last-good value
+        
+            returns None if the value is to be calculated by the
+            caller
+        """
+        __ts = record['dateTime']
+        __key = RefreshThread.key(obs_type,db_manager,option_dict)
+        with self.lock:
+            __last = self.values.get(__key)
+            if __last is not None:
+                # not the newest value --> calculate as before
+                if __ts<__last[0]: return None
+                # already calculated
+                if __ts==__last[0]: return __last[1]
+            __event = self.pending.get(__key)
+            if __event is None:
+                if __key[:2] not in self.manager_dicts: return None
+                __event = self.pending[__key] = threading.Event()
+                self.queue.put((__key,obs_type,dict(record),option_dict))
+        __event.wait(self.budget)
+        with self.lock:
+            __last = self.values.get(__key)
+        if threading.current_thread() is self.engine_thread:
+            # records get values of their own timestamp only
+            if __last is not None and __last[0]==__ts:
+                return __last[1]
+            # (Old WeeWX versions do not know NoCalculate.)
+            raise getattr(weewx,'NoCalculate',weewx.CannotCalculate)(obs_type)
+        if __last is not None:
+            return __last[1]
+        # nothing calculated so far
+        __u, __g = weewx.units.getStandardUnitType(record.get('usUnits'),obs_type)
+        return weewx.units.ValueTuple(None,__u,__g)
+        
+    def last_update(self, obs_type, db_manager, **option_dict):
+        """ timestamp of the record the last-good value is for """
+        with self.lock:
+            __last = self.values.get(RefreshThread.key(obs_type,db_manager,option_dict))
+        return __last[0] if __last is not None else None
+        
+    def stop(self):
+        """ end the thread """
+        self.queue.put(None)
+        
+    def run(self):
+        """ thread main loop """
+        __managers = dict()
+        try:
+            while True:
+                __item = self.queue.get()
+                if __item is None: break
+                __key, obs_type, record, option_dict = __item
+                try:
+                    __manager = __managers.get(__key[:2])
+                    if __manager is None:
+                        __manager = weewx.manager.open_manager(self.manager_dicts[__key[:2]])
+                        __managers[__key[:2]] = __manager
+                    __x = self.gts.get_scalar(obs_type,record,__manager,**option_dict)
+                    with self.lock:
+                        self.values[__key] = (record['dateTime'],__x)
+                except (LookupError,weedb.DatabaseError,weewx.UnknownType,weewx.CannotCalculate) as e:
+                    logerr("could not calculate %s: %s %s" % (obs_type,e.__class__.__name__,e))
+                finally:
+                    with self.lock:
+                        __event = self.pending.pop(__key,None)
+                    if __event is not None: __event.set()
+        finally:
+            for __manager in __managers.values():
+                __manager.close()
+
+
+class DerivedBackfill(object):
+    """ bulk backfill of the psychrometric columns of the archive table
+    
+        `weectl database calc-missing` calculates the derived values
+        record by record. This class reads the input columns of
+        `chunk_days` archive days by `GTSType.iter_derived()`, 
+        calculates all the psychrometric columns of the archive table
+        that are NULL, and writes them back by `executemany()` within
+        one transaction per chunk. After that the daily summaries of these days are
+        rebuilt.
+        
+        The end of the last chunk done is saved as `backfill_lastUpdate`
+        in the table `<table>_gts_metadata`, so an interrupted backfill
+        continues there. A backfill of an explicit time span does not
+        move that watermark. If the list of columns changes, the 
+        backfill starts from the beginning.
+    """
+    
+    def __init__(self, gts, db_manager, obs_types=None, method=None, chunk_days=5):
+        self.gts = gts
+        self.db_manager = db_manager
+        self.metadata_table = '%s_gts_metadata' % db_manager.table_name
+        # psychrometric columns of the archive table
+        self.obs_types = [x for x in GTSType.PSYCHROMETRIC_TYPES 
+            if x in db_manager.sqlkeys and (obs_types is None or x in obs_types)]
+        self.method = method if method else gts.svp_method
+        self.chunk_days = max(int(chunk_days),1)
+        # timestamp of the last record done
+        self.last_update = None
+        # False if there are no daily summaries to rebuild
+        self.summaries_ok = hasattr(db_manager,'backfill_day_summary')
+        
+    def _initialize(self):
+        """ create the metadata table if necessary and read the watermark """
+        __dbtype = self.db_manager.connection.dbtype
+        with weedb.Transaction(self.db_manager.connection) as cursor:
+            gtsquery.execute(cursor,__dbtype,'create_metadata',(self.metadata_table,))
+        __meta = dict()
+        for _result in gtsquery.genSql(self.db_manager,'metadata',(self.metadata_table,)):
+            __meta[_result[0]] = _result[1]
+        if __meta.get('backfill_obs_types')==','.join(self.obs_types):
+            self.last_update = weeutil.weeutil.to_int(__meta.get('backfill_lastUpdate'))
+        else:
+            with weedb.Transaction(self.db_manager.connection) as cursor:
+                gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                                 ('backfill_obs_types',','.join(self.obs_types)))
+                gtsquery.execute(cursor,__dbtype,'delete_metadata',(self.metadata_table,),
+                                 ('backfill_lastUpdate',))
+            self.last_update = None
+            
+    def run(self, start_ts=None, stop_ts=None, progress_fn=None):
+        """ backfill the records within (start_ts, stop_ts] 
+        
+            Without start_ts the backfill starts at the watermark and
+            advances it. With start_ts the watermark is left as it is.
+            `progress_fn(records, timestamp)` is called after every 
+            chunk.
+            
+            Returns the number of records updated.
+        """
+        if not self.obs_types: return 0
+        db_manager = self.db_manager
+        self._initialize()
+        # Only a run from the watermark moves it.
+        __resume = start_ts is None
+        if start_ts is None:
+            start_ts = self.last_update
+        if start_ts is None:
+            if db_manager.first_timestamp is None: return 0
+            start_ts = db_manager.first_timestamp-1
+        if stop_ts is None:
+            stop_ts = db_manager.last_timestamp
+        if stop_ts is None: return 0
+        __dbtype = db_manager.connection.dbtype
+        __ids = (db_manager.table_name,tuple(self.obs_types))
+        __total = 0
+        __rebuild = True
+        while start_ts<stop_ts:
+            # The chunk ends at midnight, so whole archive days are done.
+            __stop = min(weeutil.weeutil.startOfDay(start_ts+self.chunk_days*86400),stop_ts)
+            if __stop<=start_ts: __stop = min(start_ts+self.chunk_days*86400,stop_ts)
+            __rows = 0
+            # The values are in the unit system of the record.
+            with weedb.Transaction(db_manager.connection) as cursor:
+                for __chunk in self.gts.iter_derived((start_ts,__stop),db_manager,
+                                    self.obs_types,self.method,missing=True):
+                    gtsquery.executemany(cursor,__dbtype,'update_null_columns',__ids,[
+                        tuple(_result[1][x] for x in self.obs_types)+(_result[0],)
+                        for _result in __chunk])
+                    __rows += len(__chunk)
+            # The daily summaries of the first chunk are rebuilt anyway, 
+            # because a previous run may have been interrupted after 
+            # updating the records.
+            if (__rows or __rebuild) and self.summaries_ok:
+                try:
+                    db_manager.backfill_day_summary(
+                        start_d=datetime.date.fromtimestamp(start_ts+1),
+                        stop_d=datetime.date.fromtimestamp(__stop-1),
+                        progress_fn=lambda *args: None,
+                        trans_days=self.chunk_days)
+                except weewx.ViolatedPrecondition as e:
+                    logerr("backfill: daily summaries not rebuilt: %s" % e)
+                    self.summaries_ok = False
+            __rebuild = False
+            if __resume and (self.last_update is None or __stop>self.last_update):
+                with weedb.Transaction(db_manager.connection) as cursor:
+                    gtsquery.execute(cursor,__dbtype,'set_metadata',(self.metadata_table,),
+                                     ('backfill_lastUpdate',str(int(__stop))))
+                self.last_update = __stop
+            __total += __rows
+            if progress_fn is not None: progress_fn(__total,__stop)
+            start_ts = __stop
+        return __total
+
+
+class IndexAdvisor(object):
+    """ covering indexes for the archive queries of this extension
+    
+        The integrals of GDD, radiation, and ET and the derived 
+        psychrometric values filter the archive table by `dateTime`
+        only, but read some other columns. Without an index containing
+        these columns, every matching row has to be fetched from the
+        table. An index beginning with `dateTime` and containing all 
+        the columns read covers the query, so the database reads the
+        index only, which is a lot smaller than the table.
+        
+        `advise()` inspects the indexes of the archive table and the
+        query plans, `create()` creates the missing indexes. The
+        indexes are named `<table>_gts_<pattern>`.
+    """
+    
+    def __init__(self, gts, db_manager):
+        self.gts = gts
+        self.db_manager = db_manager
+        
+    def patterns(self):
+        """ columns read by the queries of the extension
+        
+            Returns an OrderedDict {pattern: columns}. `dateTime` is
+            always the first column. Patterns whose value columns
+            are not in the archive table are missing.
+        """
+        __keys = self.db_manager.sqlkeys
+        __patterns = collections.OrderedDict()
+        for __name,__prefix,__columns in (
+                ('gdd',('usUnits','interval'),self.gts.temperature_obs_types),
+                ('radiation',('usUnits','interval'),('radiation',)),
+                ('et',('usUnits','interval'),('ET',)),
+                ('derived',('usUnits',),('outTemp','outHumidity','pressure'))):
+            __columns = [x for x in __columns if x in __keys]
+            if __columns:
+                __patterns[__name] = ['dateTime']+list(__prefix)+__columns
+        return __patterns
+        
+    def indexes(self):
+        """ existing indexes of the archive table as {name: [columns]} """
+        __table = self.db_manager.table_name
+        __indexes = collections.OrderedDict()
+        if self.db_manager.connection.dbtype=='mysql':
+            for _result in gtsquery.genSql(self.db_manager,'index_list',(__table,)):
+                # Key_name, Seq_in_index, Column_name
+                __indexes.setdefault(_result[2],[]).append((_result[3],_result[4]))
+            for __name in __indexes:
+                __indexes[__name] = [x[1] for x in sorted(__indexes[__name])]
+        else:
+            for _result in list(gtsquery.genSql(self.db_manager,'index_list',(__table,))):
+                __indexes[_result[1]] = [x[2] for x in gtsquery.genSql(
+                                         self.db_manager,'index_info',(_result[1],))]
+        return __indexes
+        
+    def explain(self, columns):
+        """ query plan of reading `columns` over a span of `dateTime`
+        
+            Returns (covered, plan). `covered` is True if the database
+            reads an index only.
+        """
+        __ids = (self.db_manager.table_name,tuple(columns))
+        __args = (0,1)
+        if self.db_manager.connection.dbtype=='mysql':
+            __plan = []
+            __covered = True
+            with self.db_manager.connection.cursor() as cursor:
+                gtsquery.execute(cursor,'mysql','explain_records',__ids,__args)
+                __names = [x[0] for x in cursor.cursor.description]
+                for _result in cursor:
+                    __row = dict(zip(__names,_result))
+                    __plan.append('key=%s Extra=%s' % (__row.get('key'),__row.get('Extra')))
+                    if 'Using index' not in (__row.get('Extra') or ''):
+                        __covered = False
+            return __covered and bool(__plan), '; '.join(__plan)
+        __plan = [x[-1] for x in gtsquery.genSql(self.db_manager,'explain_records',__ids,__args)]
+        return all('COVERING INDEX' in x for x in __plan) and bool(__plan), '; '.join(__plan)
+        
+    def measure(self, columns, timespan=None, repeat=3):
+        """ best time out of `repeat` runs of reading `columns` over
+            `timespan` (default: the whole table)
+        """
+        if timespan is None:
+            timespan = (self.db_manager.first_timestamp-1,self.db_manager.last_timestamp)
+        __ids = (self.db_manager.table_name,tuple(columns))
+        __best = None
+        for __i in range(max(int(repeat),1)):
+            __t = time.time()
+            gtsquery.getSql(self.db_manager,'counts',__ids,timespan)
+            __t = time.time()-__t
+            if __best is None or __t<__best: __best = __t
+        return __best
+        
+    def advise(self):
+        """ report the covering indexes of the extension's queries
+        
+            Returns a list of (pattern, columns, index, covered, plan).
+            `index` is the name of an existing index that begins with
+            `dateTime` and contains all the columns, or None if such
+            an index is missing.
+        """
+        __indexes = self.indexes()
+        __report = []
+        for __name,__columns in self.patterns().items():
+            __index = None
+            for __idx,__idx_columns in __indexes.items():
+                if (__idx_columns and __idx_columns[0]=='dateTime' and 
+                        set(__columns)<=set(__idx_columns)):
+                    __index = __idx
+                    break
+            __covered, __plan = self.explain(__columns)
+            __report.append((__name,__columns,__index,__covered,__plan))
+        return __report
+        
+    def create(self, patterns=None):
+        """ create the missing covering indexes
+        
+            `patterns` is a list of pattern names, default all.
+            An index of the same name that does not cover the columns
+            any more, for example after adding a temperature column
+            to GDD, is replaced. Returns the names of the indexes 
+            created.
+        """
+        __existing = self.indexes()
+        __created = []
+        for __name,__columns,__index,__covered,__plan in self.advise():
+            if __index is not None: continue
+            if patterns is not None and __name not in patterns: continue
+            __idx = '%s_gts_%s' % (self.db_manager.table_name,__name)
+            with weedb.Transaction(self.db_manager.connection) as cursor:
+                if __idx in __existing:
+                    gtsquery.execute(cursor,self.db_manager.connection.dbtype,'drop_index',
+                        (__idx,self.db_manager.table_name))
+                    loginf("dropped index %s on %s" % (__idx,','.join(__existing[__idx])))
+                gtsquery.execute(cursor,self.db_manager.connection.dbtype,'create_index',
+                    (__idx,self.db_manager.table_name,tuple(__columns)))
+            loginf("created index %s on %s" % (__idx,','.join(__columns)))
+            __created.append(__idx)
+        return __created
+
+
+def gts_type_from_config(config_dict, lat, lon, energy_integral_table=None):
+    """ create GTSType out of the section [StdWXCalculate][[WXXTypes]] 
+    
+        If energy_integral_table is None, the option `table` of the
+        subsection [[[energy_integral]]] applies.
+    """
+    __wxxtypes = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{})
+    # saturation vapor pressure calculation method
+    __svp_method = __wxxtypes.get('VaporPressure',{})
+    # boiling temperature calculation method
+    __boiling = __wxxtypes.get('boilingTemp',{})
+    # daily energy integrals table
+    if energy_integral_table is None:
+        energy_integral_table = weeutil.weeutil.to_bool(
+            __wxxtypes.get('energy_integral',{}).get('table',True))
+    # GTS options and profiles (every subsection is a profile)
+    __gts = __wxxtypes.get('GTS',{})
+    __gts_profiles = collections.OrderedDict(
+                (x,y) for x,y in __gts.items() if isinstance(y,dict))
+    # temperature columns to read together for GTS and GDD
+    __temperatures = __wxxtypes.get('GDD',{}).get('obs_types')
+    if __temperatures is not None:
+        __temperatures = weeutil.weeutil.option_as_list(__temperatures)
+    return GTSType(lat,lon,__svp_method,__boiling,energy_integral_table,__gts_profiles,__temperatures)
+
+
 try:
     import user.barometer
     has_baro = True
@@ -1374,11 +3661,11 @@ class GTSService(StdService):
         __lon = engine.stn_info.longitude_f
         __alt_vt = engine.stn_info.altitude_vt
 
-        # saturation vapor pressure calculation method
-        __svp_method = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{}).get('VaporPressure',{})
+        # GTS options
+        __gts = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{}).get('GTS',{})
         
         # Instantiate an instance of the class GTSType, using the options
-        self.GTSextension=GTSType(__lat,__lon,__svp_method)
+        self.GTSextension=gts_type_from_config(config_dict,__lat,__lon)
         
         # Register the class
         archive_seen = False
@@ -1395,6 +3682,27 @@ class GTSService(StdService):
         else:
             weewx.xtypes.xtypes.append(self.GTSextension)
         
+        # Register the rollup table for other day boundaries than the
+        # archive day in front of ArchiveTable
+        __rollup = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{}).get('rollup',{})
+        if weeutil.weeutil.to_bool(__rollup.get('table',True)):
+            __interval = weeutil.weeutil.to_int(__rollup.get('interval',3600))
+            if __interval<=0 or __interval%60 or 86400%__interval:
+                logerr("invalid rollup interval %s, using 3600" % __interval)
+                __interval = 3600
+            __obs_types = __rollup.get('obs_types')
+            if __obs_types is not None:
+                __obs_types = weeutil.weeutil.option_as_list(__obs_types)
+            self.rollup = RollupType(__interval,__obs_types)
+            for idx,xtype in enumerate(weewx.xtypes.xtypes):
+                if isinstance(xtype,weewx.xtypes.ArchiveTable):
+                    weewx.xtypes.xtypes.insert(idx,self.rollup)
+                    break
+            else:
+                weewx.xtypes.xtypes.insert(0,self.rollup)
+        else:
+            self.rollup = None
+        
         # Register the tags 
         # Note: This can be overwritten by the 'search_list' entry in skin_dict
         weewx.cheetahgenerator.default_search_list.append('user.dayboundarystats.DayboundaryStats')
@@ -1410,10 +3718,93 @@ class GTSService(StdService):
             loginf('PressureCooker %s ' % self.barometer)
             weewx.xtypes.xtypes.append(self.barometer)
         
+        # seed the running values out of the database
+        self.data_binding = config_dict.get('StdArchive',{}).get('data_binding','wx_binding')
+        try:
+            db_manager = engine.db_binder.get_manager(data_binding=self.data_binding,initialize=True)
+            self.GTSextension.et_accumulator.seed(db_manager)
+        except (LookupError,weedb.DatabaseError) as e:
+            logerr("could not read ET from database: %s %s" % (e.__class__.__name__,e))
+        
+        # background thread to precalculate the values of past years
+        __warmup = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{}).get('warmup',{})
+        if weeutil.weeutil.to_bool(__warmup.get('enable',True)):
+            __daylight_cache = None
+            if weeutil.weeutil.to_bool(__warmup.get('daylight_cache',True)):
+                try:
+                    __daylight_cache = DaylightCache(DaylightCache.config_path(config_dict))
+                except (KeyError,TypeError,AttributeError) as e:
+                    logerr("warm-up: no daylight cache: %s %s" % (e.__class__.__name__,e))
+            try:
+                __alt_m = weewx.units.convert(__alt_vt,'meter')[0]
+            except (ValueError,TypeError,IndexError):
+                __alt_m = None
+            self.warmup = WarmupThread(config_dict,self.data_binding,
+                self.GTSextension,self.rollup,(__lat,__lon,__alt_m),
+                daylight_cache=__daylight_cache,
+                budget=weeutil.weeutil.to_float(__warmup.get('budget',10.0)),
+                delay=weeutil.weeutil.to_float(__warmup.get('delay',60.0)))
+            self.warmup.start()
+            self.bind(weewx.PRE_LOOP, self.pre_loop)
+            self.bind(weewx.END_ARCHIVE_PERIOD, self.end_archive_period)
+        else:
+            self.warmup = None
+        
+        # non-blocking reads of GTS, GTSdate, yearGDD, and seasonGDD
+        if weeutil.weeutil.to_bool(__gts.get('nonblocking',False)):
+            __manager_dicts = dict()
+            for __binding in config_dict.get('DataBindings',{}):
+                try:
+                    __dict = weewx.manager.get_manager_dict_from_config(config_dict,__binding)
+                    __manager_dicts[(__dict['database_dict']['database_name'],__dict['table_name'])] = __dict
+                except (LookupError,TypeError,ValueError) as e:
+                    logerr("data binding %s: %s %s" % (__binding,e.__class__.__name__,e))
+            self.GTSextension.refresher = RefreshThread(self.GTSextension,__manager_dicts,
+                budget=weeutil.weeutil.to_float(__gts.get('budget',0.5)),
+                engine_thread=threading.current_thread())
+            self.GTSextension.refresher.start()
+        
+        self.bind(weewx.NEW_ARCHIVE_RECORD, self.new_archive_record)
+        
+    def pre_loop(self, event):
+        """ the engine has finished the archive interval """
+        self.warmup.resume()
+        
+    def end_archive_period(self, event):
+        """ the engine is going to create and save an archive record """
+        self.warmup.pause()
+        
+    def new_archive_record(self, event):
+        """ update the running values """
+        if self.warmup is not None:
+            self.warmup.pause()
+        try:
+            db_manager = self.engine.db_binder.get_manager(data_binding=self.data_binding)
+        except (LookupError,weedb.DatabaseError):
+            db_manager = None
+        self.GTSextension.new_archive_record(event.record,db_manager)
+        if self.rollup is not None:
+            self.rollup.new_archive_record(event.record,db_manager)
+        
     def shutDown(self):
     
-        # Engine is shutting down. Remove the registration
+        # Engine is shutting down. Stop the background thread
+        if self.warmup is not None:
+            self.warmup.stop()
+            self.warmup.join(10.0)
+        if self.GTSextension.refresher is not None:
+            self.GTSextension.refresher.stop()
+            self.GTSextension.refresher.join(10.0)
+        
+        # statistics of the SQL statements
+        if weewx.debug:
+            for __line in gtsquery.stats.report():
+                logdbg("SQL %s" % __line)
+        
+        # Remove the registration
         weewx.xtypes.xtypes.remove(self.GTSextension)
+        if self.rollup is not None:
+            weewx.xtypes.xtypes.remove(self.rollup)
         
         # Remove tag registration
         weewx.cheetahgenerator.default_search_list.remove('user.dayboundarystats.DayboundaryStats')
@@ -1421,3 +3812,65 @@ class GTSService(StdService):
         # Remove barometer workaround
         if has_baro:
             weewx.xtypes.xtypes.remove(self.barometer)
+
+
+if __name__ == '__main__':
+
+    # Bulk backfill of the psychrometric columns and covering indexes
+    #
+    # usage: PYTHONPATH=/usr/share/weewx:/etc/weewx/bin python3 GTS.py --help
+    import sys
+    import argparse
+    import weecfg
+    
+    parser = argparse.ArgumentParser(description='fill the psychrometric columns of the archive table that are NULL and rebuild the daily summaries')
+    parser.add_argument('config',nargs='?',default=None,help='path to weewx.conf')
+    parser.add_argument('--binding',default='wx_binding',help='data binding (default wx_binding)')
+    parser.add_argument('--obs-types',default=None,help='comma separated list of columns (default all)')
+    parser.add_argument('--from',dest='start',default=None,help='first day YYYY-MM-DD (default: where the last run stopped)')
+    parser.add_argument('--to',dest='stop',default=None,help='last day YYYY-MM-DD (default: last record)')
+    parser.add_argument('--chunk-days',type=int,default=5,help='archive days per transaction (default 5)')
+    parser.add_argument('--advise-indexes',action='store_true',help='report missing covering indexes instead of the backfill')
+    parser.add_argument('--create-indexes',action='store_true',help='create the missing covering indexes instead of the backfill')
+    args = parser.parse_args()
+    
+    config_path, config_dict = weecfg.read_config(args.config)
+    print("Using configuration file %s" % config_path)
+    # the same options as the service, so that the covering indexes
+    # include all the columns the service reads
+    gts = gts_type_from_config(config_dict,
+                  weeutil.weeutil.to_float(config_dict['Station'].get('latitude',0.0)),
+                  weeutil.weeutil.to_float(config_dict['Station'].get('longitude',0.0)),
+                  False)
+    __start = __stop = None
+    if args.start:
+        __start = time.mktime(time.strptime(args.start,'%Y-%m-%d'))
+    if args.stop:
+        __stop = time.mktime(time.strptime(args.stop,'%Y-%m-%d'))+86400
+    __obs_types = args.obs_types.split(',') if args.obs_types else None
+    
+    def progress(records, ts):
+        print("%s: %d records" % (time.strftime("%Y-%m-%d",time.localtime(ts-1)),records),end='\r')
+        sys.stdout.flush()
+    
+    with weewx.manager.open_manager_with_config(config_dict,args.binding) as db_manager:
+        if args.advise_indexes or args.create_indexes:
+            advisor = IndexAdvisor(gts,db_manager)
+            __before = {x:advisor.measure(y) for x,y in advisor.patterns().items()}
+            __created = advisor.create() if args.create_indexes else []
+            for __name,__columns,__index,__covered,__plan in advisor.advise():
+                print("%-10s %s" % (__name,','.join(__columns)))
+                print("           index: %s" % (__index if __index else 'missing'))
+                print("           plan:  %s%s" % (__plan,'' if __covered else ' (not covered)'))
+                if __index in __created:
+                    print("           time:  %.3f s before, %.3f s after" % (
+                          __before[__name],advisor.measure(__columns)))
+                else:
+                    print("           time:  %.3f s" % __before[__name])
+            sys.exit(0)
+        backfill = DerivedBackfill(gts,db_manager,__obs_types,chunk_days=args.chunk_days)
+        print("Columns: %s" % ', '.join(backfill.obs_types))
+        __t = time.time()
+        __n = backfill.run(__start,__stop,progress)
+        print()
+        print("%d records updated in %.1f seconds" % (__n,time.time()-__t))
@@ -44,6 +44,17 @@
     Additionally the barometer formula of the German Weather Service
     DWD is added.
     
+    For series and aggregations there are array variants of the
+    formulas (`SaturationVaporPressureArray()` etc.). They accept
+    NumPy arrays or `array('d')` and resolve the algorithm once
+    instead of on every single value. Missing values (None or NaN) 
+    result in NaN.
+    
+    `SaturationVaporPressureFast()` looks up the saturation vapor 
+    pressure in a table that is calculated once per process and 
+    algorithm. Between the table points the value is interpolated
+    linearly. Outside the table range the exact formula is used.
+    
 """
 
 VERSION = "1.2"
@@ -54,6 +65,14 @@ if __name__ == '__main__':
     sys.path.append('/usr/share/weewx')
 
 import math
+import threading
+from array import array
+
+try:
+    import numpy
+    has_numpy = True
+except ImportError:
+    has_numpy = False
 
 import weewx.units
 import weewx.xtypes
@@ -64,6 +83,248 @@ from weewx.units import ValueTuple
 BAROMETER_ALGORITHMS = ('paWView','paUnivie','paDavisVp','paManBar','paDWD')
 VAPOR_ALGORITHMS = ('vaDavisVp','vaBuck','vaBuck81','vaBolton','vaTetenNWS','vaTetenMurray','vaTeten','vaDWD')
 
+NAN = float('nan')
+
+def _svp_kernel(algorithm, Exp, Power):
+    """ get the saturation vapor pressure formula for `algorithm`
+    
+        `Exp` and `Power` are the functions to use, `math.exp` and
+        `pow` for scalars, `numpy.exp` and `numpy.power` for NumPy
+        arrays. The formulas are the same as in `weewx.uwxutils`.
+    """
+    if algorithm == 'vaDavisVp':
+        return lambda t: 6.112 * Exp((17.62 * t)/(243.12 + t))
+    if algorithm == 'vaBuck':
+        return lambda t: 6.1121 * Exp((18.678 - (t/234.5)) * t / (257.14 + t))
+    if algorithm == 'vaBuck81':
+        return lambda t: 6.1121 * Exp((17.502 * t)/(240.97 + t))
+    if algorithm == 'vaBolton':
+        return lambda t: 6.112 * Exp(17.67 * t / (t + 243.5))
+    if algorithm == 'vaTetenNWS':
+        return lambda t: 6.112 * Power(10.0, (7.5 * t / (t + 237.7)))
+    if algorithm == 'vaTetenMurray':
+        return lambda t: Power(10.0, (7.5 * t / (237.5 + t)) + 0.7858)
+    if algorithm == 'vaTeten':
+        return lambda t: 6.1078 * Power(10.0, (7.5 * t / (t + 237.3)))
+    if algorithm == 'vaDWD':
+        return lambda t: 6.11213 * Exp(17.5043 * t / (241.2 + t))
+    raise ValueError("Unknown SaturationVaporPressure algorithm '%s'" %
+                     algorithm)
+
+def _is_numpy(*args):
+    """ True if at least one of the arguments is a NumPy array """
+    return has_numpy and any(isinstance(x, numpy.ndarray) for x in args)
+
+def _to_float(x):
+    """ None to NaN """
+    return NAN if x is None else float(x)
+
+def _expand(args):
+    """ make sequences out of all the arguments
+    
+        Scalar arguments like the station elevation are repeated to the
+        length of the sequence arguments. Returns the list of sequences
+        and their common length.
+    """
+    n = None
+    for x in args:
+        if not isinstance(x, (int, float)) and x is not None:
+            if n is None:
+                n = len(x)
+            elif len(x)!=n:
+                raise ValueError("arrays of different length %s and %s" % (n,len(x)))
+    if n is None: n = 1
+    return [(x,)*n if isinstance(x, (int, float)) or x is None else x 
+            for x in args], n
+
+def _to_numpy(*args):
+    """ convert all the arguments to NumPy float arrays (None to NaN) """
+    return [numpy.asarray(x, dtype=float) if not isinstance(x, (list, tuple))
+            else numpy.array([_to_float(y) for y in x], dtype=float)
+            for x in args]
+
+def _apply(func, *args):
+    """ apply the scalar function `func` element-wise 
+    
+        If one of the arguments is None or NaN, the result is NaN, too.
+        The result is a NumPy array if one of the arguments is a
+        NumPy array, otherwise it is an `array('d')`.
+    """
+    seqs, n = _expand(args)
+    result = array('d', bytes(8*n))
+    for i, vals in enumerate(zip(*seqs)):
+        if any(x is None or x!=x for x in vals):
+            result[i] = NAN
+        else:
+            x = func(*vals)
+            result[i] = NAN if x is None else x
+    if _is_numpy(*args):
+        return numpy.frombuffer(result, dtype=float).copy()
+    return result
+
+def _apply_kernel(kernel, *args):
+    """ apply the vectorizable formula `kernel` element-wise 
+    
+        `kernel` is a function of `Exp` and `Power` that returns
+        the formula (see `_svp_kernel()`). For NumPy arrays the
+        formula is applied to the whole array at once.
+    """
+    if _is_numpy(*args):
+        args = _to_numpy(*args)
+        with numpy.errstate(invalid='ignore', over='ignore', divide='ignore'):
+            result = kernel(numpy.exp, numpy.power)(*args)
+        # NaN if one of the arguments is NaN, like `_apply()`, even if
+        # the formula does not use that argument
+        result = numpy.array(result, dtype=float)
+        result[numpy.isnan(sum(args))] = NAN
+        return result
+    func = kernel(math.exp, pow)
+    return _apply(func, *args)
+
+def _ratio_kernel(algorithm):
+    """ get the pressure reduction ratio formula for `algorithm`
+    
+        The algorithm is resolved here, once for the whole series.
+        The result is a kernel for `_apply_kernel()`. The formulas
+        are the same as in `TWxUtils.PressureReductionRatio()`.
+    """
+    utils = weewx.uwxutils.TWxUtils
+    geop = utils.GeopotentialAltitude
+    CToF = weewx.uwxutils.CToF
+    MToFt = weewx.uwxutils.MToFt
+    if algorithm == 'paDWD':
+        # German Weather Service DWD
+        def kernel(Exp, Power):
+            svp = _svp_kernel('vaDWD', Exp, Power)
+            def ratio(p, elev, t, tmean, hum):
+                vp = hum * svp(t) / 100.0
+                return Exp(utils.gravity/utils.gasConstantAir*elev/(t+273.15+vp*0.12+utils.standardLapseRate*elev/2))
+            return ratio
+    elif algorithm == 'paUnivie':
+        epsilon = 1 - (utils.moleWater / utils.moleAir)
+        def kernel(Exp, Power):
+            svp = _svp_kernel('vaBuck', Exp, Power)
+            def ratio(p, elev, t, tmean, hum):
+                geopElevationM = geop(elev)
+                vp = hum * svp(tmean) / 100.0
+                virtualTempK = (tmean + 273.15) / (1-(epsilon * (vp/p)))
+                return Exp(((utils.gravity/utils.gasConstantAir) * geopElevationM) / (virtualTempK + (geopElevationM * utils.standardLapseRate/2)))
+            return ratio
+    elif algorithm in ('paDavisVp','paManBar'):
+        svp_algorithm = 'vaDavisVp' if algorithm=='paDavisVp' else 'vaBuck'
+        def kernel(Exp, Power):
+            svp = _svp_kernel(svp_algorithm, Exp, Power)
+            def hcorr(t, elev, hum):
+                # no correction for humidity <= 0: (hum+|hum|)/2 is
+                # max(hum,0) for scalars and arrays alike
+                vp = (hum + abs(hum)) / 2 * svp(t) / 100.0
+                return (9.0/5.0) * (vp * ((2.8322E-9 * (elev**2)) + (2.225E-5 * elev) + 0.10743))
+            if algorithm == 'paDavisVp':
+                def ratio(p, elev, t, tmean, hum):
+                    return Power(10, (MToFt(elev) / (122.8943111 * (CToF(tmean) + 460 + (MToFt(elev) * utils.vpLapseRateUS/2) + hcorr(t, elev, hum)))))
+            else:
+                def ratio(p, elev, t, tmean, hum):
+                    geopElevationM = geop(elev)
+                    return Exp(geopElevationM * 6.1454E-2 / (CToF(tmean) + 459.7 + (geopElevationM * utils.manBarLapseRate / 2) + hcorr(t, elev, hum)))
+            return ratio
+    else:
+        raise ValueError("Unknown PressureReductionRatio algorithm '%s'" %
+                         algorithm)
+    return kernel
+
+# range and resolution of the saturation vapor pressure table in °C
+SVP_TABLE_MIN = -60.0
+SVP_TABLE_MAX = 60.0
+SVP_TABLE_STEP = 0.05
+
+class SVPTable(object):
+    """ saturation vapor pressure by linear interpolation
+    
+        The table is calculated by the exact formula of the given
+        algorithm. As the saturation vapor pressure is a convex 
+        function of the temperature, the interpolation error is largest
+        near the middle between two table points. The relative error
+        is checked there for every interval. It can differ from the
+        error at any other point of the interval by the relative change 
+        of the function value over the interval at most, so that 
+        factor is added as a margin. The result is an upper bound of 
+        the relative error saved in `max_relative_error`. With the 
+        default step of 0.05°C it is below 5e-6 for all the algorithms, 
+        which is much less than the differences between the algorithms 
+        (see `test/wasser.py`).
+    """
+
+    def __init__(self, algorithm, tmin=SVP_TABLE_MIN, tmax=SVP_TABLE_MAX,
+                 step=SVP_TABLE_STEP):
+        self.algorithm = algorithm
+        self.func = _svp_kernel(algorithm, math.exp, pow)
+        self.tmin = tmin
+        self.tmax = tmin+int(round((tmax-tmin)/step))*step
+        self.step = step
+        n = int(round((tmax-tmin)/step))
+        values = array('d', (self.func(tmin+i*step) for i in range(n+1)))
+        # check the interpolation error
+        err = 0.0
+        for i in range(n):
+            exact = self.func(tmin+(i+0.5)*step)
+            approx = (values[i]+values[i+1])*0.5
+            err = max(err, abs(approx-exact)/exact*values[i+1]/values[i])
+        self.max_relative_error = err
+        self.values = values
+        self.interpolate = self.get_function()
+
+    def get_function(self):
+        """ get the interpolation function
+        
+            All the values needed are bound to the function to save 
+            attribute lookups at runtime.
+        """
+        n = len(self.values)-1
+        values = self.values
+        slopes = array('d', (values[i+1]-values[i] for i in range(n)))
+        def svp(tempC, tmin=self.tmin, inv_step=1.0/self.step, n=n,
+                values=values, slopes=slopes, func=self.func):
+            x = (tempC-tmin)*inv_step
+            if 0.0<=x<n:
+                i = int(x)
+                return values[i]+slopes[i]*(x-i)
+            # outside the table: exact formula
+            return func(tempC)
+        return svp
+
+    def __call__(self, tempC):
+        return self.interpolate(tempC)
+
+# tables are calculated on first use
+_svp_tables = dict()
+_svp_tables_lock = threading.Lock()
+
+def get_svp_table(algorithm):
+    """ get the saturation vapor pressure table of the algorithm """
+    try:
+        return _svp_tables[algorithm]
+    except KeyError:
+        pass
+    with _svp_tables_lock:
+        if algorithm not in _svp_tables:
+            _svp_tables[algorithm] = SVPTable(algorithm)
+        return _svp_tables[algorithm]
+
+
+def get_svp_function(algorithm, table=False):
+    """ get a function of the temperature in °C returning the saturation
+        vapor pressure in hPa according to `algorithm`
+        
+        The algorithm is resolved once, so that there is no dispatch
+        on every call. If `table` is True, the value is interpolated out 
+        of the table. Please note, that in CPython a table lookup is 
+        not faster than a call to `math.exp()`.
+    """
+    if table:
+        return get_svp_table(algorithm).interpolate
+    return _svp_kernel(algorithm, math.exp, pow)
+
+
 class TWxUtils(weewx.uwxutils.TWxUtils):
 
     @staticmethod
@@ -115,6 +376,65 @@ class TWxUtils(weewx.uwxutils.TWxUtils):
             Result = super(TWxUtils,TWxUtils).SaturationVaporPressure(tempC, algorithm)
         return Result
 
+    @staticmethod
+    def SaturationVaporPressureFast(tempC, algorithm='vaBolton'):
+        """ saturation vapor pressure interpolated out of a table """
+        return get_svp_table(algorithm).interpolate(tempC)
+
+    @staticmethod
+    def SaturationVaporPressureArray(tempC, algorithm='vaBolton'):
+        """ saturation vapor pressure in hPa for a series of temperatures
+        
+            tempC: NumPy array, array('d') or list of temperatures in °C
+        """
+        # resolve the algorithm before processing any value
+        _svp_kernel(algorithm, math.exp, pow)
+        return _apply_kernel(
+            lambda Exp, Power: _svp_kernel(algorithm, Exp, Power), tempC)
+
+    @staticmethod
+    def ActualVaporPressureArray(tempC, humidity, algorithm='vaBolton'):
+        """ actual vapor pressure in hPa for a series of temperatures
+            and humidities
+        """
+        _svp_kernel(algorithm, math.exp, pow)
+        def kernel(Exp, Power):
+            svp = _svp_kernel(algorithm, Exp, Power)
+            return lambda t, hum: hum * svp(t) / 100.0
+        return _apply_kernel(kernel, tempC, humidity)
+
+    @staticmethod
+    def PressureReductionRatioArray(pressureHPa, elevationM,
+                                    currentTempC, meanTempC, humidity,
+                                    algorithm = 'paManBar'):
+        """ pressure reduction ratio for a series of readings 
+        
+            `elevationM` is usually a scalar value, but all the
+            arguments may be series of values as well.
+        """
+        if algorithm == 'paWView':
+            # `sealevel_pressure_Metric()` does not depend on the
+            # humidity and the mean temperature
+            def func(p, elev, t, tmean, hum):
+                return weewx.wxformulas.sealevel_pressure_Metric(p, elev, t)/p
+            return _apply(func, pressureHPa, elevationM, 
+                          currentTempC, meanTempC, humidity)
+        kernel = _ratio_kernel(algorithm)
+        return _apply_kernel(kernel, pressureHPa, elevationM, 
+                             currentTempC, meanTempC, humidity)
+
+    @staticmethod
+    def StationToSeaLevelPressureArray(pressureHPa, elevationM,
+                                       currentTempC, meanTempC, humidity,
+                                       algorithm = 'paManBar'):
+        """ sea level pressure in hPa for a series of readings """
+        ratio = TWxUtils.PressureReductionRatioArray(pressureHPa, elevationM,
+                                                     currentTempC, meanTempC,
+                                                     humidity, algorithm)
+        if _is_numpy(ratio):
+            return _to_numpy(pressureHPa)[0] * ratio
+        return _apply(lambda p, r: p*r, pressureHPa, ratio)
+
 
 class TWxUtilsUS(weewx.uwxutils.TWxUtilsUS):
 
@@ -147,6 +467,64 @@ class TWxUtilsUS(weewx.uwxutils.TWxUtilsUS):
                                humidity, algorithm)
         return Result
 
+    @staticmethod
+    def SaturationVaporPressureArray(tempF, algorithm='vaBolton'):
+        """ saturation vapor pressure in inHg for a series of 
+            temperatures in °F 
+        """
+        _svp_kernel(algorithm, math.exp, pow)
+        def kernel(Exp, Power):
+            svp = _svp_kernel(algorithm, Exp, Power)
+            return lambda t: weewx.uwxutils.HPaToIn(svp(weewx.uwxutils.FToC(t)))
+        return _apply_kernel(kernel, tempF)
+
+    @staticmethod
+    def ActualVaporPressureArray(tempF, humidity, algorithm='vaBolton'):
+        """ actual vapor pressure in inHg for a series of temperatures
+            in °F and humidities
+        """
+        _svp_kernel(algorithm, math.exp, pow)
+        def kernel(Exp, Power):
+            svp = _svp_kernel(algorithm, Exp, Power)
+            return lambda t, hum: hum * weewx.uwxutils.HPaToIn(svp(weewx.uwxutils.FToC(t))) / 100.0
+        return _apply_kernel(kernel, tempF, humidity)
+
+    @staticmethod
+    def PressureReductionRatioArray(pressureIn, elevationFt,
+                                    currentTempF, meanTempF, humidity,
+                                    algorithm='paManBar'):
+        """ pressure reduction ratio for a series of readings in
+            US units
+        """
+        if _is_numpy(pressureIn, elevationFt, currentTempF, meanTempF, humidity):
+            pressureIn, elevationFt, currentTempF, meanTempF, humidity = _to_numpy(
+                pressureIn, elevationFt, currentTempF, meanTempF, humidity)
+            return TWxUtils.PressureReductionRatioArray(
+                               weewx.uwxutils.InToHPa(pressureIn),
+                               weewx.uwxutils.FtToM(elevationFt),
+                               weewx.uwxutils.FToC(currentTempF),
+                               weewx.uwxutils.FToC(meanTempF),
+                               humidity, algorithm)
+        seqs, n = _expand((pressureIn, elevationFt, currentTempF, meanTempF))
+        return TWxUtils.PressureReductionRatioArray(
+                               _apply(weewx.uwxutils.InToHPa, seqs[0]),
+                               _apply(weewx.uwxutils.FtToM, seqs[1]),
+                               _apply(weewx.uwxutils.FToC, seqs[2]),
+                               _apply(weewx.uwxutils.FToC, seqs[3]),
+                               humidity, algorithm)
+
+    @staticmethod
+    def StationToSeaLevelPressureArray(pressureIn, elevationFt,
+                                       currentTempF, meanTempF, humidity,
+                                       algorithm='paManBar'):
+        """ sea level pressure in inHg for a series of readings """
+        ratio = TWxUtilsUS.PressureReductionRatioArray(pressureIn, elevationFt,
+                                                       currentTempF, meanTempF,
+                                                       humidity, algorithm)
+        if _is_numpy(ratio):
+            return _to_numpy(pressureIn)[0] * ratio
+        return _apply(lambda p, r: p*r, pressureIn, ratio)
+
 
 class PressureCooker(weewx.xtypes.XType):
     """Pressure related extensions to the WeeWX type system. 
@@ -344,3 +722,18 @@ if __name__ == '__main__':
     pc = PressureCooker(ValueTuple(5431,'foot','group_altitude'))
     p = pc.get_scalar('barometerManBar',{'usUnits':1,'dateTime':1689084000,'outTemp':54.75,'outHumidity':40.5,'pressure':24.692},None)
     print(p,TWxUtilsUS.StationToSeaLevelPressure(24.692, 5431, 54.75, 54.75, 40.5))
+
+    # array variants
+    p = TWxUtils.StationToSeaLevelPressureArray([1013.25,1000.0,None],170,[15.0,10.0,12.0],[15.0,10.0,12.0],[50,60,70],'paDWD')
+    print(p)
+    p = TWxUtilsUS.StationToSeaLevelPressureArray(array('d',[24.692]), 5431, [59.0], [50.5], [40.5])
+    print(p)
+    for algorithm in VAPOR_ALGORITHMS:
+        print(algorithm,TWxUtils.SaturationVaporPressureArray([-10.0,0.0,20.0],algorithm))
+    
+    # table interpolation
+    for algorithm in VAPOR_ALGORITHMS:
+        tab = get_svp_table(algorithm)
+        print('%-14s max. relative error %.2e' % (algorithm,tab.max_relative_error),
+              TWxUtils.SaturationVaporPressureFast(-20.02,algorithm),
+              TWxUtils.SaturationVaporPressure(-20.02,algorithm))
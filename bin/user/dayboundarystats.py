@@ -31,7 +31,7 @@
   $LMTyesterday(data_binding=None)
   $LMTmonth(data_binding=None, months_ago=0)
   $LMTyear(data_binding=None, years_ago=0)
-  $daylight(timestamp=None, data_binding=None, days_ago=0, horizon=None, use_center=None)
+  $daylight(timestamp=None, data_binding=None, days_ago=0, horizon=None, use_center=None, algorithm=None)
   
   "dayboundary" is an offset to UTC in seconds, that gives the 
   time of day that is used as day boundary for the given
@@ -66,16 +66,28 @@ except ImportError:
     # noinspection PyUnresolvedReferences
     from urllib import urlencode
 
+import os
 import time
 import datetime
+import math
+import bisect
+import sqlite3
+from array import array
 
-#import weedb
+try:
+    import numpy
+    has_numpy = True
+except ImportError:
+    has_numpy = False
+
+import weedb
 import weewx
 import weewx.units
-from weeutil.weeutil import TimeSpan, to_int, getDayNightTransitions
+from weeutil.weeutil import TimeSpan, to_int, to_bool, getDayNightTransitions
 from weewx.cheetahgenerator import SearchList
 from weewx.tags import TimeBinder, TimespanBinder
 from weewx.almanac import Almanac
+import user.gtsquery as gtsquery
 
 try:
     # Test for new-style weewx logging by trying to import weeutil.logger
@@ -109,6 +121,108 @@ except ImportError:
         logmsg(syslog.LOG_ERR, msg)
 
 
+# Precalculated calendar for timezones with a fixed offset to UTC
+# like the local mean time (LMT)
+
+CALENDAR_FIRST_YEAR = 1800
+CALENDAR_LAST_YEAR = 2400
+
+def daysFromCivil(year, month, day):
+    """ days since 1970-01-01 of a date of the proleptic Gregorian calendar
+    
+        (algorithm by Howard Hinnant)
+    """
+    y = year-1 if month<=2 else year
+    era = y//400
+    yoe = y-era*400
+    doy = (153*(month-3 if month>2 else month+9)+2)//5+day-1
+    doe = yoe*365+yoe//4-yoe//100+doy
+    return era*146097+doe-719468
+
+
+class FixedOffsetCalendar(object):
+    """ start timestamps of the months and years from 
+        CALENDAR_FIRST_YEAR to CALENDAR_LAST_YEAR in a timezone with a 
+        fixed offset to UTC
+        
+        The values are the same as datetime.datetime(...,tz).timestamp()
+        would return. Timestamps outside the range return None, and the
+        caller has to use datetime instead.
+    """
+    
+    def __init__(self, tz):
+        td = tz.utcoffset(None)
+        # offset to UTC in microseconds
+        self.offset_us = (td.days*86400+td.seconds)*1000000+td.microseconds
+        self.month_starts = array('d',
+            [self.timestamp(daysFromCivil(__y,__m,1))
+             for __y in range(CALENDAR_FIRST_YEAR,CALENDAR_LAST_YEAR+1)
+             for __m in range(1,13)])
+        self.month_starts.append(self.timestamp(daysFromCivil(CALENDAR_LAST_YEAR+1,1,1)))
+        self.year_starts = self.month_starts[::12]
+        
+    def timestamp(self, days):
+        """ timestamp of 00:00:00 local time of the day `days` days 
+            after 1970-01-01
+        """
+        return (days*86400000000-self.offset_us)/1000000
+        
+    def local_day(self, time_ts):
+        """ days since 1970-01-01 of the local date of time_ts """
+        return (round(time_ts*1000000)+self.offset_us)//86400000000
+        
+    def local_hour(self, time_ts):
+        """ hours since 1970-01-01 00:00:00 local time """
+        return (round(time_ts*1000000)+self.offset_us)//3600000000
+        
+    def startOfYear(self, time_ts, years_ago=0):
+        """ start of the year time_ts is in """
+        __idx = bisect.bisect_right(self.year_starts,time_ts)-1-years_ago
+        if __idx<0 or __idx>=len(self.year_starts)-1: return None
+        return self.year_starts[__idx]
+        
+    def yearSpan(self, time_ts, years_ago=0):
+        """ start and end of the year time_ts is in """
+        __idx = bisect.bisect_right(self.year_starts,time_ts)-1-years_ago
+        if __idx<0 or __idx>=len(self.year_starts)-1: return None
+        return TimeSpan(self.year_starts[__idx],self.year_starts[__idx+1])
+        
+    def monthSpan(self, time_ts, months_ago=0):
+        """ start and end of the month time_ts is in """
+        __idx = bisect.bisect_right(self.month_starts,time_ts)-1-months_ago
+        if __idx<0 or __idx>=len(self.month_starts)-1: return None
+        return TimeSpan(self.month_starts[__idx],self.month_starts[__idx+1])
+        
+    def weekSpan(self, time_ts, startOfWeek=6, weeks_ago=0):
+        """ start and end of the week time_ts is in """
+        __day = self.local_day(time_ts)
+        # 1970-01-01 was a Thursday (weekday 3)
+        __delta = ((__day+3)%7-startOfWeek)%7
+        __start = __day-__delta-7*weeks_ago
+        return TimeSpan(self.timestamp(__start),self.timestamp(__start+7))
+        
+    def hourSpan(self, time_ts, hours_ago=0):
+        """ start and end of the hour time_ts is in """
+        __hour = self.local_hour(time_ts)-hours_ago
+        return TimeSpan((__hour*3600000000-self.offset_us)/1000000,
+                        ((__hour+1)*3600000000-self.offset_us)/1000000)
+
+
+_calendars = dict()
+
+def get_calendar(tz):
+    """ get the precalculated calendar for timezone tz 
+    
+        returns None if tz has no fixed offset to UTC
+    """
+    if not isinstance(tz,datetime.timezone): return None
+    try:
+        return _calendars[tz]
+    except KeyError:
+        pass
+    return _calendars.setdefault(tz,FixedOffsetCalendar(tz))
+
+
 # The following functions are similar to that in weeutil/weeutil.py,
 # but honour the timezone tz and do _not_ honour daylight savings time.
 
@@ -124,6 +238,10 @@ def startOfDayTZ(time_ts, soy_ts):
 
 def startOfYearTZ(time_ts,tz,years_ago=0):
     """ get the start of the GTS year time_ts is in """
+    cal = get_calendar(tz)
+    if cal is not None:
+        soy_ts = cal.startOfYear(time.time() if time_ts is None else time_ts,years_ago)
+        if soy_ts is not None: return soy_ts
     if time_ts is None:
         # the year of today
         dt=datetime.datetime.now(tz)
@@ -141,6 +259,9 @@ def hourSpanTZ(tz, time_ts, grace=1, hours_ago=0):
     """ Returns a TimeSpan for x hours ago  """
     if time_ts is None: return None
     time_ts -= grace
+    cal = get_calendar(tz)
+    if cal is not None:
+        return cal.hourSpan(time_ts,hours_ago)
     dt = datetime.datetime.fromtimestamp(time_ts,tz)
     hour_start_dt = dt.replace(minute=0, second=0, microsecond=0)
     start_span_dt = hour_start_dt - datetime.timedelta(hours=hours_ago)
@@ -161,6 +282,9 @@ def weekSpanTZ(tz, time_ts, startOfWeek=6, grace=1, weeks_ago=0):
     """Returns a TimeSpan representing a week that includes a given time. """
     if time_ts is None: return None
     time_ts -= grace
+    cal = get_calendar(tz)
+    if cal is not None:
+        return cal.weekSpan(time_ts,startOfWeek,weeks_ago)
     _day_date = datetime.datetime.fromtimestamp(time_ts,tz)
     _day_of_week = _day_date.weekday()
     _delta = _day_of_week - startOfWeek
@@ -173,6 +297,12 @@ def weekSpanTZ(tz, time_ts, startOfWeek=6, grace=1, weeks_ago=0):
     
 def monthSpanTZ(tz, time_ts, grace=1, months_ago=0):
     """ get the start of the GTS month time_ts is in """
+    cal = get_calendar(tz)
+    if cal is not None:
+        # Note: grace is not applied here to be consistent with the
+        #       datetime based calculation below.
+        span = cal.monthSpan(time.time() if time_ts is None else time_ts,months_ago)
+        if span is not None: return span
     if time_ts is None:
         # the year of today
         dt=datetime.datetime.now(tz)
@@ -205,6 +335,10 @@ def yearSpanTZ(tz, time_ts, grace=1, years_ago=0):
         that includes a given time."""
     if time_ts is None: time_ts = time.time()
     time_ts -= grace
+    cal = get_calendar(tz)
+    if cal is not None:
+        span = cal.yearSpan(time_ts,years_ago)
+        if span is not None: return span
     soya_ts = startOfYearTZ(time_ts,tz,years_ago)
     soye_ts = startOfYearTZ(soya_ts+31968000,tz)
     return TimeSpan(soya_ts,soye_ts)
@@ -225,20 +359,313 @@ def genWeekSpansWithoutDST(start_ts, stop_ts):
     for time_ts in range(int(start_ts),int(stop_ts),604800):
         yield TimeSpan(time_ts,time_ts+604800)
 
-def get_sunrise_sunset(ts, latlon, horizon, use_center, db_lookup, report_time, formatter, converter, **option_dict):
-    # (derived from cheetahgenerator.py, Copyright Tom Keffer)
-    try:
-        # get the middle of the timespan ts
-        ts = ts.start//2 + ts.stop//2
-    except (LookupError,AttributeError):
-        # ts is already a timestamp, do nothing
-        pass
+def get_refraction_weather(rec, temperature_C, pressure_mbar):
+    """ get temperature in °C and pressure in mbar out of an archive
+        record, defaults if not available
+    """
+    if rec is not None:
+        if 'outTemp' in rec:
+            x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'outTemp'), "degree_C")[0]
+            if x is not None: temperature_C = x
+        if 'barometer' in rec:
+            x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'barometer'), "mbar")[0]
+            if x is not None: pressure_mbar = x
+    return temperature_C, pressure_mbar
+
+
+# maximum number of time windows per query (SQLite allows 999
+# parameters in older versions)
+MAX_WINDOWS = 400
+
+def get_nearest_records(archive, times, max_delta=3600):
+    """ get the archive records nearest to the given timestamps
+    
+        Same as archive.getRecord(ts, max_delta) for every ts in times,
+        but by one database query for up to `MAX_WINDOWS` time windows
+        of +/-max_delta around the timestamps. The records contain 
+        `dateTime`, `usUnits`, `outTemp`, and `barometer` only.
+    """
+    _times = sorted(x for x in times if x is not None)
+    if not _times: return [None]*len(times)
+    # merge overlapping windows
+    __windows = []
+    for time_ts in _times:
+        if __windows and time_ts-max_delta<=__windows[-1][1]:
+            __windows[-1][1] = time_ts+max_delta
+        else:
+            __windows.append([time_ts-max_delta,time_ts+max_delta])
+    __keys = ('dateTime','usUnits')+tuple(x for x in ('outTemp','barometer') if x in archive.sqlkeys)
+    __rows = []
+    for __i in range(0,len(__windows),MAX_WINDOWS):
+        __chunk = __windows[__i:__i+MAX_WINDOWS]
+        __rows.extend(gtsquery.genSql(archive,'records_in_windows',
+            (archive.table_name,__keys,len(__chunk)),
+            tuple(x for y in __chunk for x in y)))
+    __ts = [x[0] for x in __rows]
+    __recs = []
+    for time_ts in times:
+        __rec = None
+        if time_ts is not None:
+            __idx = bisect.bisect_left(__ts,time_ts)
+            # candidates are the records before and at/after time_ts
+            __best = None
+            for __i in (__idx-1,__idx):
+                if 0<=__i<len(__ts):
+                    __delta = abs(__ts[__i]-time_ts)
+                    if __delta<=max_delta and (__best is None or __delta<__best[0]):
+                        __best = (__delta,__i)
+            if __best is not None:
+                __rec = dict(zip(__keys,__rows[__best[1]]))
+        __recs.append(__rec)
+    return __recs
+
+
+# Sunrise and sunset according to the NOAA solar equations
+# https://gml.noaa.gov/grad/solcalc/calcdetails.html
+
+class _ScalarMath(object):
+    """ the NumPy functions used below for scalar values """
+    sin = staticmethod(math.sin)
+    cos = staticmethod(math.cos)
+    tan = staticmethod(math.tan)
+    arcsin = staticmethod(math.asin)
+    arccos = staticmethod(math.acos)
+    radians = staticmethod(math.radians)
+    degrees = staticmethod(math.degrees)
+    @staticmethod
+    def clip(x, a, b):
+        return min(max(x,a),b)
+    @staticmethod
+    def where(cond, x, y):
+        return x if cond else y
+
+
+def sunPositionNOAA(time_ts, xp=_ScalarMath):
+    """ declination (radians), equation of time (minutes), and 
+        semidiameter (degrees) of the sun at time_ts
+        
+        time_ts can be a number or a NumPy array. In the latter case
+        `xp` has to be `numpy`.
+    """
+    # Julian century
+    jc = (time_ts/86400.0+2440587.5-2451545.0)/36525.0
+    # geometric mean longitude and anomaly of the sun
+    L0 = (280.46646+jc*(36000.76983+jc*0.0003032))%360
+    M = xp.radians(357.52911+jc*(35999.05029-0.0001537*jc))
+    # eccentricity of the earth orbit
+    e = 0.016708634-jc*(0.000042037+0.0000001267*jc)
+    # equation of center
+    C = (xp.sin(M)*(1.914602-jc*(0.004817+0.000014*jc))
+         +xp.sin(2*M)*(0.019993-0.000101*jc)
+         +xp.sin(3*M)*0.000289)
+    # distance in AU
+    R = 1.000001018*(1-e*e)/(1+e*xp.cos(M+xp.radians(C)))
+    # apparent longitude and corrected obliquity
+    omega = xp.radians(125.04-1934.136*jc)
+    app_long = xp.radians(L0+C-0.00569-0.00478*xp.sin(omega))
+    obliq = xp.radians(23.0+(26.0+(21.448-jc*(46.815+jc*(0.00059-jc*0.001813)))/60.0)/60.0
+                       +0.00256*xp.cos(omega))
+    decl = xp.arcsin(xp.sin(obliq)*xp.sin(app_long))
+    # equation of time
+    y = xp.tan(obliq/2)**2
+    L0 = xp.radians(L0)
+    eqtime = 4*xp.degrees(y*xp.sin(2*L0)-2*e*xp.sin(M)
+                          +4*e*y*xp.sin(M)*xp.cos(2*L0)
+                          -0.5*y*y*xp.sin(4*L0)-1.25*e*e*xp.sin(2*M))
+    return decl, eqtime, 0.26656/R
+
+
+def refractionBennett(altitude, temperature_C=15.0, pressure_mbar=1013.25, xp=_ScalarMath):
+    """ atmospheric refraction in degrees for the apparent altitude 
+        in degrees (Bennett 1982) 
+        
+        Below -1° Bennett's formula is not valid. There the formula
+        libastro (pyephem) uses for low altitudes applies, so that
+        twilight agrees with pyephem. It becomes 0 at about -10°.
+        
+        The arguments can be NumPy arrays. In that case `xp` has to
+        be `numpy`.
+    """
+    __alt = xp.clip(altitude,-1.0,90.0)
+    __x = (1.0/xp.tan(xp.radians(__alt+7.31/(__alt+4.4)))/60.0
+           *pressure_mbar/1010.0*283.0/(273.0+temperature_C))
+    # below the horizon
+    __low = xp.clip(altitude,-90.0,-1.0)
+    __y = (((2e-5*__low+1.96e-2)*__low+1.594e-1)*pressure_mbar/
+           ((273.0+temperature_C)*((8.45e-2*__low+5.05e-1)*__low+1.0)))
+    return xp.where(altitude<-1.0,xp.clip(__y,0.0,90.0),__x)
+
+
+def sunriseSunsetNOAA(noon_ts, lat, lon, horizon=None, use_center=False,
+                      temperature_C=15.0, pressure_mbar=1013.25, 
+                      iterations=3):
+    """ sunrise and sunset of the days of local mean noon noon_ts 
+    
+        noon_ts, temperature_C, and pressure_mbar can be numbers or
+        NumPy arrays. The result is a tuple of sunrise and sunset 
+        timestamps of the same kind.
+        
+        If the sun does not rise at that day, sunrise and sunset are
+        both the time of the transit. If the sun does not set, they 
+        are the local mean midnights before and after noon_ts.
+    """
+    xp = numpy if has_numpy and isinstance(noon_ts,numpy.ndarray) else _ScalarMath
+    if horizon is None: horizon = 0.0
+    lat = math.radians(lat)
+    rise_ts = noon_ts-21600.0
+    set_ts = noon_ts+21600.0
+    for __i in range(iterations):
+        __times = []
+        for __ts,__sign in ((rise_ts,-1.0),(set_ts,1.0)):
+            decl, eqtime, sd = sunPositionNOAA(__ts,xp)
+            # apparent and geometric altitude of the center of the sun
+            __alt = horizon if use_center else horizon-sd
+            h0 = xp.radians(__alt-refractionBennett(__alt,temperature_C,pressure_mbar,xp))
+            cosH = (xp.sin(h0)-math.sin(lat)*xp.sin(decl))/(math.cos(lat)*xp.cos(decl))
+            transit = noon_ts-eqtime*60.0
+            __t = transit+__sign*xp.degrees(xp.arccos(xp.clip(cosH,-1.0,1.0)))*240.0
+            __times.append(__t)
+        rise_ts, set_ts = __times
+    return rise_ts, set_ts
+
+
+class DaylightCache(object):
+    """ sunrise and sunset of past days saved in a SQLite database file
+    
+        The values are keyed by the location (latitude, longitude,
+        altitude, horizon, use_center), the source of temperature and 
+        pressure for the refraction correction, and the timestamp the 
+        calculation is done for, that is the middle of the day.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.ok = True
+        self.initialized = False
+        
+    def _connect(self):
+        """ open the database file and create the table if necessary """
+        connection = sqlite3.connect(self.path,timeout=5)
+        if not self.initialized:
+            gtsquery.execute(connection,'sqlite','create_daylight')
+            connection.commit()
+            self.initialized = True
+        return connection
+        
+    @staticmethod
+    def config_path(config_dict):
+        """ path of the file out of weewx.conf
+        
+            The file name is set in one place only, the subsection
+            [StdWXCalculate][[WXXTypes]][[[warmup]]], so that the
+            skin reads the values the warm-up thread saves.
+        """
+        __warmup = config_dict.get('StdWXCalculate',{}).get('WXXTypes',{}).get('warmup',{})
+        sqlite_root = os.path.join(config_dict.get('WEEWX_ROOT',''),
+            config_dict['DatabaseTypes']['SQLite'].get('SQLITE_ROOT','archive'))
+        return os.path.join(sqlite_root,__warmup.get('daylight_cache_file','daylight_cache.sdb'))
+        
+    @staticmethod
+    def location(latlon, horizon, use_center):
+        """ key of the location """
+        return '%s,%s,%s,%s,%d' % (latlon[0],latlon[1],latlon[2],horizon,bool(use_center))
+        
+    def load(self, location, source, start_ts, stop_ts):
+        """ get the saved values from start_ts to stop_ts as dict """
+        if not self.ok: return dict()
+        try:
+            connection = self._connect()
+            try:
+                return {x[0]:(x[1],x[2]) for x in gtsquery.execute(
+                    connection,'sqlite','daylight',(),
+                    (location,source,start_ts,stop_ts))}
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logerr("daylight cache %s disabled: %s %s" % (self.path,e.__class__.__name__,e))
+            self.ok = False
+        return dict()
+        
+    def save(self, location, source, values):
+        """ save values, which is a list of (dateTime, sunrise, sunset) """
+        if not self.ok or not values: return
+        try:
+            connection = self._connect()
+            try:
+                gtsquery.executemany(connection,'sqlite','save_daylight',(),
+                    [(location,source)+tuple(x) for x in values])
+                connection.commit()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logerr("daylight cache %s disabled: %s %s" % (self.path,e.__class__.__name__,e))
+            self.ok = False
+
+
+def get_sunrise_sunset_batch(spans, latlon, horizon, use_center, db_lookup, formatter, converter, algorithm=None, **option_dict):
+    """ get sunrise and sunset for a list of days
+    
+        Sunrise and sunset are calculated by pyephem with the 
+        temperature and pressure of the archive for the refraction
+        correction. These are read out of the database by one query 
+        for all the days.
+        
+        algorithm 'NOAA' calculates all the days at once by the NOAA
+        solar equations instead of pyephem.
+    """
     # ICAO standard athmosphere
     temperature_C = 15.0
     pressure_mbar = 1013.25
+    noaa = algorithm is not None and algorithm.upper()=='NOAA'
+    # 'NOAA2': refraction below -1°, so that twilight values saved
+    # by versions without are not used
+    algo = 'NOAA2' if noaa else 'ephem'
+    # database to get temperature and pressure from
     try:
-        # get timestamp of sunrise and sunset out of pyephem
-        alm = Almanac(ts, 
+        binding = option_dict.get('skin_dict',{}).get('data_binding', 'wx_binding')
+        archive = db_lookup(binding)
+        source = '%s:%s' % (algo,binding)
+    except (KeyError, weewx.UnknownBinding, weedb.NoDatabaseError):
+        logerr("daylight")
+        archive = None
+        source = algo
+    # Note: span.start//2+span.stop//2 is used instead of 
+    #       (span.start+span.stop)//2 to prevent overflow
+    __mids = [int(span.start)//2+int(span.stop)//2 for span in spans]
+    # values saved before
+    cache = option_dict.get('daylight_cache')
+    if cache is not None and __mids:
+        location = cache.location(latlon,horizon,use_center)
+        cached = cache.load(location,source,min(__mids),max(__mids))
+    else:
+        cached = dict()
+    # first pass: sunrise and sunset with standard athmosphere
+    # (__alms[i] is None if the value is not to be corrected)
+    __alms = []
+    __times = []
+    if noaa:
+        # local mean noon of the days
+        __noons = [__ts+(43200-(__ts+latlon[1]*240.0)%86400+43200)%86400-43200 for __ts in __mids]
+        __todo = [__i for __i,__ts in enumerate(__mids) if __ts not in cached]
+        __rise, __set = _noaa_batch([__noons[__i] for __i in __todo],latlon,horizon,use_center)
+        __new = dict(zip(__todo,zip(__rise,__set)))
+        for __i,__ts in enumerate(__mids):
+            if __i in __new:
+                __alms.append(True)
+                __times.append(__new[__i])
+            else:
+                __alms.append(None)
+                __times.append(cached[__ts])
+    alm = None
+    for span,ts in zip(spans,__mids):
+        if noaa: break
+        if ts in cached:
+            __alms.append(None)
+            __times.append(cached[ts])
+            continue
+        try:
+            if alm is None:
+                alm = Almanac(ts, 
                       latlon[0], 
                       latlon[1], 
                       altitude=latlon[2],
@@ -247,53 +674,102 @@ def get_sunrise_sunset(ts, latlon, horizon, use_center, db_lookup, report_time,
                       horizon=horizon,
                       formatter=formatter,
                       converter=converter)
-        sunrise = alm.sun(use_center=use_center).rise.raw
-        sunset = alm.sun(use_center=use_center).set.raw
-        # See if we can get more accurate values by looking them up in the
-        # weather database. The database might not exist, so be prepared for
-        # a KeyError exception.
-        temp1=temperature_C
-        press1=pressure_mbar
-        temp2=temperature_C
-        press2=pressure_mbar
+                day_alm = alm
+            else:
+                day_alm = alm(almanac_time=ts)
+            sunrise = day_alm.sun(use_center=use_center).rise.raw
+            sunset = day_alm.sun(use_center=use_center).set.raw
+        except Exception:
+            # If pyephem is not installed or another error occurs, use
+            # the built-in function of WeeWX instead.
+            day_alm = None
+            first,values = getDayNightTransitions(span.start, span.stop, latlon[0], latlon[1])
+            sunrise = values[0]
+            sunset = values[1]
+        __alms.append(day_alm)
+        __times.append((sunrise,sunset))
+    # the records next to sunrise and sunset out of the database
+    __recs = None
+    if archive is not None and any(x is not None for x in __alms):
         try:
-            binding = option_dict.get('skin_dict',{}).get('data_binding', 'wx_binding')
-            archive = db_lookup(binding)
-        except (KeyError, weewx.UnknownBinding, weedb.NoDatabaseError):
-            logerr("daylight")
-            pass
+            __recs = get_nearest_records(archive,
+                [x for day_alm,y in zip(__alms,__times) for x in (y if day_alm is not None else (None,None))])
+        except weedb.DatabaseError as e:
+            logerr("daylight %s %s" % (e.__class__.__name__,e))
+    # Values are saved if the day is over and the database contains
+    # all the records that could be used for it.
+    if archive is not None:
+        complete_ts = archive.last_timestamp if __recs is not None else None
+    else:
+        complete_ts = time.time()
+    # second pass: refraction correction
+    if noaa and __recs is not None:
+        __todo = [__i for __i,day_alm in enumerate(__alms) if day_alm is not None]
+        __weather = [get_refraction_weather(__recs[__j],temperature_C,pressure_mbar) for __i in __todo for __j in (2*__i,2*__i+1)]
+        __rise, _ = _noaa_batch([__noons[__i] for __i in __todo],latlon,horizon,use_center,__weather[0::2])
+        _, __set = _noaa_batch([__noons[__i] for __i in __todo],latlon,horizon,use_center,__weather[1::2])
+        for __i,__r,__s in zip(__todo,__rise,__set):
+            __times[__i] = (__r,__s)
+    __spans = []
+    __new = []
+    for __i,(day_alm,(sunrise,sunset)) in enumerate(zip(__alms,__times)):
+        if not noaa and day_alm is not None and __recs is not None:
+            temp1, press1 = get_refraction_weather(__recs[2*__i],temperature_C,pressure_mbar)
+            temp2, press2 = get_refraction_weather(__recs[2*__i+1],temperature_C,pressure_mbar)
+            try:
+                sunrise = day_alm(temperature=temp1,pressure=press1).sun(use_center=use_center).rise.raw
+                sunset = day_alm(temperature=temp2,pressure=press2).sun(use_center=use_center).set.raw
+            except Exception as e:
+                logerr("pyephem error %s %s" % (e.__class__.__name__,e))
+                logerr("pyephem error temp1 %s temp2 %s press1 %s press2 %s" % (temp1,temp2,press1,press2))
+                day_alm = None
+        if (day_alm is not None and complete_ts is not None and 
+                spans[__i].stop<=complete_ts and 
+                max(sunrise,sunset)+3600<=complete_ts):
+            __new.append((__mids[__i],sunrise,sunset))
+        __spans.append(TimeSpan(sunrise, sunset))
+    if cache is not None and __new:
+        cache.save(location,source,__new)
+    return __spans
+
+
+def _noaa_batch(noons, latlon, horizon, use_center, weather=None):
+    """ sunrise and sunset by the NOAA equations for a list of local 
+        mean noons, optionally with a list of (temperature, pressure)
+        
+        returns a list of sunrises and a list of sunsets
+    """
+    if not noons: return [],[]
+    if has_numpy:
+        if weather:
+            temp = numpy.array([x[0] for x in weather],dtype=float)
+            press = numpy.array([x[1] for x in weather],dtype=float)
         else:
-            rec = archive.getRecord(sunrise, max_delta=3600)
-            if rec is not None:
-                if 'outTemp' in rec:
-                    x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'outTemp'), "degree_C")[0]
-                    if x is not None: temp1 = x
-                if 'barometer' in rec:
-                    x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'barometer'), "mbar")[0]
-                    if x is not None: press1 = x
-            rec = archive.getRecord(sunset, max_delta=3600)
-            if rec is not None:
-                if 'outTemp' in rec:
-                    x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'outTemp'), "degree_C")[0]
-                    if x is not None: temp2 = x
-                if 'barometer' in rec:
-                    x = weewx.units.convert(weewx.units.as_value_tuple(rec, 'barometer'), "mbar")[0]
-                    if x is not None: press2 = x
-        try:
-            # get timestamp of sunrise and sunset out of pyephem
-            sunrise = alm(temperature=temp1,pressure=press1).sun(use_center=use_center).rise.raw
-            sunset = alm(temperature=temp2,pressure=press2).sun(use_center=use_center).set.raw
-        except Exception as e:
-            logerr("pyephem error %s %s" % (e.__class__.__name__,e))
-            logerr("pyephem error temp1 %s temp2 %s press1 %s press2 %s" % (temp1,temp2,press1,press2))
-            pass
-    except Exception:
-        # If pyephem is not installed or another error occurs, use
-        # the built-in function of WeeWX instead.
-        first,values = getDayNightTransitions(ts.start, ts.stop, latlon[0], latlon[1])
-        sunrise = values[0]
-        sunset = values[1]
-    return TimeSpan(sunrise, sunset)
+            temp = 15.0
+            press = 1013.25
+        __rise, __set = sunriseSunsetNOAA(numpy.array(noons,dtype=float),
+                            latlon[0],latlon[1],horizon,use_center,temp,press)
+        return __rise.tolist(),__set.tolist()
+    __rise = []
+    __set = []
+    for __i,__noon in enumerate(noons):
+        temp, press = weather[__i] if weather else (15.0,1013.25)
+        __x = sunriseSunsetNOAA(float(__noon),latlon[0],latlon[1],horizon,use_center,temp,press)
+        __rise.append(__x[0])
+        __set.append(__x[1])
+    return __rise,__set
+
+
+def get_sunrise_sunset(ts, latlon, horizon, use_center, db_lookup, report_time, formatter, converter, **option_dict):
+    """ get sunrise and sunset of one day
+    
+        ts is the timespan of the day or a timestamp in the middle of
+        it. This is get_sunrise_sunset_batch() for one day.
+    """
+    if not isinstance(ts,TimeSpan):
+        ts = TimeSpan(ts,ts)
+    return get_sunrise_sunset_batch([ts],latlon,horizon,use_center,
+                                    db_lookup,formatter,converter,**option_dict)[0]
 
 
 class DayboundaryTimeBinder(TimeBinder):
@@ -318,6 +794,8 @@ class DayboundaryTimeBinder(TimeBinder):
                 # Python before 3.7 requires timedelta to be whole minutes
                 timeoffset = datetime.timedelta(minutes=offset_f//60)
                 timetz = datetime.timezone(timeoffset,"")
+            # prepare the calendar of that timezone
+            get_calendar(timetz)
             return {'timeoffset':timeoffset,'timezone':timetz},timetz
         # if offset is None return Local Mean Time
         return self.lmt,self.lmt_tz
@@ -475,7 +953,7 @@ class DayboundaryTimeBinder(TimeBinder):
             LMT=self.lmt,
             **self.option_dict)
             
-    def daylight(self, timestamp=None, data_binding=None, days_ago=0, horizon=None, use_center=False):
+    def daylight(self, timestamp=None, data_binding=None, days_ago=0, horizon=None, use_center=False, algorithm=None):
         dbin = data_binding
         if timestamp:
             # timestamp or timespan
@@ -492,15 +970,15 @@ class DayboundaryTimeBinder(TimeBinder):
             # day timespan (from antitransit to antitransit)
             ts = daySpanTZ(self.lmt_tz, self.report_time, days_ago=days_ago)
 
-        ts = get_sunrise_sunset(ts,
+        ts = get_sunrise_sunset_batch([ts],
                                 self.latlon,
                                 horizon,
                                 use_center,
                                 self.db_lookup, 
-                                self.report_time, 
                                 self.formatter, 
                                 self.converter,
-                                **self.option_dict)
+                                algorithm=algorithm,
+                                **self.option_dict)[0]
 
         return DayboundaryTimespanBinder(ts,
                               self.lmt, self.latlon, self.db_lookup, data_binding=dbin,
@@ -509,6 +987,53 @@ class DayboundaryTimeBinder(TimeBinder):
                               **self.option_dict)
 
     
+# aggregation types days_table() and weeks_table() calculate by SQL
+# (the same way as weewx.xtypes.ArchiveTable does)
+TABLE_AGGREGATES = {
+    'min':'MIN(%s)',
+    'max':'MAX(%s)',
+    'sum':'SUM(%s)',
+    'avg':'AVG(%s)',
+    'count':'COUNT(%s)'}
+
+
+class DayboundaryTableRow(object):
+    """ one row of days_table() or weeks_table() 
+    
+        `$row.outTemp.max` returns the precalculated value if available.
+        Everything else is passed to the DayboundaryTimespanBinder of 
+        the span, so `$row.dateTime` etc. work as usual.
+    """
+    
+    def __init__(self, binder, values):
+        self.binder = binder
+        self.values = values
+        
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('binder','values'):
+            raise AttributeError(attr)
+        if attr in self.values:
+            return DayboundaryTableObs(self.binder,attr,self.values[attr])
+        return getattr(self.binder,attr)
+
+
+class DayboundaryTableObs(object):
+    """ the aggregates of one observation type within a row """
+    
+    def __init__(self, binder, obs_type, values):
+        self.binder = binder
+        self.obs_type = obs_type
+        self.values = values
+        
+    def __getattr__(self, aggregate_type):
+        if aggregate_type.startswith('_') or aggregate_type in ('binder','obs_type','values'):
+            raise AttributeError(aggregate_type)
+        try:
+            return self.values[aggregate_type]
+        except KeyError:
+            return getattr(getattr(self.binder,self.obs_type),aggregate_type)
+
+
 class DayboundaryTimespanBinder(TimespanBinder):
 
     def __init__(self, timespan, lmt, latlon, db_lookup, data_binding=None, context='current',
@@ -537,19 +1062,82 @@ class DayboundaryTimespanBinder(TimespanBinder):
                                             'week', self.formatter, self.converter,
                                             **self.option_dict)
                                             
+    # Table of aggregates over days or weeks by one query
+    def days_table(self, obs_types, aggregates=('min','max','avg','sum')):
+        """ list of DayboundaryTableRow, one for each day """
+        return self._table(genDaySpansWithoutDST, 86400, 'day', obs_types, aggregates)
+        
+    def weeks_table(self, obs_types, aggregates=('min','max','avg','sum')):
+        """ list of DayboundaryTableRow, one for each week """
+        return self._table(genWeekSpansWithoutDST, 604800, 'week', obs_types, aggregates)
+        
+    def _table(self, genSpanFunc, length, context, obs_types, aggregates):
+        """ calculate aggregates for all the spans by one grouped query
+        
+            Observation types that are no database column and 
+            aggregation types not in TABLE_AGGREGATES are calculated
+            the usual way when they are accessed.
+        """
+        spans = list(genSpanFunc(self.timespan.start,self.timespan.stop))
+        binders = [DayboundaryTimespanBinder(span, self.lmt, self.latlon,
+                                           self.db_lookup, self.data_binding,
+                                           context, self.formatter,
+                                           self.converter, **self.option_dict)
+                   for span in spans]
+        if not spans: return []
+        if isinstance(obs_types,str): obs_types = obs_types.split(',')
+        if isinstance(aggregates,str): aggregates = aggregates.split(',')
+        db_manager = self.db_lookup(self.data_binding)
+        obs_types = [x.strip() for x in obs_types if x.strip() in db_manager.sqlkeys]
+        aggregates = [x.strip() for x in aggregates if x.strip() in TABLE_AGGREGATES]
+        columns = [(x,y) for x in obs_types for y in aggregates]
+        if not columns:
+            return [DayboundaryTableRow(binder,dict()) for binder in binders]
+        # Each span is (start, start+length].
+        expressions = tuple((x,TABLE_AGGREGATES[y]) for x,y in columns)
+        start_ts = int(spans[0].start)
+        rows = dict()
+        try:
+            for _row in gtsquery.genSql(db_manager,'span_aggregates',
+                    (db_manager.table_name,expressions),
+                    (start_ts+1,int(length),start_ts,int(spans[-1].stop))):
+                rows[int(_row[0])] = _row[1:]
+        except weedb.DatabaseError as e:
+            logerr("%s_table: %s %s" % (context,e.__class__.__name__,e))
+            return [DayboundaryTableRow(binder,dict()) for binder in binders]
+        units = {(x,y):weewx.units.getStandardUnitType(db_manager.std_unit_system,x,y) for x,y in columns}
+        table = []
+        for idx,binder in enumerate(binders):
+            _row = rows.get(idx)
+            values = dict()
+            for col,(obs_type,aggregate_type) in enumerate(columns):
+                if _row is not None:
+                    val = _row[col]
+                else:
+                    # no records within that span
+                    val = 0 if aggregate_type=='count' else None
+                vt = weewx.units.ValueTuple(val,*units[(obs_type,aggregate_type)])
+                values.setdefault(obs_type,dict())[aggregate_type] = weewx.units.ValueHelper(
+                    vt,context,self.formatter,self.converter)
+            table.append(DayboundaryTableRow(binder,values))
+        return table
+        
     # Iterate over days in the time period and return daylight timespan:
-    def daylights(self, horizon=None, use_center=False):
+    def daylights(self, horizon=None, use_center=False, algorithm=None):
         """ generator function that returns DayboundaryTimespanBinder """
-        alm = Almanac(self.timespan.start,
-                      self.latlon[0], 
-                      self.latlon[1], 
-                      altitude=self.latlon[2],
-                      temperature=15.0,
-                      pressure=1013.25,
-                      horizon=horizon,
-                      formatter=self.formatter,
-                      converter=self.converter)
-        almsun = alm.sun
+        if algorithm is not None and algorithm.upper()=='NOAA':
+            # all the days at once by the NOAA solar equations
+            almsun = None
+        else:
+            almsun = Almanac(self.timespan.start,
+                          self.latlon[0], 
+                          self.latlon[1], 
+                          altitude=self.latlon[2],
+                          temperature=15.0,
+                          pressure=1013.25,
+                          horizon=horizon,
+                          formatter=self.formatter,
+                          converter=self.converter).sun
         if almsun.__class__.__name__=='SkyfieldAlmanacBinder':
             binding = self.option_dict.get('skin_dict',{}).get('data_binding', 'wx_binding')
             archive = self.db_lookup(binding)
@@ -564,18 +1152,17 @@ class DayboundaryTimespanBinder(TimespanBinder):
                                            self.converter,
                                            **self.option_dict)
             return
-        # Note: span.start//2+span.stop//2 is used instead of 
-        #       (span.start+span.stop)//2 to prevent overflow
-        for span in genDaySpansWithoutDST(self.timespan.start,self.timespan.stop):
-            ts = get_sunrise_sunset(span,
+        # sunrise and sunset of all the days at once
+        spans = list(genDaySpansWithoutDST(self.timespan.start,self.timespan.stop))
+        for ts in get_sunrise_sunset_batch(spans,
                                 self.latlon,
                                 horizon,
                                 use_center,
                                 self.db_lookup, 
-                                int(span.start)//2+int(span.stop)//2, 
                                 self.formatter, 
                                 self.converter,
-                                **self.option_dict)
+                                algorithm=algorithm,
+                                **self.option_dict):
             yield DayboundaryTimespanBinder(ts, 
                                            self.lmt,
                                            self.latlon, 
@@ -617,6 +1204,17 @@ class DayboundaryStats(SearchList):
             # Python before 3.7 requires timedelta to be whole minutes
             self.timeoffset = datetime.timedelta(minutes=(self.generator.stn_info.longitude_f*240)//60)
             self.lmt_tz = datetime.timezone(self.timeoffset,"LMT")
+        # prepare the calendar of local mean time
+        get_calendar(self.lmt_tz)
+        # cache for sunrise and sunset
+        self.daylight_cache = None
+        __dict = self.generator.skin_dict.get('DayboundaryStats',{})
+        if to_bool(__dict.get('daylight_cache',True)):
+            try:
+                self.daylight_cache = DaylightCache(
+                    DaylightCache.config_path(self.generator.config_dict))
+            except (KeyError,TypeError,AttributeError) as e:
+                logerr("no daylight cache: %s %s" % (e.__class__.__name__,e))
 
     def get_extension_list(self, timespan, db_lookup):
         """Returns a search list extension with two additions.
@@ -651,7 +1249,8 @@ class DayboundaryStats(SearchList):
             week_start=self.generator.stn_info.week_start,
             rain_year_start=self.generator.stn_info.rain_year_start,
             trend=trend_dict,
-            skin_dict=self.generator.skin_dict)
+            skin_dict=self.generator.skin_dict,
+            daylight_cache=self.daylight_cache)
 
         return [stats]
 
@@ -0,0 +1,448 @@
+# SQL statements of the GTS extension
+# Copyright (C) 2021, 2022 Johanna Roedenbeck
+
+"""
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+"""
+
+  All the SQL statements of `GTS.py` and `dayboundarystats.py` are
+  defined here.
+
+  A statement is identified by its name and the identifiers (table
+  and column names) it is built for. Values are always bound as
+  parameters, never formatted into the SQL text. So the text of a
+  statement is built once per database type and set of identifiers
+  and then taken out of a cache. As the SQL text does not change,
+  the statement cache of the database connection (the `sqlite3`
+  module keeps the prepared statements per connection) reuses the
+  prepared statement.
+
+  Identifiers are quoted by backticks, which both MySQL and SQLite
+  understand.
+
+  `stats` counts the executions of each statement and how often its
+  SQL text was built. `stats.report()` gives an overview.
+
+  Usage:
+
+  for row in gtsquery.genSql(db_manager,'records',(table,columns),(start,stop)):
+      ...
+
+"""
+
+VERSION = "1.2"
+
+import threading
+import collections
+
+# statement builders by name
+STATEMENTS = dict()
+
+
+def statement(name):
+    """ register a function building the SQL text of a statement
+
+        The function is called with the database type ('sqlite' or
+        'mysql') and the identifiers as arguments.
+    """
+    def register(func):
+        STATEMENTS[name] = func
+        return func
+    return register
+
+
+def quote(name):
+    """ quote an identifier by backticks """
+    return '`%s`' % str(name).replace('`','``')
+
+
+def quote_list(names):
+    """ comma separated list of quoted identifiers """
+    return ','.join(quote(x) for x in names)
+
+
+class QueryStats(object):
+    """ instrumentation counters of the query layer
+
+        `executions` counts the executions of each statement, `builds`
+        how often its SQL text was built, that is the number of
+        different statements of that name. The difference of both
+        is the number of reuses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executions = collections.defaultdict(int)
+        self.builds = collections.defaultdict(int)
+
+    def executed(self, name):
+        with self.lock:
+            self.executions[name] += 1
+
+    def built(self, name):
+        with self.lock:
+            self.builds[name] += 1
+
+    def reset(self):
+        with self.lock:
+            self.executions.clear()
+            self.builds.clear()
+
+    def report(self):
+        """ lines of name, executions, and statements built """
+        with self.lock:
+            return ['%-24s %8d executions %5d statements' % (x,self.executions[x],self.builds[x])
+                    for x in sorted(set(self.executions)|set(self.builds))]
+
+stats = QueryStats()
+
+
+class StatementCache(object):
+    """ SQL texts by database type, name, and identifiers """
+
+    def __init__(self):
+        self.cache = dict()
+
+    def get(self, dbtype, name, identifiers=()):
+        __key = (dbtype,name,identifiers)
+        __sql = self.cache.get(__key)
+        if __sql is None:
+            __sql = self.cache.setdefault(__key,STATEMENTS[name](dbtype,*identifiers))
+            stats.built(name)
+        return __sql
+
+cache = StatementCache()
+
+
+def get_sql(dbtype, name, identifiers=()):
+    """ SQL text of statement `name` for the database type `dbtype` """
+    return cache.get(dbtype,name,identifiers)
+
+
+def genSql(db_manager, name, identifiers=(), args=()):
+    """ execute a SELECT statement and yield the rows """
+    __sql = cache.get(db_manager.connection.dbtype,name,identifiers)
+    stats.executed(name)
+    return db_manager.genSql(__sql,args)
+
+
+def getSql(db_manager, name, identifiers=(), args=()):
+    """ execute a SELECT statement and return the first row """
+    __sql = cache.get(db_manager.connection.dbtype,name,identifiers)
+    stats.executed(name)
+    return db_manager.getSql(__sql,args)
+
+
+def execute(cursor, dbtype, name, identifiers=(), args=()):
+    """ execute a statement by `cursor` """
+    __sql = cache.get(dbtype,name,identifiers)
+    stats.executed(name)
+    return cursor.execute(__sql,args)
+
+
+def executemany(cursor, dbtype, name, identifiers=(), args=()):
+    """ execute a statement by `cursor` for every tuple in `args` 
+    
+        The MySQL cursor of weedb has no method `executemany()`. For
+        it, the statement is executed once per tuple.
+    """
+    __sql = cache.get(dbtype,name,identifiers)
+    stats.executed(name)
+    if hasattr(cursor,'executemany'):
+        return cursor.executemany(__sql,args)
+    for __args in args:
+        cursor.execute(__sql,__args)
+
+
+def bucket(dbtype):
+    """ number of the span a record belongs to
+
+        Each span is (start, start+length], so a record with timestamp
+        dateTime belongs to span (dateTime-start-1) div length. The
+        parameters are start+1 and length.
+    """
+    if dbtype=='mysql':
+        return "FLOOR((`dateTime`-?)/?)"
+    return "CAST((`dateTime`-?)/? AS INTEGER)"
+
+
+# archive table
+
+@statement('records')
+def _records(dbtype, table, columns):
+    """ the records within (start, stop] ordered by time """
+    return ("SELECT `dateTime`,%s FROM %s "
+            "WHERE `dateTime`>? AND `dateTime`<=? ORDER BY `dateTime`" % (
+            quote_list(columns),quote(table)))
+
+@statement('records_page')
+def _records_page(dbtype, table, columns, missing):
+    """ the first `limit` records within (start, stop] ordered by
+        time, optionally only those where one of `missing` is NULL
+    """
+    __sql = "SELECT `dateTime`,%s FROM %s WHERE `dateTime`>? AND `dateTime`<=?" % (
+            quote_list(columns),quote(table))
+    if missing:
+        __sql += " AND (%s)" % ' OR '.join('%s IS NULL' % quote(x) for x in missing)
+    return __sql+" ORDER BY `dateTime` LIMIT ?"
+
+@statement('records_in_windows')
+def _records_in_windows(dbtype, table, columns, windows):
+    """ the records within `windows` time windows [a, b]
+
+        The windows are joined as derived table, so that the database
+        can use the index on `dateTime` for each of them.
+    """
+    return ("SELECT %s FROM (SELECT ? AS `a`,? AS `b`%s) AS `w` "
+            "JOIN %s ON %s.`dateTime`>=`w`.`a` AND %s.`dateTime`<=`w`.`b` "
+            "ORDER BY %s.`dateTime`" % (
+            ','.join('%s.%s' % (quote(table),quote(x)) for x in columns),
+            ' UNION ALL SELECT ?,?'*(windows-1),
+            quote(table),quote(table),quote(table),quote(table)))
+
+@statement('et24_window')
+def _et24_window(dbtype, table):
+    """ ET24 by a window function
+
+        '86399 PRECEDING' means dateTime>ts-86400 for integer
+        timestamps.
+    """
+    return ("SELECT * FROM ("
+            "SELECT `dateTime`,`interval`,`usUnits`,"
+            "SUM(`ET`) OVER (ORDER BY `dateTime` RANGE BETWEEN 86399 PRECEDING AND CURRENT ROW) "
+            "FROM %s WHERE `dateTime`>? AND `dateTime`<=?) AS w "
+            "WHERE `dateTime`>? ORDER BY `dateTime`" % quote(table))
+
+@statement('count_since')
+def _count_since(dbtype, table, columns):
+    """ number of values of each column after a timestamp """
+    return "SELECT %s FROM %s WHERE `dateTime`>?" % (
+            ','.join('COUNT(%s)' % quote(x) for x in columns),quote(table))
+
+@statement('counts')
+def _counts(dbtype, table, columns):
+    """ number of values of each column within (start, stop] """
+    return "SELECT %s FROM %s WHERE `dateTime`>? AND `dateTime`<=?" % (
+            ','.join('COUNT(%s)' % quote(x) for x in columns),quote(table))
+
+@statement('min_max_sum_count')
+def _min_max_sum_count(dbtype, table, column):
+    """ MIN, MAX, SUM, and COUNT of a column within (start, stop] """
+    __col = quote(column)
+    return ("SELECT MIN(%s),MAX(%s),SUM(%s),COUNT(%s) FROM %s "
+            "WHERE `dateTime`>? AND `dateTime`<=?" % (
+            __col,__col,__col,__col,quote(table)))
+
+@statement('first_time_of_value')
+def _first_time_of_value(dbtype, table, column):
+    """ timestamp of the first record within (start, stop] where
+        `column` has a given value
+    """
+    return ("SELECT `dateTime` FROM %s WHERE `dateTime`>? AND `dateTime`<=? "
+            "AND %s=? ORDER BY `dateTime` LIMIT 1" % (quote(table),quote(column)))
+
+@statement('radiation_integral')
+def _radiation_integral(dbtype, table, column):
+    """ SUM(column*interval)/60, MIN(usUnits), MAX(usUnits) """
+    return ("SELECT SUM(%s*`interval`)/60.0,MIN(`usUnits`),MAX(`usUnits`) "
+            "FROM %s WHERE `dateTime`>? AND `dateTime`<=?" % (
+            quote(column),quote(table)))
+
+@statement('gdd_integrals')
+def _gdd_integrals(dbtype, table, columns):
+    """ growing degree days integrals of several columns
+
+        The parameters are stop_t, limit_t, limit_t-base_t, base_t,
+        and base_t for each column, followed by start and stop.
+    """
+    return ("SELECT %s,MIN(`usUnits`),MAX(`usUnits`) FROM %s "
+            "WHERE `dateTime`>? AND `dateTime`<=?" % (
+            ','.join('SUM('
+                     'CASE'
+                     ' WHEN %s>? THEN 0.0'
+                     ' WHEN %s>? THEN ?'
+                     ' WHEN %s<? THEN 0.0'
+                     ' ELSE %s-?'
+                     ' END*`interval`/1440.0)' % ((quote(x),)*4) for x in columns),
+            quote(table)))
+
+@statement('day_stats')
+def _day_stats(dbtype, table, columns):
+    """ MIN, MAX, AVG of several columns and MIN(usUnits),
+        MAX(usUnits) per span
+
+        The parameters are start+1, length, start, and stop.
+    """
+    return ("SELECT %s AS `bucket`,%s,MIN(`usUnits`),MAX(`usUnits`) FROM %s "
+            "WHERE `dateTime`>? AND `dateTime`<=? GROUP BY `bucket`" % (
+            bucket(dbtype),
+            ','.join('MIN(%s),MAX(%s),AVG(%s)' % ((quote(x),)*3) for x in columns),
+            quote(table)))
+
+@statement('span_aggregates')
+def _span_aggregates(dbtype, table, expressions):
+    """ aggregates per span
+
+        `expressions` are pairs of a column and an aggregation
+        expression with `%s` standing for the column. The parameters
+        are start+1, length, start, and stop.
+    """
+    return ("SELECT %s AS `bucket`,%s FROM %s "
+            "WHERE `dateTime`>? AND `dateTime`<=? GROUP BY `bucket`" % (
+            bucket(dbtype),
+            ','.join(y % quote(x) for x,y in expressions),
+            quote(table)))
+
+@statement('update_null_columns')
+def _update_null_columns(dbtype, table, columns):
+    """ set the columns of a record that are NULL """
+    return "UPDATE %s SET %s WHERE `dateTime`=?" % (
+            quote(table),','.join('%s=COALESCE(%s,?)' % (quote(x),quote(x)) for x in columns))
+
+# tables of the extension
+
+@statement('create_metadata')
+def _create_metadata(dbtype, table):
+    return ("CREATE TABLE IF NOT EXISTS %s ("
+            "`name` VARCHAR(40) NOT NULL PRIMARY KEY, "
+            "`value` VARCHAR(255))" % quote(table))
+
+@statement('create_energy')
+def _create_energy(dbtype, table):
+    return ("CREATE TABLE IF NOT EXISTS %s ("
+            "`obs_type` VARCHAR(30) NOT NULL, "
+            "`dateTime` INTEGER NOT NULL, "
+            "`usUnits` INTEGER, "
+            "`energy` REAL, "
+            "`count` INTEGER NOT NULL, "
+            "PRIMARY KEY (`obs_type`,`dateTime`))" % quote(table))
+
+@statement('create_rollup')
+def _create_rollup(dbtype, table):
+    return ("CREATE TABLE IF NOT EXISTS %s ("
+            "`obs_type` VARCHAR(30) NOT NULL, "
+            "`dateTime` INTEGER NOT NULL, "
+            "`min` REAL, "
+            "`mintime` INTEGER, "
+            "`max` REAL, "
+            "`maxtime` INTEGER, "
+            "`sum` REAL, "
+            "`count` INTEGER NOT NULL, "
+            "`wsum` REAL, "
+            "`sumtime` INTEGER, "
+            "PRIMARY KEY (`obs_type`,`dateTime`))" % quote(table))
+
+@statement('metadata')
+def _metadata(dbtype, table):
+    return "SELECT `name`,`value` FROM %s" % quote(table)
+
+@statement('set_metadata')
+def _set_metadata(dbtype, table):
+    return "REPLACE INTO %s VALUES (?,?)" % quote(table)
+
+@statement('delete_metadata')
+def _delete_metadata(dbtype, table):
+    return "DELETE FROM %s WHERE `name`=?" % quote(table)
+
+@statement('delete_all')
+def _delete_all(dbtype, table):
+    return "DELETE FROM %s" % quote(table)
+
+@statement('replace')
+def _replace(dbtype, table, columns):
+    """ insert or replace a row of `columns` values """
+    return "REPLACE INTO %s VALUES (%s)" % (quote(table),','.join('?'*columns))
+
+@statement('energy_day')
+def _energy_day(dbtype, table):
+    return ("SELECT `obs_type`,`energy`,`count`,`usUnits` FROM %s "
+            "WHERE `dateTime`=?" % quote(table))
+
+@statement('energy_sum')
+def _energy_sum(dbtype, table):
+    return ("SELECT SUM(`energy`),MIN(`usUnits`),MAX(`usUnits`),"
+            "COUNT(*),COUNT(`usUnits`) FROM %s "
+            "WHERE `obs_type`=? AND `dateTime`>=? AND `dateTime`<?" % quote(table))
+
+@statement('rollup_interval')
+def _rollup_interval(dbtype, table):
+    return ("SELECT `obs_type`,`min`,`mintime`,`max`,`maxtime`,`sum`,`count`,"
+            "`wsum`,`sumtime` FROM %s WHERE `dateTime`=?" % quote(table))
+
+@statement('rollup_sum')
+def _rollup_sum(dbtype, table):
+    return ("SELECT MIN(`min`),MAX(`max`),SUM(`sum`),SUM(`count`) FROM %s "
+            "WHERE `obs_type`=? AND `dateTime`>=? AND `dateTime`<?" % quote(table))
+
+@statement('rollup_mintime')
+def _rollup_mintime(dbtype, table):
+    """ the first occurrence of the minimum """
+    return ("SELECT `mintime` FROM %s WHERE `obs_type`=? AND `dateTime`>=? "
+            "AND `dateTime`<? AND `min`=? ORDER BY `dateTime` LIMIT 1" % quote(table))
+
+@statement('rollup_maxtime')
+def _rollup_maxtime(dbtype, table):
+    """ the first occurrence of the maximum """
+    return ("SELECT `maxtime` FROM %s WHERE `obs_type`=? AND `dateTime`>=? "
+            "AND `dateTime`<? AND `max`=? ORDER BY `dateTime` LIMIT 1" % quote(table))
+
+# indexes
+
+@statement('index_list')
+def _index_list(dbtype, table):
+    if dbtype=='mysql':
+        return "SHOW INDEX FROM %s" % quote(table)
+    return "PRAGMA index_list(%s)" % quote(table)
+
+@statement('index_info')
+def _index_info(dbtype, index):
+    return "PRAGMA index_info(%s)" % quote(index)
+
+@statement('explain_records')
+def _explain_records(dbtype, table, columns):
+    """ query plan of reading `columns` within (start, stop] """
+    return "%s SELECT %s FROM %s WHERE `dateTime`>? AND `dateTime`<=?" % (
+            'EXPLAIN' if dbtype=='mysql' else 'EXPLAIN QUERY PLAN',
+            quote_list(columns),quote(table))
+
+@statement('create_index')
+def _create_index(dbtype, index, table, columns):
+    return "CREATE INDEX %s ON %s (%s)" % (quote(index),quote(table),quote_list(columns))
+
+@statement('drop_index')
+def _drop_index(dbtype, index, table):
+    if dbtype=='mysql':
+        return "DROP INDEX %s ON %s" % (quote(index),quote(table))
+    return "DROP INDEX %s" % quote(index)
+
+# daylight cache (SQLite only)
+
+@statement('create_daylight')
+def _create_daylight(dbtype):
+    return ("CREATE TABLE IF NOT EXISTS daylight ("
+            "location TEXT NOT NULL, source TEXT NOT NULL, "
+            "dateTime INTEGER NOT NULL, sunrise REAL, sunset REAL, "
+            "PRIMARY KEY (location, source, dateTime))")
+
+@statement('daylight')
+def _daylight(dbtype):
+    return ("SELECT dateTime,sunrise,sunset FROM daylight "
+            "WHERE location=? AND source=? AND dateTime>=? AND dateTime<=?")
+
+@statement('save_daylight')
+def _save_daylight(dbtype):
+    return "INSERT OR REPLACE INTO daylight VALUES (?,?,?,?,?)"
@@ -26,5 +26,5 @@ class GTSInstaller(ExtensionInstaller):
                   'ET24':['prefer_hardware','archive'],
                   'yearGDD':['software','archive'],
                   'seasonGDD':['software','archive']}}},
-            files=[('bin/user', ['bin/user/GTS.py','bin/user/dayboundarystats.py','bin/user/barometer.py'])]
+            files=[('bin/user', ['bin/user/GTS.py','bin/user/dayboundarystats.py','bin/user/gtsquery.py','bin/user/barometer.py'])]
             )
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import time
+import datetime
+
+"""
+  Accuracy of the NOAA sunrise/sunset calculation of dayboundarystats.py
+  compared to pyephem
+  
+  usage: python3 test/sunrise.py [year]
+  
+  For every location and option the deviation NOAA minus pyephem in
+  seconds is printed for sunrise and sunset of every day of the year
+  (mean, minimum, maximum). Days without sunrise or sunset are skipped.
+  Temperature 15°C and pressure 1013.25 mbar.
+  
+  Results for 2015 to 2032:
+  
+  * horizon 0°, center or upper limb of the sun: 
+    within +/-15 seconds
+  * civil twilight (horizon -6°) and nautical twilight (horizon 
+    -12°): within +/-6 seconds, at 64°N on the days the sun only
+    just reaches that altitude up to 60 seconds
+  
+  The script exits with 1 if one of the limits below is exceeded.
+"""
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','bin'))
+
+import ephem
+import user.dayboundarystats
+
+# (latitude, longitude)
+LOCATIONS = [(51.0,13.4),(0.1,-78.5),(-33.9,151.2),(64.1,-21.9),(40.7,-74.0)]
+# (horizon, use_center, limit in seconds or None)
+OPTIONS = [(0.0,True,15.0),(0.0,False,15.0),(-6.0,True,90.0),(-12.0,True,90.0)]
+
+def ephem_sunrise_sunset(noon_ts, lat, lon, horizon, use_center):
+    """ sunrise and sunset by pyephem, None if there is none """
+    obs = ephem.Observer()
+    obs.lat = str(lat)
+    obs.lon = str(lon)
+    obs.elevation = 0.0
+    obs.temp = 15.0
+    obs.pressure = 1013.25
+    obs.horizon = str(horizon)
+    obs.date = ephem.Date(datetime.datetime.utcfromtimestamp(noon_ts-43200))
+    sun = ephem.Sun()
+    try:
+        rise = obs.next_rising(sun,use_center=use_center)
+        sset = obs.next_setting(sun,use_center=use_center)
+    except (ephem.AlwaysUpError,ephem.NeverUpError):
+        return None,None
+    rise = (rise-ephem.Date('1970/1/1'))*86400.0
+    sset = (sset-ephem.Date('1970/1/1'))*86400.0
+    if rise>noon_ts or sset<noon_ts:
+        return None,None
+    return rise,sset
+
+if __name__ == "__main__":
+
+    year = int(sys.argv[1]) if len(sys.argv)>1 else 2023
+    
+    ok = True
+    print('numpy: %s' % user.dayboundarystats.has_numpy)
+    print('   lat    lon horizon center  rise mean   min   max   set mean   min   max')
+    for lat,lon in LOCATIONS:
+        # local mean noons of the year
+        soy_ts = datetime.datetime(year,1,1,tzinfo=datetime.timezone.utc).timestamp()-lon*240
+        noons = [soy_ts+43200+86400*i for i in range(365)]
+        for horizon,use_center,limit in OPTIONS:
+            t0 = time.time()
+            rises,sets = user.dayboundarystats._noaa_batch(noons,(lat,lon,0),horizon,use_center)
+            t1 = time.time()
+            drise = []
+            dset = []
+            for noon_ts,rise,sset in zip(noons,rises,sets):
+                erise,eset = ephem_sunrise_sunset(noon_ts,lat,lon,horizon,use_center)
+                if erise is None: continue
+                drise.append(rise-erise)
+                dset.append(sset-eset)
+            t2 = time.time()
+            if not drise: continue
+            print('%6.1f %6.1f %7.1f %6s %10.1f %5.1f %5.1f %10.1f %5.1f %5.1f   NOAA %.3fs pyephem %.3fs' % (
+                  lat,lon,horizon,use_center,
+                  sum(drise)/len(drise),min(drise),max(drise),
+                  sum(dset)/len(dset),min(dset),max(dset),
+                  t1-t0,t2-t1))
+            if limit is not None and max(abs(x) for x in drise+dset)>limit:
+                print('limit of %.0f seconds exceeded' % limit)
+                ok = False
+    sys.exit(0 if ok else 1)
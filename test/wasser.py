@@ -161,7 +161,38 @@ def svp(temp):
         rtn[algorithm] = SaturationVaporPressure(temp,algorithm)
     return rtn
 
-if len(sys.argv)>1:
+def svpTableError(algorithm, tmin=-60.0, tmax=60.0, step=0.05, samples=10):
+    """ maximum relative error of the linear interpolation out of a
+        table as used by `SaturationVaporPressureFast()` in 
+        `barometer.py` compared to the exact formula and maximum 
+        relative deviation of the exact formula from Goff-Gratch
+        over the table range
+    """
+    n = int(round((tmax-tmin)/step))
+    values = [SaturationVaporPressure(tmin+i*step,algorithm) for i in range(n+1)]
+    err = 0.0
+    dev = 0.0
+    for i in range(n):
+        for j in range(samples):
+            f = (j+0.5)/samples
+            temp = tmin+(i+f)*step
+            exact = SaturationVaporPressure(temp,algorithm)
+            approx = values[i]+(values[i+1]-values[i])*f
+            err = max(err,abs(approx-exact)/exact)
+            gg = svpGoffGratch(temp)
+            dev = max(dev,abs(exact-gg)/gg)
+    return err,dev
+
+if len(sys.argv)>1 and sys.argv[1]=='table':
+
+    # Fehler der Tabelleninterpolation im Vergleich zur Abweichung
+    # der Formeln von Goff-Gratch
+    print('Algorithmus     Interpolation  Abweichung von Goff-Gratch')
+    for algorithm in algorithms:
+        err,dev = svpTableError(algorithm)
+        print("%-15s %9.2e      %7.2f%%" % (algorithm,err,dev*100))
+
+elif len(sys.argv)>1:
 
     val = float(sys.argv[1])
 